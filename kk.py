@@ -1,31 +1,32 @@
-import serial
+import sys
 import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "smart_agriculture_project" / "scripts"))
+from actuator import BlockingActuator  # noqa: E402
 
 PORT = "COM13"   # change if needed
 BAUD = 115200
 
 try:
-    esp = serial.Serial(PORT, BAUD, timeout=1)
-    time.sleep(2)   # wait for ESP32 to boot
+    # one connection for the whole session; the ESP32 resets once when it is opened
+    esp = BlockingActuator(PORT, baud=BAUD, boot_delay=2)
+    esp.wait_connected()
 except Exception as e:
     print("Failed to open serial:", e)
     raise SystemExit
 
-def send(cmd, wait=0.2):
-    esp.write((cmd + "\n").encode())
-    time.sleep(wait)
-    reply = esp.read_all().decode(errors="ignore")
-    print("ESP32 →", reply.strip())
+def send(cmd):
+    result = esp.send(cmd)
+    print(f"ESP32 → {result.reply or ''} ({result.status}, {result.seconds * 1000:.0f} ms)")
 
 print("Connected. Sending commands...")
 
 send("run")        # Motor ON
 time.sleep(3)      # run duration
 send("state")
-time.sleep(0.2)
 
 send("stop")       # Motor OFF
-time.sleep(0.2)
 send("state")
 
 esp.close()
@@ -0,0 +1,260 @@
+"""
+Advice cache for the LLM farmer-advice path, keyed on the quantized sensor state.
+
+Generating advice takes seconds to minutes on CPU, but the sensor state it is
+asked about changes slowly. Readings are bucketed into a key:
+
+    temperature  TEMP_STEP °C
+    humidity     HUMIDITY_STEP %
+    moisture     MOISTURE_STEP %
+    + language and crop, the model that answers and the bucket sizes
+
+The prompt is built from the bucket values (``quantize``), not the raw
+reading, so everything under one key really gets the same question. Scripts
+with different models (app.py, cht.py) can share the cache file without
+answering for each other.
+
+``AdviceCache`` is an LRU with a TTL (MAX_ENTRIES, TTL_SECONDS). It is
+persisted in SQLite, so a restart keeps the answers. ``get_or_generate``
+is single-flight: concurrent requests for a key that is being generated
+wait for that one generation instead of starting their own.
+
+    python advice_cache.py                          # replay data.json with a stub generator
+    python advice_cache.py --synthetic 20000 --languages Hindi Tamil --crops rice wheat
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+# --- Config ---
+BASE_DIR = Path(__file__).resolve().parent.parent / "smart_agriculture_project"
+RAW_JSON_FILE = BASE_DIR / "data" / "raw" / "data.json"
+CACHE_FILE = BASE_DIR / "data" / "cache" / "advice_cache.db"
+TEMP_STEP = 1.0        # °C per bucket
+HUMIDITY_STEP = 5.0    # % per bucket
+MOISTURE_STEP = 5.0    # % per bucket
+MAX_ENTRIES = 5000     # LRU size (in memory and on disk)
+TTL_SECONDS = 24 * 3600  # advice older than this is generated again
+DEFAULT_LANGUAGE = "local language"  # as the original cht.py prompt
+
+# sensor names in data.json / the collector records -> prompt fields
+FIELDS = {"temperature": "TEMP_C", "humidity": "HUMIDITY", "moisture": "SOIL_PCT"}
+STEPS = {"temperature": TEMP_STEP, "humidity": HUMIDITY_STEP, "moisture": MOISTURE_STEP}
+
+
+def quantize(reading, steps=None):
+    """
+    {temperature, humidity, moisture} rounded to their bucket centres. Takes
+    either the prompt names or the sensor names (TEMP_C, HUMIDITY, SOIL_PCT).
+    """
+    steps = steps or STEPS
+    state = {}
+    for name, sensor in FIELDS.items():
+        value = float(reading[name] if name in reading else reading[sensor])
+        step = steps[name]
+        state[name] = round(round(value / step) * step, 3)
+    return state
+
+
+def advice_key(state, language=DEFAULT_LANGUAGE, crop=None, model=None, steps=None):
+    """Cache key for a state quantized with ``steps`` (see ``quantize``), answered by ``model``."""
+    steps = steps or STEPS
+    return "|".join([f"model={model or '-'}",
+                     f"steps={steps['temperature']:g}/{steps['humidity']:g}/{steps['moisture']:g}",
+                     f"t={state['temperature']:g}", f"h={state['humidity']:g}", f"m={state['moisture']:g}",
+                     f"lang={language.strip().lower()}", f"crop={(crop or '-').strip().lower()}"])
+
+
+def advice_prompt(state, language=DEFAULT_LANGUAGE, crop=None):
+    crop_line = f"Crop: {crop}\n" if crop else ""
+    return (f"Temperature: {state['temperature']:g}°C\n"
+            f"Humidity: {state['humidity']:g}%\n"
+            f"Soil Moisture: {state['moisture']:g}%\n"
+            f"{crop_line}"
+            f"Give advice in {language} for farmers.\n")
+
+
+class AdviceCache:
+    """LRU + TTL advice cache persisted in SQLite, with single-flight generation."""
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, steps=None, model=None,
+                 clock=time.time):
+        self.steps = steps or STEPS
+        self.model = model  # part of every key: each model keeps its own answers
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (advice, created), least recently used first
+        self._inflight = {}            # key -> Future of the running generation
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.expired = self.evicted = 0
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS advice "
+                             "(key TEXT PRIMARY KEY, advice TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)")
+            self._load()
+
+    def _load(self):
+        """Newest-used entries that are still fresh; older ones are dropped from the file."""
+        cutoff = self.clock() - self.ttl
+        with self._db:
+            self._db.execute("DELETE FROM advice WHERE created < ?", (cutoff,))
+            rows = self._db.execute("SELECT key, advice, created FROM advice ORDER BY used DESC LIMIT ?",
+                                    (self.max_entries,)).fetchall()
+            self._db.execute("DELETE FROM advice WHERE key NOT IN "
+                             "(SELECT key FROM advice ORDER BY used DESC LIMIT ?)", (self.max_entries,))
+        for key, advice, created in reversed(rows):
+            self._entries[key] = (advice, created)
+
+    def _fresh(self, key):
+        """Cached advice for ``key`` (marked as recently used), or None. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.clock() - entry[1] > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM advice WHERE key = ?", (key,))
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, key):
+        with self._lock:
+            return self._fresh(key)
+
+    def put(self, key, advice):
+        now = self.clock()
+        with self._lock:
+            self._entries[key] = (advice, now)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self.evicted += len(evicted)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO advice VALUES (?, ?, ?, ?)", (key, advice, now, now))
+                    self._db.executemany("DELETE FROM advice WHERE key = ?", [(k,) for k in evicted])
+
+    def get_or_generate(self, key, generate):
+        """
+        Cached advice for ``key``, else ``generate()``'s result (stored). A
+        request that finds the key being generated waits for that generation.
+        """
+        with self._lock:
+            advice = self._fresh(key)
+            if advice is not None:
+                self.hits += 1
+                if self._db is not None:  # keep the on-disk LRU order close to the in-memory one
+                    with self._db:
+                        self._db.execute("UPDATE advice SET used = ? WHERE key = ?", (self.clock(), key))
+                return advice
+            running = self._inflight.get(key)
+            if running is None:
+                self.misses += 1
+                running = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            return running.result()
+        try:
+            advice = generate()
+            self.put(key, advice)
+            running.set_result(advice)
+            return advice
+        except BaseException as e:
+            running.set_exception(e)  # the waiters see the same failure; nothing is cached
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def advice(self, reading, generate, language=DEFAULT_LANGUAGE, crop=None):
+        """
+        Advice for a raw reading: quantize, then ``generate(prompt)`` on a miss.
+        ``generate`` gets the prompt built from the bucket values.
+        """
+        state = quantize(reading, self.steps)
+        prompt = advice_prompt(state, language, crop)
+        key = advice_key(state, language, crop, self.model, self.steps)
+        return self.get_or_generate(key, lambda: generate(prompt))
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "expired": self.expired, "evicted": self.evicted,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0}
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+
+def stub_generator(seconds=0.0):
+    """Stand-in for the model: echoes the prompt after ``seconds``."""
+    def generate(prompt):
+        time.sleep(seconds)
+        return "advice for: " + prompt.replace("\n", " ").strip()
+    return generate
+
+
+def replay(readings, cache, generate, languages=(DEFAULT_LANGUAGE,), crops=(None,), concurrency=1):
+    """Ask for advice on every reading, cycling through the language / crop combinations."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    combos = [(lang, crop) for lang in languages for crop in crops]
+
+    def ask(i):
+        language, crop = combos[i % len(combos)]
+        return cache.advice(readings[i], generate, language, crop)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(ask, range(len(readings))))
+    return cache.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", type=Path, default=RAW_JSON_FILE, help="readings to replay")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="replay this many synthetic readings learned from --source instead")
+    parser.add_argument("--languages", nargs="+", default=[DEFAULT_LANGUAGE])
+    parser.add_argument("--crops", nargs="+", default=[None])
+    parser.add_argument("--generate-seconds", type=float, default=0.0, help="stub generation time")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--cache-file", type=Path, default=None, help="persist here (default: in memory only)")
+    args = parser.parse_args()
+
+    readings = json.loads(args.source.read_text())
+    if args.synthetic:
+        import sys
+        sys.path.insert(0, str(BASE_DIR / "scripts"))
+        from synthetic_sensors import SensorModel
+        readings = list(SensorModel.fit(readings).records(1, args.synthetic))
+
+    print(f"{len(readings):,} readings, {len(args.languages)} language(s) x {len(args.crops)} crop(s)")
+    print(f"{'buckets (T/H/M)':<18} {'keys':>7} {'hits':>8} {'coalesced':>10} {'misses':>8} {'hit rate':>9}")
+    for scale in (0.5, 1.0, 2.0):
+        steps = {name: step * scale for name, step in STEPS.items()}
+        cache = AdviceCache(args.cache_file if scale == 1.0 else None, steps=steps)
+        t0 = time.perf_counter()
+        s = replay(readings, cache, stub_generator(args.generate_seconds), args.languages, args.crops,
+                   args.concurrency)
+        cache.close()
+        label = f"{steps['temperature']:g}/{steps['humidity']:g}/{steps['moisture']:g}"
+        print(f"{label:<18} {s['entries']:>7,} {s['hits']:>8,} {s['coalesced']:>10,} {s['misses']:>8,} "
+              f"{s['hit_rate']:>9.1%}  ({time.perf_counter() - t0:.1f} s)")
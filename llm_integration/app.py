@@ -1,15 +1,32 @@
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+import threading
+
+from advice_cache import DEFAULT_LANGUAGE, AdviceCache
+from llm_server import LLMServer, load_model
 
 # Small model, CPU-friendly
 model_name = "google/flan-t5-large"  # ~1.5GB, can switch to 'flan-t5-small' for ~250MB
+int8 = False  # dynamic int8 quantization: smaller and usually faster on CPU
+
+# One model, loaded on first use; concurrent callers are batched together (llm_server.py)
+server = None
+_server_lock = threading.Lock()
 
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+def get_server():
+    global server
+    with _server_lock:
+        if server is None:
+            model, tokenizer = load_model(model_name, int8)
+            server = LLMServer(model, tokenizer).start()
+    return server
 
 def chat(prompt, max_length=150):
-    inputs = tokenizer(prompt, return_tensors="pt")
-    outputs = model.generate(**inputs, max_length=max_length)
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+    return get_server().generate_blocking(prompt, max_new_tokens=max_length)
+
+advice_cache = AdviceCache(model=model_name)
+
+def advise(reading, language=DEFAULT_LANGUAGE, crop=None):
+    """Farmer advice for a sensor reading; repeated sensor states come from the cache."""
+    return advice_cache.advice(reading, chat, language, crop)
 
 # Example usage
 if __name__ == "__main__":
@@ -17,5 +34,7 @@ if __name__ == "__main__":
         user_input = input("You: ")
         if user_input.lower() in ["exit", "quit"]:
             break
-        response = chat(user_input)
-        print(f"Bot: {response}")
+        print("Bot: ", end="", flush=True)
+        for piece in get_server().submit(user_input).pieces():
+            print(piece, end="", flush=True)
+        print()
@@ -1,18 +1,28 @@
 import json
 from transformers import pipeline
 
-chatbot = pipeline("text-generation", model="sarvamai/sarvam-m", device=-1)
+from advice_cache import DEFAULT_LANGUAGE, RAW_JSON_FILE, AdviceCache
 
-# Read Arduino/ESP32 JSON data
-with open("data/raw/data.json") as f:
-    sensor = json.load(f)
+LANGUAGE = DEFAULT_LANGUAGE
+CROP = None  # e.g. "rice"; part of the cache key
+MODEL_NAME = "sarvamai/sarvam-m"
 
-prompt = f"""
-Temperature: {sensor['temperature']}°C
-Humidity: {sensor['humidity']}%
-Soil Moisture: {sensor['moisture']}%
-Give advice in local language for farmers.
-"""
+chatbot = None
 
-response = chatbot(prompt, max_length=150)[0]["generated_text"]
+
+def generate(prompt):
+    # the model is only loaded when the cache cannot answer
+    global chatbot
+    if chatbot is None:
+        chatbot = pipeline("text-generation", model=MODEL_NAME, device=-1)
+    return chatbot(prompt, max_length=150)[0]["generated_text"]
+
+
+# Latest Arduino/ESP32 reading (data.json holds the recorded readings)
+with open(RAW_JSON_FILE) as f:
+    sensor = json.load(f)[-1]
+
+cache = AdviceCache(model=MODEL_NAME)
+response = cache.advice(sensor, generate, LANGUAGE, CROP)
+cache.close()
 print(response)
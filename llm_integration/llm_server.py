@@ -0,0 +1,379 @@
+"""
+Local LLM inference service: one model, dynamic batching, token streaming.
+
+The model is loaded once. Requests from any number of callers are queued;
+a worker thread takes up to MAX_BATCH of them (waiting at most MAX_WAIT_MS
+for the batch to fill) and decodes them together, greedy, with the KV cache.
+Every new token goes back to its caller as soon as the step that produced
+it finishes. Rows that are done (EOS or their token limit) leave the batch,
+so short answers stop costing compute. Requests that arrive meanwhile form
+the next batch.
+
+Shared system prompt (``share_prefix``, on by default). Every request starts
+with SYSTEM_PROMPT, and it is computed once:
+
+    decoder-only models     its KV cache is computed once and copied into each
+                            batch; the output is the same as without sharing
+    encoder-decoder (T5)    its encoder states are computed once; each question
+                            is encoded on its own and the decoder attends to
+                            both. The question no longer attends to the system
+                            prompt inside the encoder, so answers can differ
+                            slightly from encoding both together
+                            (``share_prefix=False``)
+
+``int8=True`` applies PyTorch dynamic int8 quantization to the Linear layers
+(CPU only): weights are stored in int8, activations are quantized per batch.
+
+    python llm_server.py --chat                          # interactive, streamed (like app.py)
+    python llm_server.py --port 8100 --int8              # HTTP: POST /generate
+    curl -N localhost:8100/generate -d '{"prompt": "Soil is dry, 35°C. What now?", "stream": true}'
+"""
+import argparse
+import asyncio
+import copy
+import queue
+import threading
+import time
+
+import torch
+
+# --- Config ---
+MODEL_NAME = "google/flan-t5-large"
+SYSTEM_PROMPT = "You are an agricultural assistant. Give farmers short, practical advice.\n"
+MAX_BATCH = 8          # requests decoded together
+MAX_WAIT_MS = 20.0     # how long a request waits for others to join its batch
+MAX_NEW_TOKENS = 150
+
+_DONE = object()
+
+
+def load_model(name=MODEL_NAME, int8=False):
+    """(model, tokenizer) for a seq2seq or causal LM checkpoint, in eval mode."""
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    config = AutoConfig.from_pretrained(name)
+    cls = AutoModelForSeq2SeqLM if config.is_encoder_decoder else AutoModelForCausalLM
+    model = cls.from_pretrained(name).eval()
+    return (quantize_int8(model) if int8 else model), tokenizer
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every nn.Linear (CPU inference)."""
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class Request:
+    """One generation; its text arrives piece by piece through ``pieces()`` / ``apieces()``."""
+
+    def __init__(self, prompt, max_new_tokens, ignore_eos=False, loop=None):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.ignore_eos = ignore_eos  # benchmarks: always produce max_new_tokens
+        self.tokens = []
+        self.text = ""
+        self.submitted = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self._loop = loop
+        self._queue = asyncio.Queue() if loop is not None else queue.Queue()
+
+    def _push(self, item):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        else:
+            self._queue.put_nowait(item)
+
+    def _finish(self, error=None):
+        self.finished_at = time.perf_counter()
+        self._push(error if error is not None else _DONE)
+
+    def pieces(self):
+        """Blocking iterator over the generated text pieces (thread callers)."""
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def apieces(self):
+        """Async iterator over the generated text pieces (event-loop callers)."""
+        while True:
+            item = await self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+class LLMServer:
+    """Queues requests and decodes them in dynamic batches on one worker thread."""
+
+    def __init__(self, model, tokenizer, system_prompt=SYSTEM_PROMPT, max_batch=MAX_BATCH,
+                 max_wait_ms=MAX_WAIT_MS, max_new_tokens=MAX_NEW_TOKENS, share_prefix=True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.system_prompt = system_prompt
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_new_tokens = max_new_tokens
+        self.share_prefix = share_prefix and bool(system_prompt)
+        self.encoder_decoder = model.config.is_encoder_decoder
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.eos_id = tokenizer.eos_token_id
+        self._pending = queue.Queue()
+        self._thread = None
+        self._prefix = None  # encoder states / KV cache of the system prompt, built on first use
+        self.batches = 0
+        self.rows = 0
+        self.generated = 0
+
+    # ---------------- client side ----------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="llm-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, prompt, max_new_tokens=None, ignore_eos=False, loop=None):
+        """Queue a prompt; read the answer from the returned ``Request``."""
+        request = Request(prompt, max_new_tokens or self.max_new_tokens, ignore_eos, loop)
+        self._pending.put(request)
+        return request
+
+    async def stream(self, prompt, max_new_tokens=None):
+        request = self.submit(prompt, max_new_tokens, loop=asyncio.get_running_loop())
+        async for piece in request.apieces():
+            yield piece
+
+    async def generate(self, prompt, max_new_tokens=None):
+        return "".join([piece async for piece in self.stream(prompt, max_new_tokens)])
+
+    def generate_blocking(self, prompt, max_new_tokens=None):
+        return "".join(self.submit(prompt, max_new_tokens).pieces())
+
+    def stats(self):
+        return {"batches": self.batches, "requests": self.rows, "tokens": self.generated,
+                "avg_batch": self.rows / self.batches if self.batches else 0.0,
+                "queued": self._pending.qsize()}
+
+    # ---------------- worker ----------------
+    def _collect(self):
+        """First queued request plus whatever arrives within the wait window; None to stop."""
+        first = self._pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._pending.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._pending.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        with torch.inference_mode():
+            while True:
+                batch = self._collect()
+                if batch is None:
+                    return
+                try:
+                    if self.encoder_decoder:
+                        self._run_seq2seq(batch)
+                    else:
+                        self._run_causal(batch)
+                except Exception as e:
+                    for request in batch:
+                        if request.finished_at is None:
+                            request._finish(e)
+                self.batches += 1
+                self.rows += len(batch)
+
+    def _ids(self, texts, special):
+        return self.tokenizer(texts, add_special_tokens=special)["input_ids"]
+
+    def _pad(self, seqs, left):
+        width = max(len(s) for s in seqs)
+        ids = torch.full((len(seqs), width), self.pad_id, dtype=torch.long)
+        mask = torch.zeros((len(seqs), width), dtype=torch.long)
+        for i, s in enumerate(seqs):
+            span = slice(width - len(s), width) if left else slice(0, len(s))
+            ids[i, span] = torch.tensor(s, dtype=torch.long)
+            mask[i, span] = 1
+        return ids, mask
+
+    def _advance(self, requests, next_tokens):
+        """Hand each request its new token; returns the positions of the requests still running."""
+        running = []
+        now = time.perf_counter()
+        for i, (request, token) in enumerate(zip(requests, next_tokens.tolist())):
+            if token == self.eos_id and not request.ignore_eos:
+                request._finish()
+                continue
+            request.tokens.append(token)
+            self.generated += 1
+            if request.first_token_at is None:
+                request.first_token_at = now
+            done = len(request.tokens) >= request.max_new_tokens
+            text = self.tokenizer.decode(request.tokens, skip_special_tokens=True)
+            if done or not text.endswith("\ufffd"):  # hold back half a multi-byte character
+                piece, request.text = text[len(request.text):], text
+                if piece:
+                    request._push(piece)
+            if done:
+                request._finish()
+            else:
+                running.append(i)
+        return running
+
+    def _run_seq2seq(self, requests):
+        from transformers.modeling_outputs import BaseModelOutput
+
+        encoder = self.model.get_encoder()
+        prompts = [r.prompt for r in requests]
+        if self.share_prefix:
+            if self._prefix is None:
+                ids = torch.tensor([self._ids(self.system_prompt, special=False)])
+                self._prefix = encoder(input_ids=ids).last_hidden_state
+            ids, mask = self._pad(self._ids(prompts, special=True), left=False)
+            states = encoder(input_ids=ids, attention_mask=mask).last_hidden_state
+            n = len(requests)
+            states = torch.cat([self._prefix.expand(n, -1, -1), states], dim=1)
+            mask = torch.cat([torch.ones((n, self._prefix.shape[1]), dtype=torch.long), mask], dim=1)
+        else:
+            ids, mask = self._pad(self._ids([self.system_prompt + p for p in prompts], special=True), left=False)
+            states = encoder(input_ids=ids, attention_mask=mask).last_hidden_state
+
+        start = self.model.config.decoder_start_token_id
+        decoder_ids = torch.full((len(requests), 1), start, dtype=torch.long)
+        past = None
+        for _ in range(max(r.max_new_tokens for r in requests)):
+            out = self.model(encoder_outputs=BaseModelOutput(last_hidden_state=states), attention_mask=mask,
+                             decoder_input_ids=decoder_ids, past_key_values=past, use_cache=True)
+            past = out.past_key_values
+            next_tokens = out.logits[:, -1, :].argmax(dim=-1)
+            running = self._advance(requests, next_tokens)
+            if not running:
+                return
+            if len(running) < len(requests):
+                keep = torch.tensor(running)
+                past.batch_select_indices(keep)
+                states, mask, next_tokens = states[keep], mask[keep], next_tokens[keep]
+                requests = [requests[i] for i in running]
+            decoder_ids = next_tokens[:, None]
+
+    def _run_causal(self, requests):
+        prompts = [r.prompt for r in requests]
+        n = len(requests)
+        if self.share_prefix:
+            if self._prefix is None:
+                ids = torch.tensor([self._ids(self.system_prompt, special=True)])
+                self._prefix = self.model(input_ids=ids, use_cache=True).past_key_values
+            prefix_len = self._prefix.get_seq_length()
+            ids, user_mask = self._pad(self._ids(prompts, special=False), left=True)
+            past = copy.deepcopy(self._prefix)
+            past.batch_repeat_interleave(n)
+            mask = torch.cat([torch.ones((n, prefix_len), dtype=torch.long), user_mask], dim=1)
+        else:
+            prefix_len = 0
+            ids, user_mask = self._pad(self._ids([self.system_prompt + p for p in prompts], special=True), left=True)
+            past = None
+            mask = user_mask
+        # left padding: real tokens continue right after the prefix
+        positions = (user_mask.cumsum(dim=-1) - 1).clamp(min=0) + prefix_len
+
+        for _ in range(max(r.max_new_tokens for r in requests)):
+            out = self.model(input_ids=ids, attention_mask=mask, position_ids=positions, past_key_values=past,
+                             use_cache=True)
+            past = out.past_key_values
+            next_tokens = out.logits[:, -1, :].argmax(dim=-1)
+            running = self._advance(requests, next_tokens)
+            if not running:
+                return
+            if len(running) < len(requests):
+                keep = torch.tensor(running)
+                past.batch_select_indices(keep)
+                mask, positions, next_tokens = mask[keep], positions[keep], next_tokens[keep]
+                requests = [requests[i] for i in running]
+            ids = next_tokens[:, None]
+            mask = torch.cat([mask, torch.ones((len(requests), 1), dtype=torch.long)], dim=1)
+            positions = positions[:, -1:] + 1
+
+
+def create_app(server):
+    """FastAPI app: POST /generate {prompt, max_new_tokens, stream}; GET /stats."""
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel
+
+    class GenerateRequest(BaseModel):
+        prompt: str
+        max_new_tokens: int = MAX_NEW_TOKENS
+        stream: bool = False
+
+    @asynccontextmanager
+    async def lifespan(app):
+        server.start()
+        yield
+        server.stop()
+
+    app = FastAPI(title="Farmer advice LLM", lifespan=lifespan)
+
+    @app.post("/generate")
+    async def generate(body: GenerateRequest):
+        if body.stream:
+            return StreamingResponse(server.stream(body.prompt, body.max_new_tokens), media_type="text/plain")
+        return {"text": await server.generate(body.prompt, body.max_new_tokens)}
+
+    @app.get("/stats")
+    def stats():
+        return server.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--int8", action="store_true", help="dynamic int8 quantization (CPU)")
+    parser.add_argument("--no-shared-prefix", action="store_true", help="encode system prompt + question together")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--chat", action="store_true", help="interactive prompt instead of HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    model, tokenizer = load_model(args.model, args.int8)
+    server = LLMServer(model, tokenizer, max_batch=args.max_batch, share_prefix=not args.no_shared_prefix)
+    if args.chat:
+        server.start()
+        while True:
+            user_input = input("You: ")
+            if user_input.lower() in ["exit", "quit"]:
+                break
+            print("Bot: ", end="", flush=True)
+            for piece in server.submit(user_input).pieces():
+                print(piece, end="", flush=True)
+            print()
+        server.stop()
+    else:
+        import uvicorn
+        uvicorn.run(create_app(server), host=args.host, port=args.port)
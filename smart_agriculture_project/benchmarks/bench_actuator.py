@@ -0,0 +1,119 @@
+# smart_agriculture_project/benchmarks/bench_actuator.py
+"""
+Pump command latency: persistent queued ActuatorClient (actuator.py) vs. opening the port per command.
+
+A fake ESP32 on a pty pair answers every command line with "OK <command>".
+With ``--drop N`` it ignores every Nth command, to exercise timeout + retry.
+The legacy path is trainmodel1.send_command as it was: open the port, sleep
+2 s for the board reset, write, sleep 0.5 s, then read replies for 2 s.
+
+    python bench_actuator.py
+    python bench_actuator.py --commands 1000 --drop 50 --concurrency 8
+    python bench_actuator.py --legacy 3
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import sys
+import time
+import tty
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from actuator import ActuatorClient  # noqa: E402
+
+
+def fake_esp32(master, drop, reply_delay):
+    """Reply "OK <cmd>" to each command line; skip every ``drop``-th one."""
+    pending, seen = b"", 0
+    while True:
+        try:
+            data = os.read(master, 4096)
+        except OSError:
+            return
+        if not data:
+            return
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            seen += 1
+            if drop and seen % drop == 0:
+                continue
+            if reply_delay:
+                time.sleep(reply_delay)
+            os.write(master, b"OK " + line.strip() + b"\r\n")
+
+
+def legacy_send(port, cmd):
+    """trainmodel1.send_command before the actuator client."""
+    import serial
+
+    with serial.Serial(port, 115200, timeout=1) as ser:
+        time.sleep(2)  # wait for ESP32 reset
+        ser.write((cmd + "\n").encode())
+        time.sleep(0.5)
+        end = time.time() + 2
+        while time.time() < end:
+            if ser.in_waiting > 0:
+                ser.readline()
+
+
+async def bench_client(port, commands, concurrency, ack_timeout):
+    client = ActuatorClient(port, ack_timeout=ack_timeout, retries=2)
+    await client.start()
+    await asyncio.wait_for(client.connected.wait(), 5)
+    results = []
+
+    async def worker(n):
+        for i in range(n):
+            results.append(await client.send("ON" if i % 2 == 0 else "OFF"))
+
+    per = commands // concurrency
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(per) for _ in range(concurrency)))
+    took = time.perf_counter() - t0
+    stats = client.stats()
+    await client.stop()
+    return results, took, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4, help="callers sending at the same time")
+    parser.add_argument("--drop", type=int, default=0, help="fake board ignores every Nth command")
+    parser.add_argument("--ack-timeout", type=float, default=0.2)
+    parser.add_argument("--reply-delay", type=float, default=0.0, help="board processing time per command")
+    parser.add_argument("--legacy", type=int, default=0, help="also time N open-per-command sends")
+    args = parser.parse_args()
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    port = os.ttyname(slave)
+    board = mp.get_context("fork").Process(target=fake_esp32, args=(master, args.drop, args.reply_delay), daemon=True)
+    board.start()
+
+    results, took, stats = asyncio.run(bench_client(port, args.commands, args.concurrency, args.ack_timeout))
+    lat = np.asarray([r.seconds for r in results]) * 1000
+    ok = sum(r.ok for r in results)
+    retried = sum(r.attempts > 1 for r in results)
+    print(f"persistent client: {len(results)} commands from {args.concurrency} callers in {took:.2f} s "
+          f"({len(results) / took:,.0f}/s)")
+    print(f"  acked {ok}, retried {retried}, writes {stats['sent']}; "
+          f"queued -> ack p50 {np.percentile(lat, 50):.2f} ms, p99 {np.percentile(lat, 99):.2f} ms, "
+          f"max {lat.max():.2f} ms")
+
+    if args.legacy:
+        times = []
+        for i in range(args.legacy):
+            t0 = time.perf_counter()
+            legacy_send(port, "ON" if i % 2 == 0 else "OFF")
+            times.append(time.perf_counter() - t0)
+        print(f"open per command: {args.legacy} commands, {np.mean(times):.2f} s each "
+              f"(plus a board reset every time on real hardware)")
+    board.terminate()
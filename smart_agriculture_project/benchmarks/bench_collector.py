@@ -0,0 +1,132 @@
+# smart_agriculture_project/benchmarks/bench_collector.py
+"""
+Throughput and latency of the asyncio serial collector (serial_collector.py) with many devices.
+
+Every simulated ESP32 is a pty pair: the collector opens the slave side like a
+real serial port, and a separate simulator process writes collector lines to
+the master side at ``--rate`` lines/s per device (0 = as fast as possible).
+Records go through the real storage path (segment log + SQLite) in a temp
+folder. Each line carries its send time, so the benchmark reports
+send-to-stored latency as well as throughput. POSIX only (ptys).
+
+    python bench_collector.py                        # 64 devices at 50 lines/s each
+    python bench_collector.py --devices 100 --rate 0 --seconds 10
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+import tty
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from sensor_db import ReadingWriter  # noqa: E402
+from sensor_log import SegmentLogWriter  # noqa: E402
+from serial_collector import Collector, StorageWriter  # noqa: E402
+
+
+def simulate(masters, rate, seconds, start_at):
+    """Write lines to every pty master for ``seconds`` (or until terminated)."""
+    while time.time() < start_at:
+        time.sleep(0.01)
+    end = start_at + seconds
+    i = 0
+    interval = 1.0 / rate if rate else 0.0
+    next_tick = time.time()
+    while time.time() < end:
+        now = time.time()
+        for fd in masters:
+            line = (f"ts=00:00:{i % 60:02d};TEMP_C=24.{i % 10};HUMIDITY=61.2;SOIL_PCT={i % 100};"
+                    f"SOIL_STATUS=Wet;LDR=2048;LIGHT_LEVEL=Bright;SENT={now:.6f}\n")
+            os.write(fd, line.encode())  # blocks when the pty buffer is full (backpressure)
+        i += 1
+        if interval:
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.time()))
+
+
+class TimedStorage(StorageWriter):
+    """StorageWriter that records the send-to-stored latency of every record."""
+
+    latencies = []
+
+    def _store(self, batch):
+        super()._store(batch)
+        now = time.time()
+        self.latencies.extend(now - float(r["SENT"]) for r in batch if "SENT" in r)
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system
+
+
+async def run(args, slaves, workdir):
+    log = SegmentLogWriter(workdir / "segments")
+    db = ReadingWriter(workdir / "bench.db", check_same_thread=False) if not args.no_db else None
+    storage = TimedStorage(asyncio.Queue(args.queue), log, db)
+    collector = Collector(storage, ports={s: f"esp32-{i:03d}" for i, s in enumerate(slaves)}, reconnect_delay=0.5)
+    task = asyncio.create_task(collector.run())
+    await asyncio.sleep(args.warmup)
+    storage.latencies.clear()
+    stored0, cpu0, t0 = storage.stored, cpu_seconds(), time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    stored, cpu, took = storage.stored - stored0, cpu_seconds() - cpu0, time.perf_counter() - t0
+    stats = collector.stats()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    storage.close()
+    stats["inserted"] = db.written if db is not None else None  # rows SQLite really took
+    stats["stored_total"] = storage.stored
+    return stored, took, cpu, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=50, help="lines/s per device (0 = flat out)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--queue", type=int, default=10_000, help="collector queue size")
+    parser.add_argument("--no-db", action="store_true", help="segment log only")
+    args = parser.parse_args()
+
+    masters, slaves = [], []
+    for _ in range(args.devices):
+        master, slave = os.openpty()
+        tty.setraw(slave)  # no echo / line editing, like a real UART
+        masters.append(master)
+        slaves.append(os.ttyname(slave))
+
+    # start sending once the collector has had a moment to open the ports
+    sim = mp.get_context("fork").Process(
+        target=simulate, args=(masters, args.rate, args.warmup + args.seconds + 5, time.time() + 0.5))
+    sim.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            stored, took, cpu, stats = asyncio.run(run(args, slaves, Path(tmp)))
+    finally:
+        sim.terminate()  # it may be blocked writing to ports nobody reads any more
+        sim.join()
+
+    lat = np.asarray(TimedStorage.latencies) * 1000
+    offered = f"{args.devices * args.rate:,.0f}/s offered" if args.rate else "flat out"
+    print(f"{args.devices} devices, {offered}, storage: log{'' if args.no_db else ' + SQLite'}")
+    print(f"stored {stored / took:,.0f} records/s, collector CPU {cpu / took * 100:.0f}% "
+          f"({cpu / max(stored, 1) * 1e6:.1f} us/record)")
+    if len(lat):
+        print(f"send -> stored latency: p50 {np.percentile(lat, 50):.1f} ms, "
+              f"p99 {np.percentile(lat, 99):.1f} ms, max {lat.max():.1f} ms")
+    if stats["inserted"] is not None:
+        lost = stats["stored_total"] - stats["inserted"]
+        print(f"SQLite rows inserted {stats['inserted']:,} of {stats['stored_total']:,} stored"
+              + (f"  ({lost:,} LOST to duplicate keys)" if lost else ""))
+    print(f"queue at end {stats['queued']}, readers blocked on a full queue {stats['blocked_s']} s, "
+          f"malformed frames {stats['malformed']}")
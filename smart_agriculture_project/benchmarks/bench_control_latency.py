@@ -0,0 +1,153 @@
+# smart_agriculture_project/benchmarks/bench_control_latency.py
+"""
+Sensor-reading -> pump-command latency of the event-driven controller (irrigation_control.py).
+
+A fake ESP32 on a pty pair sends readings that alternate between dry and wet
+soil. With the minimum on/off times set to 0, every reading should switch the
+pump. The fake device timestamps each reading when it writes it and each
+command when it reads it (then acknowledges the command), so the latency
+includes the serial path as well as parse, feature, predict and actuate.
+``--background`` adds readings that do not change the decision, to load the
+loop. The controller's own per-stage histograms are printed as well.
+
+``--legacy`` runs Run.py's previous loop instead (poll in_waiting, readline,
+predict, then sleep READ_INTERVAL) with the same device.
+
+    python bench_control_latency.py
+    python bench_control_latency.py --readings 200 --background 100
+    python bench_control_latency.py --legacy --readings 10
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import select
+import sys
+import threading
+import time
+import tty
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from actuator import ActuatorClient  # noqa: E402
+from irrigation_control import E2E, ControlLoop, PumpController, latency_report  # noqa: E402
+from model_registry import get_model  # noqa: E402
+
+MODEL_NAME = "xgb_water"
+DRY = "ts=00:00:{i:02d}; TEMP_C=30.0; HUMIDITY=40.0; SOIL_PCT=0; SOIL_STATUS=Dry; LDR=2000; LIGHT_LEVEL=Bright\n"
+WET = "ts=00:00:{i:02d}; TEMP_C=22.0; HUMIDITY=70.0; SOIL_PCT=70; SOIL_STATUS=Wet; LDR=2000; LIGHT_LEVEL=Bright\n"
+
+
+def fake_esp32(master, readings, background, gap, results):
+    """Send dry/wet readings and time how long each takes to come back as a command."""
+    time.sleep(0.5)  # let the controller open the port
+    os.write(master, b"boot\n")  # first line after open is dropped by the decoder
+    stop = threading.Event()
+
+    def chatter():  # readings that never change the decision
+        while not stop.is_set():
+            os.write(master, WET.format(i=0).encode())
+            time.sleep(1.0 / background)
+
+    latencies, pending = [], b""
+    for i in range(readings):
+        line = (DRY if i % 2 == 0 else WET).format(i=i % 60)
+        expected = b"ON" if i % 2 == 0 else b"OFF"
+        if i == 1 and background:
+            threading.Thread(target=chatter, daemon=True).start()
+        sent = time.perf_counter()
+        os.write(master, line.encode())
+        deadline = sent + 30
+        while expected + b"\n" not in pending and time.perf_counter() < deadline:
+            if select.select([master], [], [], 0.5)[0]:
+                pending += os.read(master, 1024)
+        if expected + b"\n" in pending:
+            latencies.append(time.perf_counter() - sent)
+            pending = pending.split(expected + b"\n", 1)[1]
+            os.write(master, b"OK " + expected + b"\r\n")  # acknowledge like the firmware
+        time.sleep(gap)
+    stop.set()
+    results.put(latencies)
+
+
+def legacy_loop(port, interval):
+    """Run.py's loop before the controller rewrite (blocking, fixed sleep)."""
+    import serial
+    from sensor_protocol import FrameError, parse_line
+
+    model = get_model(MODEL_NAME)
+    ser = serial.Serial(port, 115200, timeout=1)
+    motor_status = "OFF"
+    while True:
+        if ser.in_waiting > 0:
+            line = ser.readline().decode(errors="replace").strip()
+            try:
+                data = parse_line(line)
+            except FrameError:
+                data = None
+            if data:
+                y_pred = model.predict_one(tuple(data[f] for f in model.features))
+                if y_pred == 1 and motor_status == "OFF":
+                    ser.write(b"ON\n")
+                    motor_status = "ON"
+                elif y_pred == 0 and motor_status == "ON":
+                    ser.write(b"OFF\n")
+                    motor_status = "OFF"
+        time.sleep(interval)
+
+
+async def run_controller(port, done):
+    controller = PumpController(on_threshold=0.6, off_threshold=0.4, min_on=0, min_off=0)
+    loop = ControlLoop(ActuatorClient(port), lambda: get_model(MODEL_NAME), controller)
+    task = asyncio.create_task(loop.run())
+    while not done.is_set():
+        await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return loop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readings", type=int, default=100, help="dry/wet readings (each should switch the pump)")
+    parser.add_argument("--background", type=float, default=50, help="extra readings per second (0 = none)")
+    parser.add_argument("--gap", type=float, default=0.02, help="seconds between switching readings")
+    parser.add_argument("--legacy", action="store_true", help="time the old poll-and-sleep loop")
+    parser.add_argument("--interval", type=float, default=5.0, help="legacy READ_INTERVAL")
+    args = parser.parse_args()
+
+    get_model(MODEL_NAME)  # load before timing
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    port = os.ttyname(slave)
+    results = mp.get_context("fork").Queue()
+    device = mp.get_context("fork").Process(
+        target=fake_esp32, args=(master, args.readings, args.background, args.gap, results))
+    device.start()
+
+    if args.legacy:
+        threading.Thread(target=legacy_loop, args=(port, args.interval), daemon=True).start()
+        latencies = results.get()
+    else:
+        done = threading.Event()
+        waiter = threading.Thread(target=lambda: (setattr(done, "latencies", results.get()), done.set()))
+        waiter.start()
+        loop = asyncio.run(run_controller(port, done))
+        latencies = done.latencies
+    device.join()
+
+    lat = np.asarray(latencies) * 1000
+    mode = f"legacy loop (sleep {args.interval:g} s)" if args.legacy else "event-driven controller"
+    print(f"{mode}: {len(lat)}/{args.readings} readings switched the pump, "
+          f"background {args.background:g} readings/s")
+    if len(lat):
+        print(f"reading written -> command received: p50 {np.percentile(lat, 50):.2f} ms, "
+              f"p99 {np.percentile(lat, 99):.2f} ms, max {lat.max():.2f} ms")
+    if not args.legacy:
+        print(f"\ncontroller stages ({loop.readings} readings, {loop.commands} commands)")
+        print(latency_report())
+        print(f"\ncontrol_e2e_seconds p99 estimate {E2E.quantile(0.99) * 1000:.3f} ms")
@@ -0,0 +1,121 @@
+# smart_agriculture_project/benchmarks/bench_dashboard_push.py
+"""
+Server CPU for N open dashboards: 6-endpoint polling vs. the /sensor/stream push.
+
+Starts the backend with uvicorn in a subprocess and measures that process's
+CPU time (user + system, from /proc) while N simulated dashboards run:
+
+    poll   -- every interval, 6 sequential GETs per dashboard (today's main.js)
+    stream -- one SSE connection per dashboard; the server pushes every interval
+
+A fraction of the stream clients can be made "slow" (they stop reading after
+connecting) to check that they lose frames instead of delaying the others.
+
+    python bench_dashboard_push.py
+    python bench_dashboard_push.py --clients 500 --interval 1 --duration 20 --slow 0.1
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent / "soil-monitoring-app" / "backend"
+POLL_PATHS = ["/sensor/moisture", "/sensor/humidity", "/sensor/temperature",
+              "/sensor/ldr", "/sensor/water", "/switch/mode"]
+
+
+def cpu_seconds(pid):
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def start_server(port, interval):
+    env = dict(os.environ, STREAM_INTERVAL=str(interval), SENSOR_REPLAY="1",
+               SENSOR_REPLAY_IDLE="0")
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=BACKEND_DIR, env=env)
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/switch/mode", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("backend did not start")
+
+
+async def poll_client(c, interval, stop, counts):
+    while not stop.is_set():
+        t0 = time.monotonic()
+        for path in POLL_PATHS:
+            (await c.get(path)).raise_for_status()
+        counts["updates"] += 1
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - t0)))
+
+
+async def stream_client(c, stop, counts, slow):
+    async with c.stream("GET", "/sensor/stream") as r:
+        if slow:
+            await stop.wait()  # connected but never reads: the server must not stall for it
+            return
+        async for line in r.aiter_lines():
+            if line.startswith("data:"):
+                counts["updates"] += 1
+            if stop.is_set():
+                return
+
+
+async def run(mode, port, clients, interval, duration, slow_fraction):
+    proc = start_server(port, interval)
+    counts = {"updates": 0}
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=clients + 10, max_keepalive_connections=clients + 10)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits,
+                                     timeout=httpx.Timeout(30.0)) as c:
+            n_slow = int(clients * slow_fraction) if mode == "stream" else 0
+            if mode == "poll":
+                tasks = [asyncio.create_task(poll_client(c, interval, stop, counts)) for _ in range(clients)]
+            else:
+                tasks = [asyncio.create_task(stream_client(c, stop, counts, i < n_slow)) for i in range(clients)]
+            await asyncio.sleep(min(3.0, duration / 3))  # let every client connect
+            counts["updates"] = 0
+            cpu0, t0 = cpu_seconds(proc.pid), time.monotonic()
+            await asyncio.sleep(duration)
+            cpu, wall = cpu_seconds(proc.pid) - cpu0, time.monotonic() - t0
+            stats = (await c.get("/sensor/stream/stats")).json() if mode == "stream" else {}
+            stop.set()
+            await asyncio.wait(tasks, timeout=interval * 3 + 5)
+            for t in tasks:
+                t.cancel()
+    finally:
+        proc.terminate()
+        proc.wait()
+    fast = clients - n_slow
+    return cpu / wall, counts["updates"] / wall, max(fast, 1), stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between dashboard updates")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--slow", type=float, default=0.1, help="fraction of stream clients that never read")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    print(f"{args.clients} dashboards, update every {args.interval}s, {args.duration}s measured")
+    print(f"{'mode':<8} {'server CPU %':>13} {'updates/s per client':>22} {'CPU ms/update':>14}  notes")
+    for mode in ("poll", "stream"):
+        cpu, total_rate, fast, stats = asyncio.run(run(mode, args.port, args.clients, args.interval,
+                                           args.duration, args.slow))
+        note = f"{stats.get('dropped', 0)} frames dropped for slow clients" if stats else ""
+        per_update = cpu * 1000 / max(total_rate, 1e-9)
+        print(f"{mode:<8} {cpu * 100:>13.1f} {total_rate / fast:>22.2f} {per_update:>14.3f}  {note}")
+    print(f"(expected updates/s per client: {1 / args.interval:.2f}; a lower poll rate means the\n"
+          f" polling clients could not keep up, so compare CPU ms per dashboard update)")
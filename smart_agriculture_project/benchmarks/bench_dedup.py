@@ -0,0 +1,74 @@
+# smart_agriculture_project/benchmarks/bench_dedup.py
+"""
+Dedup cost per record: windowed DedupIndex vs. the old string ``isin`` over history.
+
+    python bench_dedup.py                        # 10M historic rows
+    python bench_dedup.py --history 10000000 --legacy-history 10000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from dedup_index import DedupIndex  # noqa: E402
+
+START_US = 1_763_000_000 * 1_000_000
+STEP_US = 2_000_000  # one reading every 2 s, like the collector
+
+
+def bench_index(history, batch, window):
+    index = DedupIndex(window_seconds=window)
+    print(f"DedupIndex: {history:,} historic rows, window {window}s")
+    print(f"{'rows seen':>12} {'ns/record':>10} {'keys held':>10}")
+
+    chunk = max(1, history // 10)
+    t0 = time.perf_counter()
+    for i in range(history):
+        index.add("field-1", START_US + i * STEP_US)
+        if (i + 1) % chunk == 0:
+            t1 = time.perf_counter()
+            print(f"{i + 1:>12,} {(t1 - t0) / chunk * 1e9:>10.0f} {len(index):>10,}")
+            t0 = t1
+
+    # a fresh batch: mostly new rows, some exact duplicates, some late arrivals inside the window
+    newest = START_US + (history - 1) * STEP_US
+    keys = [newest + (i + 1) * STEP_US for i in range(batch)]
+    keys += [newest - i * STEP_US for i in range(batch // 10)]          # duplicates
+    keys += [newest - i * STEP_US - 1 for i in range(batch // 10)]      # late, unseen
+    t0 = time.perf_counter()
+    flags = index.filter_new(["field-1"] * len(keys), keys)
+    dt = time.perf_counter() - t0
+    print(f"batch of {len(keys):,}: {dt / len(keys) * 1e9:.0f} ns/record, "
+          f"{sum(flags):,} new, {index.duplicates:,} duplicates")
+
+
+def bench_legacy(history, batch):
+    """What preprocess_data.py did per cycle: stringify every historic timestamp, then isin."""
+    existing = pd.DataFrame({"system_timestamp": pd.to_datetime(
+        START_US + np.arange(history, dtype=np.int64) * STEP_US, unit="us")})
+    new = pd.DataFrame({"system_timestamp": pd.to_datetime(
+        START_US + (history + np.arange(batch, dtype=np.int64)) * STEP_US, unit="us")})
+    t0 = time.perf_counter()
+    existing_ts = existing["system_timestamp"].astype(str).tolist()
+    kept = new[~new["system_timestamp"].astype(str).isin(existing_ts)]
+    dt = time.perf_counter() - t0
+    print(f"\nlegacy isin: {history:,} historic rows, batch of {batch:,}: "
+          f"{dt:.2f}s per cycle = {dt / batch * 1e9:,.0f} ns/record ({len(kept):,} kept)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    parser.add_argument("--window", type=float, default=3600)
+    parser.add_argument("--legacy-history", type=int, default=1_000_000,
+                        help="legacy path materialises every timestamp as a string")
+    args = parser.parse_args()
+
+    bench_index(args.history, args.batch, args.window)
+    if args.legacy_history:
+        bench_legacy(args.legacy_history, args.batch)
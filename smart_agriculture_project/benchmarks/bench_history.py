@@ -0,0 +1,99 @@
+# smart_agriculture_project/benchmarks/bench_history.py
+"""
+Memory and query latency of the backend's NumPy history ring vs. a list of record dicts.
+
+Fills a ring with one reading every 2 s and times ``/sensor/history``-style
+queries (range + LTTB / min-max down to a few hundred points). The dict list
+is what sensor_service kept before; its memory is measured on a sample and
+scaled to one million records.
+
+    python bench_history.py
+    python bench_history.py --samples 10000000 --points 300
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent / "soil-monitoring-app" / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.history_service import FIELDS, SeriesRing, lttb, minmax  # noqa: E402
+
+STEP_MS = 2000
+DAY_MS = 86_400_000
+
+
+def rss_mb():
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def dict_list_bytes_per_million(n=100_000):
+    tracemalloc.start()
+    records = [{"ts": "00:05:11", "TEMP_C": str(20 + i % 10), "HUMIDITY": "60.1", "SOIL_PCT": str(i % 100),
+                "SOIL_STATUS": "Wet", "LDR": "2000", "LIGHT_LEVEL": "Bright",
+                "system_timestamp": f"2025-11-14T19:29:{i % 60:02d}.183475"} for i in range(n)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return size / n * 1_000_000
+
+
+def timed(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2_000_000)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=50, help="samples per append (one log poll)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rss0 = rss_mb()
+    ring = SeriesRing(args.samples)
+    ts = np.arange(args.samples, dtype=np.int64) * STEP_MS + 1_700_000_000_000
+    values = np.cumsum(rng.normal(0, 0.05, (args.samples, len(FIELDS))), axis=0).astype(np.float32) + 50
+    t0 = time.perf_counter()
+    for i in range(0, args.samples, args.batch):
+        ring.append(ts[i:i + args.batch], values[i:i + args.batch])
+    fill = time.perf_counter() - t0
+    rss = rss_mb() - rss0 - (ts.nbytes + values.nbytes) / 2**20
+
+    print(f"{args.samples:,} samples ({args.samples * STEP_MS / DAY_MS:.0f} days at 2 s)")
+    print(f"ring: {ring.nbytes / args.samples * 1e6 / 2**20:.1f} MiB per million samples "
+          f"(RSS grew {rss:.0f} MiB); append {fill / args.samples * 1e9:.0f} ns/sample "
+          f"in batches of {args.batch}")
+    print(f"list of record dicts: {dict_list_bytes_per_million() / 2**20:.0f} MiB per million records")
+
+    newest = int(ts[-1])
+    print(f"\n{'query (1 field)':<24} {'samples':>10} {'range ms':>9} {'lttb ms':>9} {'minmax ms':>10}")
+    for days in (1, 7, 28):
+        if days * DAY_MS > args.samples * STEP_MS:
+            continue
+        t_range, (qts, qvals) = timed(lambda: ring.range(newest - days * DAY_MS, newest))
+        y = np.ascontiguousarray(qvals[:, 2])
+        t_lttb, _ = timed(lambda: lttb(qts, y, args.points))
+        t_mm, _ = timed(lambda: minmax(qts, y, args.points))
+        print(f"{'last ' + str(days) + ' days':<24} {len(qts):>10,} {t_range:>9.2f} {t_lttb:>9.2f} {t_mm:>10.2f}")
+
+    # the old alternative: scan a list of dicts and parse every matching record
+    n = min(args.samples, 200_000)
+    records = [{"system_timestamp": str(np.datetime64(int(t), "ms")), "SOIL_PCT": str(v)}
+               for t, v in zip(ts[-n:], values[-n:, 2])]
+    start = str(np.datetime64(newest - 7 * DAY_MS, "ms"))
+    t_scan, _ = timed(lambda: [float(r["SOIL_PCT"]) for r in records if r["system_timestamp"] >= start], 3)
+    print(f"\nlist scan, {n:,} dicts, 7-day filter + float(): {t_scan:.1f} ms "
+          f"(~{t_scan * args.samples / n:.0f} ms at {args.samples:,})")
@@ -0,0 +1,145 @@
+# smart_agriculture_project/benchmarks/bench_llm_server.py
+"""
+LLM serving throughput and time to first token: batched streaming server (llm_server.py) vs. app.py's old path.
+
+Uses a small randomly initialised model (T5 like app.py's flan-t5, or
+``--arch llama`` for a decoder-only model) and a byte-level tokenizer, so
+nothing is downloaded. Answers are meaningless. Every request is
+SYSTEM_PROMPT + a farmer question and produces exactly ``--new-tokens``
+tokens (EOS is ignored), so all modes do the same amount of work.
+
+    sequential   app.py as it was: one model.generate per request, one request
+                 at a time, answer visible only when complete
+    server       LLMServer: dynamic batches, streamed tokens, shared system prompt
+    no-prefix    LLMServer with the system prompt encoded again for every request
+    int8         LLMServer on the dynamically int8-quantized model
+
+For 1, 8 and 32 concurrent requests: generated tokens/s over the whole run
+and time to first token (p50 / p99) from submit to the first generated token.
+
+    python bench_llm_server.py
+    python bench_llm_server.py --arch llama --concurrency 1 8 32 64 --new-tokens 64
+"""
+import argparse
+import asyncio
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import torch
+
+LLM_DIR = Path(__file__).resolve().parent.parent.parent / "llm_integration"
+sys.path.insert(0, str(LLM_DIR))
+
+from llm_server import SYSTEM_PROMPT, LLMServer, quantize_int8  # noqa: E402
+
+QUESTIONS = [
+    "Temperature: 34°C, humidity: 40%, soil moisture: 18%. Should I irrigate the maize today?",
+    "Leaves on my tomato plants are turning yellow after heavy rain. What should I do?",
+    "Soil moisture is 65% and rain is forecast tomorrow. Do I need to run the pump?",
+    "When is the best time of day to water rice seedlings in hot weather?",
+]
+
+
+class ByteTokenizer:
+    """Minimal tokenizer: ids 0/1/2 are pad/eos/unk, byte b is id b + 3."""
+
+    pad_token_id = 0
+    eos_token_id = 1
+    vocab_size = 259
+
+    def __call__(self, texts, add_special_tokens=True):
+        single = isinstance(texts, str)
+        ids = [[b + 3 for b in t.encode()] + ([self.eos_token_id] if add_special_tokens else [])
+               for t in ([texts] if single else texts)]
+        return {"input_ids": ids[0] if single else ids}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return bytes(i - 3 for i in ids if 3 <= i < self.vocab_size).decode(errors="replace")
+
+
+def tiny_model(arch, seed=0):
+    from transformers import LlamaConfig, LlamaForCausalLM, T5Config, T5ForConditionalGeneration
+
+    torch.manual_seed(seed)
+    if arch == "t5":
+        config = T5Config(vocab_size=384, d_model=256, d_kv=32, d_ff=1024, num_layers=4, num_decoder_layers=4,
+                          num_heads=8, decoder_start_token_id=0, pad_token_id=0, eos_token_id=1)
+        return T5ForConditionalGeneration(config).eval()
+    config = LlamaConfig(vocab_size=384, hidden_size=256, intermediate_size=1024, num_hidden_layers=4,
+                         num_attention_heads=8, num_key_value_heads=8, max_position_embeddings=1024,
+                         pad_token_id=0, bos_token_id=2, eos_token_id=1)
+    return LlamaForCausalLM(config).eval()
+
+
+def sequential(model, tokenizer, prompts, new_tokens):
+    """app.py's old chat(): generate each request to completion, one after another."""
+    ttft = []
+    t0 = time.perf_counter()
+    with torch.inference_mode():
+        for prompt in prompts:
+            ids = torch.tensor([tokenizer(SYSTEM_PROMPT + prompt)["input_ids"]])
+            model.generate(input_ids=ids, attention_mask=torch.ones_like(ids), max_new_tokens=new_tokens,
+                           min_new_tokens=new_tokens, do_sample=False, pad_token_id=tokenizer.pad_token_id)
+            ttft.append(time.perf_counter() - t0)  # all requests were submitted at t0
+    return len(prompts) * new_tokens, time.perf_counter() - t0, ttft
+
+
+async def served(server, prompts, new_tokens):
+    """All prompts submitted at once by concurrent clients that read the stream."""
+    loop = asyncio.get_running_loop()
+
+    async def client(prompt):
+        request = server.submit(prompt, new_tokens, ignore_eos=True, loop=loop)
+        async for _ in request.apieces():
+            pass
+        return len(request.tokens), request.first_token_at - request.submitted
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(client(p) for p in prompts))
+    return sum(n for n, _ in results), time.perf_counter() - t0, [f for _, f in results]
+
+
+def run_server(model, tokenizer, prompts, new_tokens, share_prefix):
+    server = LLMServer(model, tokenizer, max_batch=len(prompts), share_prefix=share_prefix).start()
+    try:
+        asyncio.run(served(server, prompts[:1], 2))  # warm up: prefix, first batch
+        return asyncio.run(served(server, prompts, new_tokens))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--arch", choices=["t5", "llama"], default="t5")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--modes", nargs="+", default=["sequential", "server", "no-prefix", "int8"])
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = torch default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    tokenizer = ByteTokenizer()
+    model = tiny_model(args.arch)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # torch.ao.quantization is deprecated upstream
+        model_int8 = quantize_int8(tiny_model(args.arch)) if "int8" in args.modes else None
+
+    params = sum(p.numel() for p in model.parameters())
+    print(f"{args.arch}: {params / 1e6:.1f}M params (random), {torch.get_num_threads()} thread(s), "
+          f"system prompt {len(tokenizer(SYSTEM_PROMPT, False)['input_ids'])} tokens, "
+          f"{args.new_tokens} new tokens per request")
+    print(f"{'mode':<12} {'clients':>7} {'tokens/s':>10} {'TTFT p50':>10} {'TTFT p99':>10} {'wall':>8}")
+    for n in args.concurrency:
+        prompts = [QUESTIONS[i % len(QUESTIONS)] for i in range(n)]
+        for mode in args.modes:
+            if mode == "sequential":
+                tokens, wall, ttft = sequential(model, tokenizer, prompts, args.new_tokens)
+            else:
+                m = model_int8 if mode == "int8" else model
+                tokens, wall, ttft = run_server(m, tokenizer, prompts, args.new_tokens, mode != "no-prefix")
+            p50, p99 = np.percentile(np.array(ttft) * 1000, [50, 99])
+            print(f"{mode:<12} {n:>7} {tokens / wall:>10,.0f} {p50:>8.1f}ms {p99:>8.1f}ms {wall:>7.2f}s")
@@ -0,0 +1,75 @@
+# smart_agriculture_project/benchmarks/bench_predict_api.py
+"""
+Load test for POST /predict: micro-batched vs. one model call per request.
+
+Drives the FastAPI app in-process (httpx ASGI transport) with N concurrent
+clients, each sending single-reading requests back to back.
+
+    python bench_predict_api.py
+    python bench_predict_api.py --clients 200 --requests 20000 --model rf_water
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent / "soil-monitoring-app" / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+async def run_case(max_batch, max_wait_ms, clients, total, model_name):
+    import httpx
+
+    import main
+    from services import inference_service as svc
+
+    svc._predict_fn = svc.load_water_model(model_name)
+    await svc.stop_batcher()
+    svc._batcher = svc.MicroBatcher(svc._predict_fn, max_batch_size=max_batch, max_wait_ms=max_wait_ms)
+    await svc._batcher.start()
+
+    rng = np.random.default_rng(0)
+    bodies = [{"temperature": float(t), "humidity": float(h), "moisture": float(m), "ldr": float(l)}
+              for t, h, m, l in rng.uniform(0, 100, (1024, 4))]
+    latencies = []
+    per_client = total // clients
+
+    async def client(c, i0):
+        for i in range(per_client):
+            t0 = time.perf_counter()
+            r = await c.post("/predict", json=bodies[(i0 + i) % len(bodies)])
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        await c.post("/predict", json=bodies[0])  # warm-up
+        latencies.clear()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client(c, k * 17) for k in range(clients)))
+        elapsed = time.perf_counter() - t0
+
+    stats = svc.batcher_stats()
+    await svc.stop_batcher()
+    lat = np.asarray(latencies) * 1000
+    return len(lat) / elapsed, np.percentile(lat, 50), np.percentile(lat, 99), stats.get("avg_batch", 0.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--model", default="xgb_water")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.requests:,} requests, model {args.model}")
+    print(f"{'mode':<28} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'avg batch':>10}")
+    for name, max_batch, wait in [("per-request (batch 1)", 1, 0.0),
+                                  (f"micro-batched (<= {args.max_batch})", args.max_batch, args.max_wait_ms)]:
+        rps, p50, p99, avg = asyncio.run(run_case(max_batch, wait, args.clients, args.requests, args.model))
+        print(f"{name:<28} {rps:>9.0f} {p50:>9.2f} {p99:>9.2f} {avg:>10.1f}")
@@ -0,0 +1,121 @@
+# smart_agriculture_project/benchmarks/bench_processed_store.py
+"""
+Load time and peak memory: processed_data.csv vs. the partitioned Parquet store.
+
+Each load runs in a fresh subprocess so peak RSS is measured per case.
+
+    python bench_processed_store.py --rows 2000000 --days 365
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+from processed_store import COLUMNS, compact, load_processed, write_batch  # noqa: E402
+
+FEATURES = ["TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"]
+
+
+def make_rows(n, days, seed=0):
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2025-11-15")
+    ts = end - pd.to_timedelta(np.sort(rng.uniform(0, days * 86400, n))[::-1], unit="s")
+    soil = rng.uniform(0, 100, n)
+    temp = rng.normal(25, 5, n)
+    hum = rng.uniform(20, 90, n)
+    ldr = rng.uniform(0, 4095, n)
+    df = pd.DataFrame({
+        "ts": ts.strftime("%H:%M:%S"), "TEMP_C": temp, "HUMIDITY": hum, "SOIL_PCT": soil,
+        "SOIL_STATUS": np.where(soil < 40, "Dry", "Wet"), "LDR": ldr,
+        "LIGHT_LEVEL": np.where(ldr > 2000, "Dark", "Bright"), "system_timestamp": ts,
+        "soil_status": (soil < 40).astype(int), "light_level": (ldr < 2000).astype(int) * 2,
+        "heat_index": temp + 0.1 * hum, "irrigation_needed": (soil < 40).astype(int),
+        "fertilizer_needed": (temp < 15).astype(int), "SOIL_PCT_raw": soil / 100,
+    })
+    for col in FEATURES + ["heat_index"]:
+        df[f"{col}_norm"] = (df[col] - df[col].min()) / (df[col].max() - df[col].min())
+    return df.reindex(columns=COLUMNS)
+
+
+def build(tmp, rows, days):
+    df = make_rows(rows, days)
+    csv_file = tmp / "processed_data.csv"
+    store = tmp / "dataset"
+    df.to_csv(csv_file, index=False)
+    day = df["system_timestamp"].dt.floor("D")
+    for i, (_, chunk) in enumerate(df.groupby(day)):
+        write_batch(chunk, f"{0:08d}-{i:012d}", store)
+    compact(store, min_files=2)
+    csv_mb = csv_file.stat().st_size / 1e6
+    store_mb = sum(p.stat().st_size for p in store.rglob("*.parquet")) / 1e6
+    print(f"{rows:,} rows over {days} days: CSV {csv_mb:.1f} MB, Parquet {store_mb:.1f} MB")
+    return csv_file, store, df["system_timestamp"].max()
+
+
+def peak_rss_mb():
+    # VmHWM resets on exec; ru_maxrss can carry over the parent's peak on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(case, csv_file, store, newest):
+    """Executed in the child process."""
+    start = newest - pd.Timedelta(days=30)
+    base = peak_rss_mb()
+    t0 = time.perf_counter()
+    if case == "csv_full":
+        df = pd.read_csv(csv_file)
+    elif case == "csv_30d_4cols":
+        df = pd.read_csv(csv_file, usecols=FEATURES + ["system_timestamp"])
+        ts = pd.to_datetime(df["system_timestamp"])
+        df = df.loc[ts >= start, FEATURES]
+    elif case == "store_full":
+        df = load_processed(store_dir=store)
+    elif case == "store_30d_4cols":
+        df = load_processed(columns=FEATURES, start=start, store_dir=store)
+    else:
+        raise ValueError(case)
+    dt = time.perf_counter() - t0
+    peak = peak_rss_mb()
+    print(json.dumps({"case": case, "rows": len(df), "seconds": dt, "peak_mb": peak - base}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--case")
+    parser.add_argument("--csv")
+    parser.add_argument("--store")
+    parser.add_argument("--newest")
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case, args.csv, Path(args.store), pd.Timestamp(args.newest))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file, store, newest = build(Path(tmp), args.rows, args.days)
+        print(f"{'case':<18} {'rows':>10} {'seconds':>8} {'peak MB':>8}")
+        for case in ["csv_full", "store_full", "csv_30d_4cols", "store_30d_4cols"]:
+            out = subprocess.run(
+                [sys.executable, __file__, "--case", case, "--csv", str(csv_file),
+                 "--store", str(store), "--newest", str(newest)],
+                capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"{r['case']:<18} {r['rows']:>10,} {r['seconds']:>8.2f} {r['peak_mb']:>8.0f}")
@@ -0,0 +1,114 @@
+# smart_agriculture_project/benchmarks/bench_protocol.py
+"""
+Records per second of the shared sensor line parser (sensor_protocol.py) vs. the two parsers it replaced.
+
+    legacy data.py    dict comprehension, splits every part twice, strings only
+    legacy Run.py     parse_sensor_line: try/except around everything, floats
+    parse_line        one line at a time, typed, malformed frames reported
+    parse_frames      one blob of many lines
+    FrameDecoder      raw serial-sized byte chunks, partial lines reassembled
+
+    python bench_protocol.py
+    python bench_protocol.py --lines 1000000 --chunk 256
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from sensor_protocol import FrameDecoder, parse_frames, parse_line  # noqa: E402
+
+
+def legacy_collector(line):
+    """The parser data.py used (strings only, no validation)."""
+    if line.startswith("ts="):
+        parts = line.split(";")
+        return {p.split("=")[0].strip(): p.split("=")[1].strip() for p in parts if "=" in p}
+    return None
+
+
+def legacy_run(line):
+    """parse_sensor_line from Run.py (errors swallowed)."""
+    data = {}
+    try:
+        parts = line.strip().split(";")
+        for p in parts:
+            key, val = p.split("=")
+            key = key.strip()
+            val = val.strip()
+            if key in ["TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"]:
+                data[key] = float(val)
+            else:
+                data[key] = val
+        return data
+    except:  # noqa: E722
+        return None
+
+
+def make_lines(n, bad_every):
+    lines = []
+    for i in range(n):
+        line = (f"ts=00:{i // 60 % 60:02d}:{i % 60:02d}; TEMP_C={20 + i % 10}.{i % 7}; HUMIDITY={55 + i % 20}.4; "
+                f"SOIL_PCT={i % 100}; SOIL_STATUS={'Wet' if i % 3 else 'Dry'}; LDR={1500 + i % 900}; "
+                f"LIGHT_LEVEL={('Dark', 'Dim', 'Bright')[i % 3]}")
+        if bad_every and i % bad_every == 0:
+            line = line.replace("HUMIDITY=", "HUMIDITY=x")  # corrupted value
+        lines.append(line)
+    return lines
+
+
+def rate(fn, n, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return n / best, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--chunk", type=int, default=512, help="bytes per serial read for FrameDecoder")
+    parser.add_argument("--bad-every", type=int, default=1000, help="corrupt one line in N (0 = none)")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines, args.bad_every)
+    blob = ("\n".join(lines) + "\n").encode()
+    chunks = [blob[i:i + args.chunk] for i in range(0, len(blob), args.chunk)]
+
+    def one_by_one():
+        out = []
+        for line in lines:
+            try:
+                out.append(parse_line(line))
+            except ValueError:
+                pass
+        return out
+
+    def decoder():
+        dec = FrameDecoder()
+        out = []
+        for chunk in chunks:
+            out += dec.feed(chunk)
+        return out, dec
+
+    results = [
+        ("legacy data.py", *rate(lambda: [legacy_collector(l) for l in lines], args.lines)),
+        ("legacy Run.py", *rate(lambda: [legacy_run(l) for l in lines], args.lines)),
+        ("parse_line", *rate(one_by_one, args.lines)),
+        ("parse_frames (blob)", *rate(lambda: parse_frames(blob), args.lines)),
+        (f"FrameDecoder ({args.chunk} B)", *rate(decoder, args.lines)),
+    ]
+    print(f"{args.lines:,} lines, one corrupted in {args.bad_every}" if args.bad_every else f"{args.lines:,} lines")
+    print(f"{'parser':<24} {'records/s':>12} {'accepted':>10}")
+    for name, per_s, out in results:
+        if isinstance(out, tuple):
+            out = out[0]
+        accepted = sum(r is not None for r in out)
+        print(f"{name:<24} {per_s:>12,.0f} {accepted:>10,}")
+    _, dec = decoder()
+    print(f"\nFrameDecoder: {dec.stats()}")
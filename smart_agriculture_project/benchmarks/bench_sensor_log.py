@@ -0,0 +1,87 @@
+# smart_agriculture_project/benchmarks/bench_sensor_log.py
+"""
+Per-append cost of the segment log vs. the old rewrite-the-whole-data.json path.
+
+    python bench_sensor_log.py                 # 1M appends
+    python bench_sensor_log.py --records 2000000 --legacy-records 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from sensor_log import SegmentLogReader, SegmentLogWriter  # noqa: E402
+
+
+def make_record(i):
+    return {
+        "ts": f"00:{(i // 60) % 60:02d}:{i % 60:02d}",
+        "TEMP_C": "24.5", "HUMIDITY": "61.0", "SOIL_PCT": str(i % 100),
+        "SOIL_STATUS": "Wet", "LDR": "2000", "LIGHT_LEVEL": "Bright",
+        "system_timestamp": f"2025-11-15T00:20:{i % 60:02d}.{i % 1000000:06d}",
+    }
+
+
+def bench_segment_log(n, window, fsync_interval):
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentLogWriter(Path(tmp), max_segment_bytes=64 * 1024 * 1024,
+                                  fsync_interval=fsync_interval)
+        print(f"segment log: {n:,} appends, fsync every {fsync_interval}s")
+        print(f"{'records':>12} {'us/append':>10}")
+        start = time.perf_counter()
+        t0 = start
+        for i in range(n):
+            writer.append(make_record(i))
+            if (i + 1) % window == 0:
+                t1 = time.perf_counter()
+                print(f"{i + 1:>12,} {(t1 - t0) / window * 1e6:>10.2f}")
+                t0 = t1
+        writer.close()
+        total = time.perf_counter() - start
+        print(f"total {total:.1f}s, {n / total:,.0f} appends/s")
+
+        t0 = time.perf_counter()
+        count = sum(1 for _ in SegmentLogReader(Path(tmp)))
+        print(f"full read of {count:,} records: {time.perf_counter() - t0:.2f}s")
+
+
+def bench_legacy_json(n, window):
+    """The pre-log collector: load, append, rewrite with indent=4, fsync."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.json")
+        with open(path, "w") as f:
+            json.dump([], f)
+        print(f"\nlegacy data.json rewrite: {n:,} appends")
+        print(f"{'records':>12} {'us/append':>10}")
+        t0 = time.perf_counter()
+        for i in range(n):
+            with open(path, "r+") as f:
+                data = json.load(f)
+                data.append(make_record(i))
+                f.seek(0)
+                json.dump(data, f, indent=4)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+            if (i + 1) % window == 0:
+                t1 = time.perf_counter()
+                print(f"{i + 1:>12,} {(t1 - t0) / window * 1e6:>10.2f}")
+                t0 = t1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--window", type=int, default=100_000)
+    parser.add_argument("--fsync-interval", type=float, default=1.0)
+    parser.add_argument("--legacy-records", type=int, default=2000,
+                        help="the legacy path is O(n^2); keep this small")
+    args = parser.parse_args()
+
+    bench_segment_log(args.records, args.window, args.fsync_interval)
+    if args.legacy_records:
+        bench_legacy_json(args.legacy_records, max(1, args.legacy_records // 5))
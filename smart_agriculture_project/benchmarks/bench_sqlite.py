@@ -0,0 +1,114 @@
+# smart_agriculture_project/benchmarks/bench_sqlite.py
+"""
+Sustained insert rate and range-query latency of the SQLite store (sensor_db.py).
+
+Inserts synthetic readings (several devices, one reading every 2 s each, in
+time order like the collector) in batched transactions. It reports the
+insert rate for every slice of rows, to show whether it holds up as the
+table grows. Then it times range queries over random windows.
+
+    python bench_sqlite.py                      # 50M rows (several GB, minutes)
+    python bench_sqlite.py --rows 5000000 --db /tmp/bench.db
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from sensor_db import connect, insert_readings, query_readings  # noqa: E402
+
+STEP_MS = 2000
+HOUR_MS = 3_600_000
+
+
+def make_batch(rng, start_row, n, devices, t0):
+    """Rows ``start_row .. start_row + n`` in time order, devices interleaved."""
+    idx = np.arange(start_row, start_row + n)
+    dev = idx % devices
+    ts = t0 + (idx // devices) * STEP_MS
+    vals = rng.uniform(0, 100, (n, 4)).round(1)
+    names = [f"esp32-{d:02d}" for d in range(devices)]
+    return [(names[d], t, a, b, c, e, "Wet", "Bright")
+            for d, t, (a, b, c, e) in zip(dev.tolist(), ts.tolist(), vals.tolist())]
+
+
+def percentiles(samples):
+    s = np.asarray(samples) * 1000
+    return np.percentile(s, 50), np.percentile(s, 99)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=500, help="rows per transaction (collector batch)")
+    parser.add_argument("--report-every", type=int, default=0, help="rows per reported slice (default rows/10)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--db", default=None, help="database file (default: a temp file, removed after)")
+    args = parser.parse_args()
+
+    path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench.db"
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+    conn = connect(path)
+    rng = np.random.default_rng(0)
+    t0 = 1_700_000_000_000
+    every = args.report_every or max(args.rows // 10, args.batch)
+
+    print(f"{args.rows:,} rows, {args.devices} devices, {args.batch} rows per transaction -> {path}")
+    print(f"{'rows so far':>14} {'rows/s (slice)':>16}")
+    done, insert_time, slice_time, slice_rows = 0, 0.0, 0.0, 0
+    while done < args.rows:
+        n = min(args.batch, args.rows - done)
+        rows = make_batch(rng, done, n, args.devices, t0)
+        start = time.perf_counter()
+        insert_readings(conn, rows)
+        took = time.perf_counter() - start
+        insert_time += took
+        slice_time += took
+        slice_rows += n
+        done += n
+        if slice_rows >= every or done == args.rows:
+            print(f"{done:>14,} {slice_rows / slice_time:>16,.0f}")
+            slice_rows, slice_time = 0, 0.0
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(path)
+    print(f"overall {args.rows / insert_time:,.0f} rows/s; database {size / 2**30:.2f} GiB "
+          f"({size / args.rows:.0f} bytes/row)")
+
+    span_ms = (args.rows // args.devices) * STEP_MS
+    print(f"\n{'range query (1 device)':<24} {'rows':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for label, width in (("1 hour", HOUR_MS), ("1 day", 24 * HOUR_MS), ("7 days", 7 * 24 * HOUR_MS)):
+        if width > span_ms:
+            continue
+        times, n_rows = [], 0
+        for _ in range(args.queries):
+            device = f"esp32-{rng.integers(args.devices):02d}"
+            start_ms = t0 + int(rng.integers(0, span_ms - width + 1))
+            q0 = time.perf_counter()
+            n_rows = len(query_readings(conn, device, start_ms, start_ms + width))
+            times.append(time.perf_counter() - q0)
+        p50, p99 = percentiles(times)
+        print(f"{label:<24} {n_rows:>8,} {p50:>9.2f} {p99:>9.2f}")
+
+    times = []
+    for _ in range(args.queries):
+        device = f"esp32-{rng.integers(args.devices):02d}"
+        start_ms = t0 + int(rng.integers(0, max(span_ms - 24 * HOUR_MS, 1)))
+        q0 = time.perf_counter()
+        conn.execute("SELECT AVG(soil_pct), MIN(soil_pct), MAX(soil_pct) FROM readings "
+                     "WHERE device_id = ? AND ts >= ? AND ts < ?", (device, start_ms, start_ms + 24 * HOUR_MS)).fetchone()
+        times.append(time.perf_counter() - q0)
+    p50, p99 = percentiles(times)
+    print(f"{'1-day avg/min/max':<24} {'':>8} {p50:>9.2f} {p99:>9.2f}")
+    conn.close()
+    if not args.db:
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(path) + suffix).unlink(missing_ok=True)
@@ -0,0 +1,302 @@
+# smart_agriculture_project/benchmarks/bench_suite.py
+"""
+End-to-end benchmark suite on synthetic sensor load, with stored baselines and regression check.
+
+All input comes from synthetic_sensors.py (a model of the recorded readings in
+data/raw/data.json). Each scenario runs in its own process:
+
+    collector    data.py's path: DEVICES pty devices at RATE lines/s each ->
+                 serial_collector -> segment log + SQLite. CPU per stored record,
+                 send -> stored p99 latency
+    preprocess   preprocess_data.py's batch step on PREPROCESS_ROWS readings:
+                 process_batch, dedup, running stats, normalize, Parquet store,
+                 rollups. Rows/s
+    inference    Run.py's control path per reading: decode the line, features,
+                 predict_proba_one, PumpController. Readings/s, p99
+    api          the FastAPI app in-process (httpx ASGI transport) on a synthetic
+                 segment log: POST /predict, GET /sensor/snapshot,
+                 GET /sensor/history. Requests/s, p99
+
+Results are compared with ``baseline.json`` next to this file. A metric worse
+than its baseline by more than the tolerance (``--tolerance``, or the metric's
+own ``tolerance`` in the baseline) is a regression and the exit status is 1.
+Baselines are machine-specific: refresh them with ``--update-baseline`` on the
+machine that runs the check.
+
+    python bench_suite.py                           # all scenarios, check against the baseline
+    python bench_suite.py --only preprocess inference
+    python bench_suite.py --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = BENCH_DIR.parent
+SCRIPTS_DIR = PROJECT_DIR / "scripts"
+BACKEND_DIR = PROJECT_DIR.parent / "soil-monitoring-app" / "backend"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from synthetic_sensors import SensorModel, open_ptys, write_ptys  # noqa: E402
+
+# --- Config ---
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+TOLERANCE = 0.25         # default allowed relative regression
+TAIL_TOLERANCE = 1.0     # p99 latencies are noisy on a shared machine; stored per metric
+DEVICES = 32             # collector: virtual devices ...
+RATE = 20                # ... lines/s each (the sensors send one every ~2 s)
+COLLECTOR_SECONDS = 8
+PREPROCESS_ROWS = 200_000
+PREPROCESS_BATCH = 50_000  # preprocess_data.MAX_BATCH
+INFERENCE_READINGS = 20_000
+API_REQUESTS = 2_000
+API_CLIENTS = 20
+API_LOG_ROWS = 100_000
+SEED = 0
+
+
+def percentile_ms(seconds, q):
+    return float(np.percentile(np.asarray(seconds) * 1000, q)) if len(seconds) else float("nan")
+
+
+# ---------------- scenarios (each runs in a child process) ----------------
+def bench_collector(model):
+    from sensor_db import ReadingWriter
+    from sensor_log import SegmentLogWriter
+    from serial_collector import Collector, StorageWriter
+
+    latencies = []
+
+    class TimedStorage(StorageWriter):
+        def _store(self, batch):
+            super()._store(batch)
+            now = time.time()
+            latencies.extend(now - float(r["SENT"]) for r in batch if "SENT" in r)
+
+    masters, ports = open_ptys(DEVICES)
+    sim = mp.get_context("fork").Process(target=write_ptys, args=(model, masters, RATE, COLLECTOR_SECONDS + 10),
+                                         kwargs={"seed": SEED, "stamp": True})
+
+    async def run(workdir):
+        db = ReadingWriter(workdir / "bench.db", check_same_thread=False)
+        storage = TimedStorage(asyncio.Queue(10_000), SegmentLogWriter(workdir / "segments"), db)
+        collector = Collector(storage, ports={p: f"sim-{i:03d}" for i, p in enumerate(ports)}, reconnect_delay=0.5)
+        task = asyncio.create_task(collector.run())
+        await asyncio.sleep(1.0)
+        sim.start()
+        await asyncio.sleep(1.0)  # warm-up
+        latencies.clear()
+        stored0, t0, cpu0 = storage.stored, time.perf_counter(), sum(os.times()[:2])
+        await asyncio.sleep(COLLECTOR_SECONDS)
+        stored, took, cpu = storage.stored - stored0, time.perf_counter() - t0, sum(os.times()[:2]) - cpu0
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        storage.close()
+        if db.written != storage.stored:  # rows the database really took, not batches handed to it
+            raise RuntimeError(f"{storage.stored - db.written} of {storage.stored} readings missing from SQLite")
+        return stored, took, cpu
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            stored, took, cpu = asyncio.run(run(Path(tmp)))
+    finally:
+        sim.terminate()
+        sim.join()
+    return {"collector_records_per_s": stored / took,
+            "collector_cpu_us_per_record": cpu / max(stored, 1) * 1e6,
+            "collector_p99_ms": percentile_ms(latencies, 99)}
+
+
+def bench_preprocess(model):
+    import preprocess_data as pp
+    from dedup_index import DedupIndex
+    from processed_store import write_batch
+    from rollups import update_rollups
+    from running_stats import RunningStats
+
+    records = list(model.records(8, PREPROCESS_ROWS // 8, SEED, start=pd.Timestamp("2026-01-01").to_pydatetime()))
+    stats = RunningStats(pp.to_scale, pp.stats_halflife)
+    dedup = DedupIndex(pp.DEDUP_WINDOW)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        for i in range(0, len(records), PREPROCESS_BATCH):
+            new_data = pp.process_batch(pd.DataFrame(records[i:i + PREPROCESS_BATCH]), stats)
+            is_new = dedup.filter_new(*pp.dedup_keys(new_data))
+            new_data = new_data[np.asarray(is_new, dtype=bool)]
+            stats.update(new_data, pp.ts_seconds(new_data))
+            new_data = pp.normalize(new_data, stats)
+            write_batch(new_data, f"bench-{i:012d}", Path(tmp) / "store")
+            update_rollups(new_data, f"bench-{i:012d}", Path(tmp) / "rollups")
+        took = time.perf_counter() - t0
+    return {"preprocess_rows_per_s": len(records) / took}
+
+
+def bench_inference(model):
+    from irrigation_control import PumpController
+    from model_registry import get_model
+    from sensor_protocol import FrameDecoder
+
+    water = get_model("xgb_water")
+    controller = PumpController(min_on=0, min_off=0)
+    decoder = FrameDecoder()
+    lines = [line for step in model.lines(1, INFERENCE_READINGS, SEED) for line in step]
+    for line in lines[:200]:  # warm-up
+        for record in decoder.feed(line):
+            water.predict_proba_one(tuple(float(record[f]) for f in water.features))
+    latencies = []
+    t0 = time.perf_counter()
+    for line in lines:
+        start = time.perf_counter()
+        for record in decoder.feed(line):
+            x = tuple(float(record[f]) for f in water.features)
+            controller.update(float(water.predict_proba_one(x)[-1]))
+        latencies.append(time.perf_counter() - start)
+    took = time.perf_counter() - t0
+    return {"inference_readings_per_s": len(lines) / took,
+            "inference_p99_us": percentile_ms(latencies, 99) * 1000}
+
+
+def bench_api(model):
+    from sensor_log import SegmentLogWriter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp)
+        (project / "data" / "raw").mkdir(parents=True)
+        (project / "scripts").symlink_to(SCRIPTS_DIR)
+        (project / "data" / "models").symlink_to(PROJECT_DIR / "data" / "models")
+        start = pd.Timestamp.now().floor("s").to_pydatetime()
+        with SegmentLogWriter(project / "data" / "raw" / "segments") as log:
+            log.append_many(list(model.records(1, API_LOG_ROWS, SEED, start=start, device_prefix="sim")))
+        os.environ.update(SMART_AGRI_PROJECT_DIR=str(project), SENSOR_DB=str(project / "data" / "sensors.db"),
+                          SENSOR_REPLAY="0")
+        sys.path.insert(0, str(BACKEND_DIR))
+        return asyncio.run(_drive_api())
+
+
+async def _drive_api():
+    import httpx
+
+    import main
+    from services.history_service import store
+
+    rng = np.random.default_rng(SEED)
+    bodies = [{"temperature": float(t), "humidity": float(h), "moisture": float(m), "ldr": float(l)}
+              for t, h, m, l in rng.uniform(0, 100, (512, 4))]
+    routes = {
+        "predict": lambda c, i: c.post("/predict", json=bodies[i % len(bodies)]),
+        "snapshot": lambda c, i: c.get("/sensor/snapshot"),
+        "history": lambda c, i: c.get("/sensor/history", params={"device": "sim-000", "points": 500}),
+    }
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        while store.stats()["devices"].get("sim-000", {}).get("samples", 0) < API_LOG_ROWS:
+            await asyncio.sleep(0.1)  # history ring is filled from the log in the background
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            for name, call in routes.items():
+                (await call(c, 0)).raise_for_status()  # warm-up
+                latencies = []
+
+                async def client(k):
+                    for i in range(API_REQUESTS // API_CLIENTS):
+                        t0 = time.perf_counter()
+                        (await call(c, k * 31 + i)).raise_for_status()
+                        latencies.append(time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                await asyncio.gather(*(client(k) for k in range(API_CLIENTS)))
+                took = time.perf_counter() - t0
+                results[f"api_{name}_req_per_s"] = len(latencies) / took
+                results[f"api_{name}_p99_ms"] = percentile_ms(latencies, 99)
+    return results
+
+
+SCENARIOS = {"collector": bench_collector, "preprocess": bench_preprocess,
+             "inference": bench_inference, "api": bench_api}
+
+
+# ---------------- baseline ----------------
+def better(metric):
+    """Direction of a metric, from its name: rates are higher-is-better, times and costs lower."""
+    return "higher" if metric.endswith("_per_s") else "lower"
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """[(metric, value, baseline value, relative change, regressed)] for the metrics in both."""
+    rows = []
+    for metric, value in results.items():
+        if metric not in baseline:
+            continue
+        ref = baseline[metric]
+        tol = ref.get("tolerance", tolerance)
+        change = (value - ref["value"]) / ref["value"] if ref["value"] else 0.0
+        worse = -change if ref.get("better", better(metric)) == "higher" else change
+        rows.append((metric, value, ref["value"], change, worse > tol))
+    return rows
+
+
+def run_scenario(name):
+    """Run one scenario in a fresh process; returns its metrics."""
+    out = subprocess.run([sys.executable, __file__, "--scenario", name], capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(f"scenario {name} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help=f"any of {', '.join(SCENARIOS)}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(SCENARIOS[args.scenario](SensorModel.from_json())))
+        sys.exit(0)
+
+    names = args.only or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        t0 = time.perf_counter()
+        results.update(run_scenario(name))
+        print(f"# {name} done in {time.perf_counter() - t0:.0f} s", file=sys.stderr)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        for metric, value in results.items():
+            entry = {"value": round(value, 3), "better": better(metric)}
+            if "_p99_" in metric:
+                entry["tolerance"] = TAIL_TOLERANCE
+            baseline[metric] = {**entry, **{k: v for k, v in baseline.get(metric, {}).items() if k == "tolerance"}}
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        for metric, value in results.items():
+            print(f"{metric:<32} {value:>12,.2f}")
+        print(f"Baseline saved at {args.baseline}")
+        sys.exit(0)
+
+    rows = compare(results, baseline, args.tolerance)
+    print(f"{'metric':<32} {'value':>12} {'baseline':>12} {'change':>8}")
+    for metric, value, ref, change, regressed in rows:
+        print(f"{metric:<32} {value:>12,.2f} {ref:>12,.2f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    for metric in sorted(set(results) - set(baseline)):
+        print(f"{metric:<32} {results[metric]:>12,.2f} {'(no baseline)':>12}")
+    regressions = [r[0] for r in rows if r[4]]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
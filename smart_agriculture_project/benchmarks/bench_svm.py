@@ -0,0 +1,84 @@
+# smart_agriculture_project/benchmarks/bench_svm.py
+"""
+Training time and peak memory: exact SVC(probability=True) vs. ApproxKernelSVM (kernel_svm.py).
+
+Each case trains in a fresh subprocess on synthetic readings whose
+irrigation boundary is non-linear in the four features. It is scored on the
+same 20k test rows. Peak memory is the process high-water mark after the
+data was generated. Exact SVC cases that exceed ``--exact-timeout`` seconds
+are stopped and reported as such.
+
+    python bench_svm.py                          # 10k, 100k, 1M rows
+    python bench_svm.py --rows 10000 100000 --exact-timeout 1800
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_processed_store import peak_rss_mb  # noqa: E402
+
+FEATURES = ["TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"]
+
+
+def make_data(n, seed):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.normal(25, 6, n), rng.uniform(20, 90, n), rng.uniform(0, 100, n),
+                         rng.uniform(0, 4095, n)])
+    threshold = 30 + 0.8 * (X[:, 0] - 25) - 0.15 * (X[:, 1] - 55) + 6 * np.sin(X[:, 3] / 600)
+    y = (X[:, 2] + rng.normal(0, 4, n) < threshold).astype(int)
+    return pd.DataFrame(X, columns=FEATURES), y
+
+
+def run_case(mode, rows):
+    """Executed in the child process."""
+    from train_all import EXACT_SVM_MAX_ROWS, evaluate, make_estimator
+
+    X, y = make_data(rows, 1)
+    X_test, y_test = make_data(20_000, 9)
+    base = peak_rss_mb()
+    # rows=0 forces the exact SVC, rows above the cut-off the approximation
+    model = make_estimator("svm_water", {"C": 1.0, "gamma": "scale"},
+                           rows=0 if mode == "exact" else EXACT_SVM_MAX_ROWS + 1)
+    t0 = time.perf_counter()
+    model.fit(X, y)
+    fit_seconds = time.perf_counter() - t0
+    metrics = evaluate(model, X_test, y_test)
+    print(json.dumps({"mode": mode, "rows": rows, "seconds": fit_seconds,
+                      "peak_mb": peak_rss_mb() - base, **metrics}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--exact-timeout", type=float, default=900)
+    parser.add_argument("--case", nargs=2, metavar=("MODE", "ROWS"))
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case[0], int(args.case[1]))
+        sys.exit(0)
+
+    print(f"{'model':<16} {'rows':>10} {'fit s':>9} {'peak MB':>8} {'accuracy':>9} {'log loss':>9} {'roc auc':>8}")
+    for rows in args.rows:
+        for mode in ("exact", "approx"):
+            cmd = [sys.executable, __file__, "--case", mode, str(rows)]
+            try:
+                out = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                     timeout=args.exact_timeout if mode == "exact" else None).stdout
+            except subprocess.TimeoutExpired:
+                print(f"{'SVC (exact)':<16} {rows:>10,} {'>' + format(args.exact_timeout, '.0f'):>9}  stopped")
+                continue
+            r = json.loads(out.strip().splitlines()[-1])
+            label = "SVC (exact)" if mode == "exact" else "Nystroem + SGD"
+            print(f"{label:<16} {rows:>10,} {r['seconds']:>9.2f} {r['peak_mb']:>8.0f} {r['accuracy']:>9.4f} "
+                  f"{r['log_loss']:>9.4f} {r['roc_auc']:>8.4f}")
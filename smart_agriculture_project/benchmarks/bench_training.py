@@ -0,0 +1,92 @@
+# smart_agriculture_project/benchmarks/bench_training.py
+"""
+Wall time of train_all.py (cached features, parallel workers) vs. the per-model scripts one after another.
+
+A synthetic processed store is written to a temporary directory. The legacy
+case runs one fresh process per model, like running train_models.py, svm.py
+and the forest script in turn: each loads the store, splits it, fits and
+publishes its model. train_all.py then runs with a cold feature cache and
+again with a warm one. Every case publishes into its own temporary registry.
+
+    python bench_training.py --rows 10000
+    python bench_training.py --rows 50000 --models xgb_water rf_water
+"""
+import argparse
+import multiprocessing as mp
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_processed_store import make_rows  # noqa: E402
+from processed_store import compact, write_batch  # noqa: E402
+from train_all import PARAMS  # noqa: E402
+
+
+def legacy_script(name, store, models_dir):
+    """One training script as before train_all.py: load, split, fit, publish."""
+    from sklearn.model_selection import StratifiedShuffleSplit
+
+    from feature_cache import FEATURES, TARGET
+    from model_registry import publish
+    from processed_store import load_processed
+    from train_all import PARAMS, evaluate, make_estimator
+
+    data = load_processed(columns=FEATURES + [TARGET], store_dir=store)
+    X, y = data[FEATURES], data[TARGET].astype(int)
+    train_idx, test_idx = next(StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42).split(X, y))
+    model = make_estimator(name, PARAMS[name])
+    model.fit(X.iloc[train_idx], y.iloc[train_idx])
+    metrics = evaluate(model, X.iloc[test_idx], y.iloc[test_idx])
+    publish(name, model, FEATURES, training_rows=len(train_idx), metrics=metrics, models_dir=models_dir)
+
+
+def run_legacy(models, store, models_dir):
+    ctx = mp.get_context("spawn")  # a fresh interpreter per script, imports included
+    t0 = time.perf_counter()
+    for name in models:
+        p = ctx.Process(target=legacy_script, args=(name, store, models_dir))
+        p.start()
+        p.join()
+    return time.perf_counter() - t0
+
+
+def run_train_all(models, store, cache_dir, models_dir, *extra):
+    cmd = [sys.executable, str(SCRIPTS_DIR / "train_all.py"), "--models", *models, "--store-dir", str(store),
+           "--cache-dir", str(cache_dir), "--models-dir", str(models_dir), *extra]
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - t0, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--models", nargs="+", default=list(PARAMS), choices=list(PARAMS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store, cache = tmp / "dataset", tmp / "cache"
+        df = make_rows(args.rows, args.days)
+        for i, (_, chunk) in enumerate(df.groupby(df["system_timestamp"].dt.floor("D"))):
+            write_batch(chunk, f"{0:08d}-{i:012d}", store)
+        compact(store, min_files=2)
+        print(f"{args.rows:,} synthetic rows over {args.days} days, models {', '.join(args.models)}")
+
+        legacy = run_legacy(args.models, store, tmp / "models-legacy")
+        cold, _ = run_train_all(args.models, store, cache, tmp / "models-cold")
+        warm, out = run_train_all(args.models, store, cache, tmp / "models-warm")
+        seq, _ = run_train_all(args.models, store, cache, tmp / "models-seq", "--sequential")
+
+        print(f"scripts one after another (process each)  {legacy:8.2f} s")
+        print(f"train_all.py, cold feature cache          {cold:8.2f} s  ({legacy / cold:.2f}x)")
+        print(f"train_all.py, warm feature cache          {warm:8.2f} s  ({legacy / warm:.2f}x)")
+        print(f"train_all.py --sequential, warm cache     {seq:8.2f} s  ({legacy / seq:.2f}x)")
+        print("\n" + out)
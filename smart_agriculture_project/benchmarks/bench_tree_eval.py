@@ -0,0 +1,106 @@
+# smart_agriculture_project/benchmarks/bench_tree_eval.py
+"""
+Per-prediction latency and cold start: joblib + pandas path vs. exported arrays.
+
+Run ``scripts/export_trees.py`` first so the .npz files exist.
+
+    python bench_tree_eval.py
+    python bench_tree_eval.py --model rf_water --iterations 2000
+"""
+import argparse
+import subprocess
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+MODELS_DIR = Path(__file__).resolve().parent.parent / "data" / "models"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+COLD_JOBLIB = """
+import time; t0 = time.perf_counter()
+import warnings; warnings.simplefilter("ignore")
+import joblib, pandas as pd
+model = joblib.load({pkl!r})
+model.predict(pd.DataFrame([{row}], columns={names!r}))
+print(time.perf_counter() - t0)
+"""
+
+COLD_COMPILED = """
+import time; t0 = time.perf_counter()
+import sys; sys.path.insert(0, {scripts!r})
+from tree_model import load_compiled
+model = load_compiled({npz!r})
+model.predict_one({row})
+print(time.perf_counter() - t0)
+"""
+
+
+def timed(fn, iterations):
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    return samples * 1e6
+
+
+def cold_start(code, repeats):
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return min(times), float(np.median(times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="xgb_water")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--cold-repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    import joblib
+    import pandas as pd
+    from tree_model import load_compiled
+
+    pkl = MODELS_DIR / f"{args.model}.pkl"
+    npz = MODELS_DIR / f"{args.model}.npz"
+    model = joblib.load(pkl)
+    compiled = load_compiled(npz)
+    names = compiled.feature_names
+    rng = np.random.default_rng(0)
+    row = tuple(float(v) for v in rng.uniform(0, 100, len(names)))
+
+    print(f"model {args.model}: {compiled.meta['n_trees']} trees, depth {compiled.max_depth}")
+    print(f"{'single row':<28} {'p50 us':>9} {'p99 us':>9}")
+    cases = {
+        "joblib + DataFrame": lambda: model.predict(pd.DataFrame([row], columns=names))[0],
+        "compiled predict_one": lambda: compiled.predict_one(row),
+    }
+    for name, fn in cases.items():
+        s = timed(fn, args.iterations)
+        print(f"{name:<28} {np.percentile(s, 50):>9.1f} {np.percentile(s, 99):>9.1f}")
+
+    X = rng.uniform(0, 100, (args.batch, len(names))).astype(np.float32)
+    frame = pd.DataFrame(X, columns=names)
+    print(f"\n{'batch of ' + format(args.batch, ','):<28} {'us/row':>9}")
+    for name, fn in {"joblib predict": lambda: model.predict(frame),
+                     "compiled predict": lambda: compiled.predict(X)}.items():
+        s = timed(fn, 5)
+        print(f"{name:<28} {np.median(s) / args.batch:>9.2f}")
+
+    print(f"\n{'cold start (new process)':<28} {'min s':>9} {'median s':>9}")
+    for name, code in {
+        "joblib + pandas": COLD_JOBLIB.format(pkl=str(pkl), row=list(row), names=names),
+        "compiled (numpy only)": COLD_COMPILED.format(scripts=str(SCRIPTS_DIR), npz=str(npz), row=row),
+    }.items():
+        lo, med = cold_start(code, args.cold_repeats)
+        print(f"{name:<28} {lo:>9.3f} {med:>9.3f}")
+
+    print("(cold start = imports + model load + first prediction, excluding interpreter launch)")
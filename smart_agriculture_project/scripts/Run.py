@@ -1,89 +1,79 @@
-import serial
-import time
-import pandas as pd
-import joblib  # for loading XGBoost model
+import asyncio
+
+from actuator import ActuatorClient
+from irrigation_control import E2E, ControlLoop, PumpController, latency_report
+from metrics import publish
+from model_registry import get_model
+from sensor_db import connect, insert_actuator_event, insert_prediction
 
 # ---------------- CONFIG ----------------
 ESP_PORT = "COM13"      # Your ESP32 serial port
 BAUD = 115200
-MODEL_PATH = "../data/models/xgb_water.pkl"
-READ_INTERVAL = 5       # seconds between readings
+ACK_TIMEOUT = 1.0       # seconds to wait for the ESP32 to confirm a pump command ...
+COMMAND_RETRIES = 2     # ... and how many times to resend it
+BOOT_DELAY = 2          # the ESP32 resets when the port is opened (once per connection)
+MODEL_NAME = "xgb_water"  # registry name (data/models/xgb_water/, else the flat .npz/.pkl)
+FEATURES = ["TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"]
+SQLITE_DB = "../data/sensors.db"  # predictions and motor commands are recorded here (None to disable)
+ON_THRESHOLD = 0.6      # pump ON when P(irrigation needed) reaches this ...
+OFF_THRESHOLD = 0.4     # ... and OFF only once it falls to this (hysteresis)
+MIN_ON_SECONDS = 30     # shortest pump run
+MIN_OFF_SECONDS = 60    # shortest pause between runs
+MAX_ON_SECONDS = 15 * 60  # safety stop for a run that never ends (None to disable)
+LATENCY_TARGET_P99 = 0.050  # seconds, sensor reading -> pump command
+STATS_INTERVAL = 60     # seconds between latency reports
 # ---------------------------------------
 
-# Load trained model
-model = joblib.load(MODEL_PATH)
-print("Model loaded successfully.")
-
-# Serial connection to ESP32
-ser = serial.Serial(ESP_PORT, BAUD, timeout=1)
-time.sleep(2)  # wait for ESP32 reset
+db = connect(SQLITE_DB) if SQLITE_DB else None
 
-def send_motor_command(cmd):
-    """Send ON/OFF command to ESP32 motor"""
-    ser.write((cmd + "\n").encode())
-    print(f"Motor command sent: {cmd}")
-
-def parse_sensor_line(line):
-    """
-    Parse sensor line from ESP32 into a dictionary
-    Format expected from ESP32:
-    ts=00:01:23; TEMP_C=25.0; HUMIDITY=60.0; SOIL_PCT=45; SOIL_STATUS=Wet; LDR=2000; LIGHT_LEVEL=Bright
-    """
-    data = {}
+def record(fn, *args, **kwargs):
+    """Write a prediction / actuator event row; the control loop never stops for it."""
+    if db is None:
+        return
     try:
-        parts = line.strip().split(";")
-        for p in parts:
-            key, val = p.split("=")
-            key = key.strip()
-            val = val.strip()
-            if key in ["TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"]:
-                data[key] = float(val)
-            else:
-                data[key] = val
-        return data
-    except:
-        return None
+        fn(db, *args, **kwargs)
+    except Exception as e:
+        print("Error writing to database:", e)
+
+def on_prediction(sensor_data, y_pred, probability, model):
+    print(f"Sensor data: {sensor_data} -> irrigation_needed={y_pred} (p={probability:.2f})")
+    record(insert_prediction, MODEL_NAME, y_pred, probability, version=model.version)
 
-def preprocess_for_model(sensor_data):
-    """
-    Convert ESP32 sensor data into DataFrame with same features as model
-    """
-    df = pd.DataFrame([sensor_data])
-    
-    # Example: keep only features used during training
-    features = ["TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"]  # adapt if your model uses more
-    return df[features]
+def on_command(result):
+    print(f"Motor command sent: {result.command} ({result.status}, {result.seconds * 1000:.0f} ms)")
+    record(insert_actuator_event, result.command, "auto", status=result.status)
 
-def main_loop():
-    motor_status = "OFF"
+async def report_latency():
     while True:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode().strip()
-            sensor_data = parse_sensor_line(line)
-            if sensor_data:
-                print("Sensor data:", sensor_data)
-                
-                # Prepare features
-                X = preprocess_for_model(sensor_data)
-                
-                # Predict irrigation_needed
-                y_pred = model.predict(X)[0]
-                print("Predicted irrigation_needed:", y_pred)
-                
-                # Control motor
-                if y_pred == 1 and motor_status == "OFF":
-                    send_motor_command("ON")
-                    motor_status = "ON"
-                elif y_pred == 0 and motor_status == "ON":
-                    send_motor_command("OFF")
-                    motor_status = "OFF"
-                
-        time.sleep(READ_INTERVAL)
+        await asyncio.sleep(STATS_INTERVAL)
+        print(latency_report())
+        p99 = E2E.quantile(0.99)
+        if p99 > LATENCY_TARGET_P99:
+            print(f"WARNING: reading -> decision p99 {p99 * 1000:.1f} ms is above the "
+                  f"{LATENCY_TARGET_P99 * 1000:.0f} ms target")
+
+async def main():
+    publish("control")  # stage histograms for the backend's /metrics (data/metrics/control.json)
+    # Load trained model through the registry; new versions from train_models.py
+    # are picked up between readings without restarting
+    model = get_model(MODEL_NAME)
+    print(f"Model loaded successfully ({MODEL_NAME} v{model.version}).")
+
+    controller = PumpController(ON_THRESHOLD, OFF_THRESHOLD, MIN_ON_SECONDS, MIN_OFF_SECONDS, MAX_ON_SECONDS)
+    # one connection to the board: readings come in and acknowledged commands go out on it
+    actuator = ActuatorClient(ESP_PORT, baud=BAUD, ack_timeout=ACK_TIMEOUT, retries=COMMAND_RETRIES,
+                              boot_delay=BOOT_DELAY)
+    loop = ControlLoop(actuator, lambda: get_model(MODEL_NAME), controller, features=FEATURES,
+                       on_prediction=on_prediction, on_command=on_command)
+    reporter = asyncio.create_task(report_latency())
+    try:
+        await loop.run()  # reacts to each reading as it arrives; switches the pump OFF on exit
+    finally:
+        reporter.cancel()
+        print(latency_report())
 
 if __name__ == "__main__":
     try:
-        main_loop()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("Stopping...")
-        send_motor_command("OFF")
-        ser.close()
@@ -0,0 +1,258 @@
+# smart_agriculture_project/scripts/actuator.py
+"""
+Long-lived actuator connection to one ESP32.
+
+``ActuatorClient`` keeps the serial port open for the life of the process.
+Commands go through a queue and are written one at a time. After each write
+the client waits for the board's reply:
+
+    "OK ..." / "ACK ..." or a line naming the command ("Motor ON")   -> ack
+    "ERR ..." / "ERROR ..." / "Unknown command"                     -> rejected
+    nothing within ack_timeout                                      -> resend, up to
+                                                                       ``retries`` more times
+
+Sensor frames (lines starting with ``ts=``) are never taken as replies. Raw
+chunks are also handed to ``on_chunk``, so the same connection can feed the
+irrigation controller; ``on_connect`` runs each time the port was (re)opened. Opening a port resets most ESP32 boards; this happens
+once at connect (``boot_delay``), not for every command. A command that
+arrives while the board is booting is covered by the retry. Once the port
+could not be opened or the connection dropped (board unplugged), commands fail
+at once with status "error" until it is open again, instead of waiting for a
+connection that may never come.
+
+``BlockingActuator`` wraps a client in a background event loop for plain
+scripts (kk.py, trainmodel1.py).
+"""
+import asyncio
+import re
+import threading
+import time
+from contextlib import aclosing
+from typing import NamedTuple, Optional
+
+from dedup_index import DEFAULT_DEVICE
+from metrics import histogram
+from sensor_protocol import FRAME_PREFIX
+from serial_collector import open_port, read_chunks_timed
+
+ACK_SECONDS = histogram("actuator_ack_seconds", "command queued -> acknowledged")
+
+_REJECT = re.compile(r"^(ERR|ERROR)\b|UNKNOWN", re.IGNORECASE)
+_ACK = re.compile(r"^(OK|ACK)\b", re.IGNORECASE)
+
+
+class CommandResult(NamedTuple):
+    command: str
+    status: str             # ack | rejected | timeout | error
+    reply: Optional[str]
+    attempts: int
+    seconds: float          # queued -> outcome
+
+    @property
+    def ok(self):
+        return self.status == "ack"
+
+
+def classify_reply(command, line):
+    """"ack", "rejected" or None (not a reply to ``command``) for one line from the board."""
+    if _REJECT.search(line):
+        return "rejected"
+    if _ACK.match(line) or re.search(rf"\b{re.escape(command)}\b", line, re.IGNORECASE):
+        return "ack"
+    return None
+
+
+class ActuatorClient:
+    """One persistent serial connection, commands serialised through a queue."""
+
+    def __init__(self, port, device_id=DEFAULT_DEVICE, baud=115200, ack_timeout=1.0, retries=2,
+                 queue_size=32, boot_delay=0.0, reconnect_delay=2.0, on_chunk=None, on_result=None,
+                 on_connect=None):
+        self.port = port
+        self.device_id = device_id
+        self.baud = baud
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self.boot_delay = boot_delay
+        self.reconnect_delay = reconnect_delay
+        self.on_chunk = on_chunk      # on_chunk(data, readable_at, read_seconds)
+        self.on_result = on_result    # on_result(CommandResult)
+        self.on_connect = on_connect  # on_connect(), after each (re)connect and boot delay
+        self.state = None             # last acknowledged command
+        self.connected = asyncio.Event()
+        self.sent = 0
+        self.acked = 0
+        self.failed = 0
+        self.reconnects = 0
+        self._queue = asyncio.Queue(queue_size)
+        self._replies = asyncio.Queue()
+        self._serial = None
+        self._offline = False         # last open failed / connection lost; cleared on reconnect
+        self._task = None
+
+    # ---------------- public API ----------------
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"actuator-{self.device_id}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._fail_queued("actuator stopped")
+
+    def submit(self, command):
+        """
+        Queue ``command``; returns a future with its ``CommandResult``. Raises
+        QueueFull when backed up. While offline the result is an error at once.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        if self._offline:
+            fut.set_result(CommandResult(command, "error", "not connected", 0, 0.0))
+            return fut
+        self._queue.put_nowait((command, time.perf_counter(), fut))
+        return fut
+
+    async def send(self, command):
+        """Queue ``command`` and wait until it is acknowledged, rejected or has timed out."""
+        return await self.submit(command)
+
+    def stats(self):
+        return {"device": self.device_id, "port": self.port, "connected": self.connected.is_set(),
+                "state": self.state, "queued": self._queue.qsize(), "sent": self.sent,
+                "acked": self.acked, "failed": self.failed, "reconnects": self.reconnects}
+
+    def _fail_queued(self, reason):
+        while not self._queue.empty():
+            cmd, queued, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_result(CommandResult(cmd, "error", reason, 0, time.perf_counter() - queued))
+
+    # ---------------- connection ----------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self._serial = await loop.run_in_executor(None, open_port, self.port, self.baud)
+                self._offline = False
+                print(f"[{self.device_id}] actuator connected on {self.port}")
+                if self.boot_delay:
+                    await asyncio.sleep(self.boot_delay)  # one reset per connection, not per command
+                self.connected.set()
+                if self.on_connect is not None:
+                    self.on_connect()
+                reader = asyncio.create_task(self._read())
+                writer = asyncio.create_task(self._write())
+                done, _ = await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_EXCEPTION)
+                for task in (reader, writer):
+                    task.cancel()
+                await asyncio.gather(reader, writer, return_exceptions=True)
+                for task in done:
+                    task.result()  # re-raise the serial error
+            except Exception as e:
+                print(f"[{self.device_id}] actuator error on {self.port}: {e}")
+            finally:
+                self.connected.clear()
+                self._offline = True
+                if self._serial is not None:
+                    self._serial.close()
+                    self._serial = None
+                self._fail_queued("not connected")
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _read(self):
+        pending = b""
+        async with aclosing(read_chunks_timed(self._serial, self.device_id)) as chunks:
+            async for data, readable_at, read_seconds in chunks:
+                if self.on_chunk is not None:
+                    self.on_chunk(data, readable_at, read_seconds)
+                pending += data
+                *lines, pending = pending.split(b"\n")
+                for raw in lines:
+                    line = raw.decode(errors="replace").strip()
+                    if line and not line.startswith(FRAME_PREFIX):
+                        self._replies.put_nowait(line)
+                if len(pending) > 4096:
+                    pending = b""
+
+    async def _write(self):
+        while True:
+            cmd, queued, fut = await self._queue.get()
+            if fut.done():  # caller gave up (cancelled)
+                continue
+            try:
+                result = await self._execute(cmd, queued)
+            except BaseException:
+                # connection lost mid-command: report it rather than leave the caller waiting
+                if not fut.done():
+                    fut.set_result(CommandResult(cmd, "error", "connection lost", 1, time.perf_counter() - queued))
+                raise
+            if result.ok:
+                self.acked += 1
+                self.state = cmd
+                ACK_SECONDS.observe(result.seconds)
+            else:
+                self.failed += 1
+            if not fut.done():
+                fut.set_result(result)
+            if self.on_result is not None:
+                self.on_result(result)
+
+    async def _execute(self, cmd, queued):
+        reply = None
+        for attempt in range(1, self.retries + 2):
+            while not self._replies.empty():  # drop chatter from before this attempt
+                self._replies.get_nowait()
+            self._serial.write((cmd + "\n").encode())
+            self._serial.flush()
+            self.sent += 1
+            deadline = time.perf_counter() + self.ack_timeout
+            while (left := deadline - time.perf_counter()) > 0:
+                try:
+                    reply = await asyncio.wait_for(self._replies.get(), left)
+                except asyncio.TimeoutError:
+                    break
+                status = classify_reply(cmd, reply)
+                if status is not None:
+                    return CommandResult(cmd, status, reply, attempt, time.perf_counter() - queued)
+        return CommandResult(cmd, "timeout", reply, self.retries + 1, time.perf_counter() - queued)
+
+
+class BlockingActuator:
+    """``ActuatorClient`` on a background event loop, for synchronous scripts."""
+
+    def __init__(self, port, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="actuator-loop", daemon=True)
+        self._thread.start()
+        self.client = self._call(self._make(port, kwargs))
+
+    async def _make(self, port, kwargs):
+        client = ActuatorClient(port, **kwargs)
+        await client.start()
+        return client
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def send(self, command, timeout=None):
+        """Send ``command`` and block until its ``CommandResult`` is in."""
+        return self._call(self.client.send(command), timeout)
+
+    def wait_connected(self, timeout=10.0):
+        async def wait():
+            await asyncio.wait_for(self.client.connected.wait(), timeout)
+        self._call(wait())
+
+    def close(self):
+        self._call(self.client.stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,93 +1,60 @@
 # smart_agriculture_project/scripts/collect_sensors_json.py
-import serial
-import time
-import json
-import os
+import asyncio
 import sys
-import serial.tools.list_ports
-from datetime import datetime
+
+from metrics import publish
+from sensor_db import ReadingWriter
+from sensor_log import SegmentLogWriter, migrate_legacy_json
+from serial_collector import Collector, StorageWriter
 
 # --------------------- CONFIG ---------------------
 BAUD = 115200
-JSON_FILE = "../data/raw/data.json"  # relative path from scripts folder
-AUTO_DETECT_COM = True  # set False to use fixed PORT
-READ_INTERVAL = 2       # seconds between readings
+JSON_FILE = "../data/raw/data.json"  # legacy file, imported into the log once
+LOG_DIR = "../data/raw/segments"     # append-only segment log (relative to scripts folder)
+MAX_SEGMENT_MB = 64     # roll over to a new segment past this size
+MAX_SEGMENT_AGE = 24 * 3600  # ... or after this many seconds
+FSYNC_INTERVAL = 1.0    # group-commit: at most one fsync per interval
+SQLITE_DB = "../data/sensors.db"  # also store readings in SQLite (None to disable)
+DB_BATCH = 500          # rows per SQLite transaction ...
+DB_FLUSH_INTERVAL = 5.0  # ... or at most this many seconds of buffering
+AUTO_DETECT_COM = True  # read every USB/UART port (and pick up new ones); False to use PORTS
+PORTS = {"COM13": "esp32-01"}  # port -> device id, used when not auto-detecting
+RESCAN_INTERVAL = 10    # seconds between scans for newly connected boards
+RECONNECT_DELAY = 2     # seconds before reopening a port that failed or was unplugged
+BOOT_DELAY = 2          # seconds to let an ESP32 boot after its port is opened
+QUEUE_SIZE = 10_000     # readings buffered between the readers and storage (backpressure beyond)
+STATS_INTERVAL = 30     # seconds between status lines
 # --------------------------------------------------
 
-# Function to auto-detect ESP32 COM port
-def detect_esp32_port():
-    ports = serial.tools.list_ports.comports()
-    for port in ports:
-        if "USB" in port.description or "UART" in port.description:
-            return port.device
-    return None
-
-# Detect or set PORT
-if AUTO_DETECT_COM:
-    PORT = detect_esp32_port()
-    if PORT is None:
-        print("ESP32 not found. Please connect it and try again.")
-        sys.exit(1)
-else:
-    PORT = "COM13"  # change manually if not auto-detecting
-
-# Ensure JSON folder exists
-os.makedirs(os.path.dirname(JSON_FILE), exist_ok=True)
-
-# Connect to ESP32
-try:
-    esp = serial.Serial(PORT, BAUD, timeout=2)
-    time.sleep(2)  # wait for ESP32 to boot
-    print(f"Connected to ESP32 on {PORT}")
-except Exception as e:
-    print("Failed to open serial port:", e)
-    sys.exit(1)
-
-# Initialize JSON file if not exists
-if not os.path.isfile(JSON_FILE):
-    with open(JSON_FILE, 'w') as f:
-        json.dump([], f, indent=4)
-
-print("Collecting data from ESP32 in real-time... Press Ctrl+C to stop.")
-
-try:
-    while True:
-        try:
-            line = esp.readline().decode(errors="ignore").strip()
-        except Exception as e:
-            print("Serial read error:", e)
-            continue
-
-        if line.startswith("ts="):
-            parts = line.split(";")
-            data_dict = {p.split("=")[0].strip(): p.split("=")[1].strip()
-                         for p in parts if "=" in p}
-
-            # Add system timestamp
-            data_dict["system_timestamp"] = datetime.now().isoformat()
-
-            # Load existing JSON, append new entry, write back
-            try:
-                with open(JSON_FILE, 'r+') as f:
-                    try:
-                        existing_data = json.load(f)
-                    except json.JSONDecodeError:
-                        existing_data = []
-
-                    existing_data.append(data_dict)
-
-                    f.seek(0)
-                    json.dump(existing_data, f, indent=4)
-                    f.truncate()  # remove leftover content
-                    f.flush()
-                    os.fsync(f.fileno())
-
-                print("Saved:", data_dict)
-            except Exception as e:
-                print("Error writing to JSON:", e)
-
-        time.sleep(READ_INTERVAL)
 
-except KeyboardInterrupt:
-    print("\nData collection stopped by user.")
-    esp.close()
+async def main():
+    publish("collector")  # stage histograms for the backend's /metrics (data/metrics/collector.json)
+    # Import the old data.json once, then open the log for appending
+    imported = migrate_legacy_json(JSON_FILE, LOG_DIR)
+    if imported:
+        print(f"Imported {imported} readings from {JSON_FILE} into {LOG_DIR}")
+    log = SegmentLogWriter(LOG_DIR,
+                           max_segment_bytes=MAX_SEGMENT_MB * 1024 * 1024,
+                           max_segment_age=MAX_SEGMENT_AGE,
+                           fsync_interval=FSYNC_INTERVAL)
+    # the database is only touched from the storage thread
+    db = (ReadingWriter(SQLITE_DB, batch_size=DB_BATCH, flush_interval=DB_FLUSH_INTERVAL,
+                        check_same_thread=False) if SQLITE_DB else None)
+
+    storage = StorageWriter(asyncio.Queue(QUEUE_SIZE), log, db, idle_flush=min(FSYNC_INTERVAL, DB_FLUSH_INTERVAL))
+    collector = Collector(storage, ports=None if AUTO_DETECT_COM else PORTS, baud=BAUD,
+                          rescan_interval=RESCAN_INTERVAL, reconnect_delay=RECONNECT_DELAY,
+                          boot_delay=BOOT_DELAY)
+    print("Collecting data from ESP32 boards in real-time... Press Ctrl+C to stop.")
+    try:
+        await collector.run(stats_interval=STATS_INTERVAL)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nData collection stopped by user.")
+        sys.exit(0)
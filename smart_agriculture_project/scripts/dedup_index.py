@@ -0,0 +1,135 @@
+# smart_agriculture_project/scripts/dedup_index.py
+"""
+Constant-time deduplication of sensor readings by (device, timestamp).
+
+Each device keeps a high-watermark (newest timestamp seen) and the exact keys
+seen inside a trailing window, bucketed by time so old buckets can be dropped
+wholesale as the watermark advances. Checking a reading is one dict lookup and
+one set lookup, so the cost per record does not depend on how much history has
+been processed.
+
+    - key newer than watermark - window: exact check against the recent keys,
+      so out-of-order late arrivals inside the window are handled correctly
+    - key older than watermark - window: rejected as "too late" (it can no
+      longer be told apart from an already-processed reading)
+
+Keys are integer microseconds since the epoch. State is small (bounded by the
+window, not by history) and round-trips through ``to_dict`` / ``from_dict`` so
+callers can persist it atomically together with their own checkpoint.
+"""
+import json
+import os
+from pathlib import Path
+
+DEFAULT_DEVICE = "default"
+US = 1_000_000
+
+
+class _DeviceIndex:
+    __slots__ = ("watermark", "buckets", "low_bucket")
+
+    def __init__(self):
+        self.watermark = None   # newest key seen (us)
+        self.buckets = {}       # bucket number -> set of keys
+        self.low_bucket = None  # oldest bucket that may still exist
+
+
+class DedupIndex:
+    def __init__(self, window_seconds=3600, bucket_seconds=60):
+        self.window_us = int(window_seconds * US)
+        self.bucket_us = max(1, int(bucket_seconds * US))
+        self._devices = {}
+        self.duplicates = 0
+        self.too_late = 0
+
+    def add(self, device_id, key_us) -> bool:
+        """Record a reading. Returns True if it is new, False if duplicate or too late."""
+        dev = self._devices.get(device_id)
+        if dev is None:
+            dev = self._devices[device_id] = _DeviceIndex()
+
+        if dev.watermark is not None and key_us < dev.watermark - self.window_us:
+            self.too_late += 1
+            return False
+
+        bucket_no = key_us // self.bucket_us
+        bucket = dev.buckets.get(bucket_no)
+        if bucket is None:
+            bucket = dev.buckets[bucket_no] = set()
+        elif key_us in bucket:
+            self.duplicates += 1
+            return False
+        bucket.add(key_us)
+        if dev.low_bucket is None or bucket_no < dev.low_bucket:
+            dev.low_bucket = bucket_no
+
+        if dev.watermark is None or key_us > dev.watermark:
+            dev.watermark = key_us
+            self._evict(dev)
+        return True
+
+    def _evict(self, dev):
+        cutoff = (dev.watermark - self.window_us) // self.bucket_us
+        if dev.low_bucket is None or dev.low_bucket >= cutoff:
+            return
+        if cutoff - dev.low_bucket > len(dev.buckets):
+            # big jump in time: cheaper to scan the live buckets than the gap
+            for b in [b for b in dev.buckets if b < cutoff]:
+                del dev.buckets[b]
+        else:
+            for b in range(dev.low_bucket, cutoff):
+                dev.buckets.pop(b, None)
+        dev.low_bucket = cutoff
+
+    def filter_new(self, device_ids, keys_us):
+        """Vector of booleans, True for each (device, key) pair not seen before."""
+        add = self.add
+        return [add(d, k) for d, k in zip(device_ids, keys_us)]
+
+    def watermark(self, device_id=DEFAULT_DEVICE):
+        dev = self._devices.get(device_id)
+        return None if dev is None else dev.watermark
+
+    def __len__(self):
+        return sum(len(b) for dev in self._devices.values() for b in dev.buckets.values())
+
+    # ---------------- persistence ----------------
+    def to_dict(self):
+        return {
+            "window_us": self.window_us,
+            "bucket_us": self.bucket_us,
+            "devices": {
+                str(d): {"watermark": dev.watermark,
+                         "keys": sorted(k for b in dev.buckets.values() for k in b)}
+                for d, dev in self._devices.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, state, window_seconds=None, bucket_seconds=None):
+        """Restore from ``to_dict`` output; window/bucket arguments override the stored ones."""
+        index = cls(window_seconds if window_seconds is not None else state["window_us"] / US,
+                    bucket_seconds if bucket_seconds is not None else state["bucket_us"] / US)
+        for device_id, dev_state in state.get("devices", {}).items():
+            dev = index._devices[device_id] = _DeviceIndex()
+            dev.watermark = dev_state.get("watermark")
+            for k in dev_state.get("keys", []):
+                if dev.watermark is None or k >= dev.watermark - index.window_us:
+                    b = k // index.bucket_us
+                    dev.buckets.setdefault(b, set()).add(k)
+            dev.low_bucket = min(dev.buckets) if dev.buckets else None
+        return index
+
+    def save(self, path):
+        """Write the index to ``path`` atomically."""
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), separators=(",", ":")))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, window_seconds=3600, bucket_seconds=60):
+        path = Path(path)
+        if not path.exists():
+            return cls(window_seconds, bucket_seconds)
+        return cls.from_dict(json.loads(path.read_text()), window_seconds, bucket_seconds)
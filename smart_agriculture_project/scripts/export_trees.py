@@ -0,0 +1,199 @@
+# smart_agriculture_project/scripts/export_trees.py
+"""
+Flatten trained tree models into the array format read by ``tree_model.py``.
+
+    python export_trees.py                  # export xgb_water, xgb_water_realtime, rf_water
+    python export_trees.py xgb_water.pkl    # just one model
+
+Checks that the exported model reproduces the original's labels and
+probabilities bit for bit on the processed dataset plus random probes (some
+with missing values), and only then writes ``<name>.npz`` next to the ``.pkl``
+in ``data/models``.
+"""
+import json
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from tree_model import RF_CLASSIFIER, XGB_LOGISTIC, TreeEnsemble, save_compiled
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+models_folder = BASE_DIR / "data" / "models"
+DEFAULT_MODELS = ["xgb_water.pkl", "xgb_water_realtime.pkl", "rf_water.pkl"]
+
+
+def _flatten(trees):
+    """
+    Concatenate per-tree node lists into shared arrays. ``trees`` is a list of dicts
+    with feature/threshold/left/right/default_left/value per node (-1 children = leaf).
+    """
+    roots, offset, depth = [], 0, 0
+    cols = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "value")}
+    for t in trees:
+        n = len(t["left"])
+        idx = np.arange(n)
+        left = np.asarray(t["left"])
+        right = np.asarray(t["right"])
+        leaf = left < 0
+        # leaves point at themselves so a fixed number of steps always lands on a leaf
+        cols["left"].append(np.where(leaf, idx, left) + offset)
+        cols["right"].append(np.where(leaf, idx, right) + offset)
+        cols["feature"].append(np.where(leaf, 0, t["feature"]))
+        cols["threshold"].append(np.asarray(t["threshold"]))
+        cols["default_left"].append(np.asarray(t["default_left"], dtype=bool))
+        cols["value"].append(np.asarray(t["value"]))
+        roots.append(offset)
+        depth = max(depth, _depth(left, right))
+        offset += n
+    arrays = {k: np.concatenate(v) for k, v in cols.items()}
+    arrays["left"] = arrays["left"].astype(np.int32)
+    arrays["right"] = arrays["right"].astype(np.int32)
+    arrays["feature"] = arrays["feature"].astype(np.int32)
+    arrays["roots"] = np.asarray(roots, dtype=np.int32)
+    return arrays, depth
+
+
+def _depth(left, right):
+    depth, frontier = 0, [0]
+    while frontier:
+        nxt = [c for n in frontier for c in (left[n], right[n]) if c >= 0]
+        if not nxt:
+            break
+        depth += 1
+        frontier = nxt
+    return depth
+
+
+def export_xgb(model, feature_names=None):
+    """Flatten a binary:logistic XGBClassifier (or Booster) into arrays + metadata."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise ValueError(f"Unsupported booster: {gbm['name']}")
+
+    raw_trees = gbm["model"]["trees"]
+    best = getattr(model, "best_iteration", None)
+    if best is not None:
+        raw_trees = raw_trees[:int(gbm["model"]["iteration_indptr"][best + 1])]
+
+    trees = []
+    for t in raw_trees:
+        if any(t.get("split_type", [])):
+            raise ValueError("Categorical splits are not supported")
+        trees.append({
+            "feature": t["split_indices"],
+            # the model JSON stores float32 values; round-trip through float32 exactly
+            "threshold": np.asarray(t["split_conditions"], dtype=np.float32),
+            "left": t["left_children"],
+            "right": t["right_children"],
+            "default_left": t["default_left"],
+            "value": np.asarray(t["split_conditions"], dtype=np.float32),
+        })
+    arrays, depth = _flatten(trees)
+
+    base_score = learner["learner_model_param"]["base_score"].strip("[]")
+    base_score = np.float32(float(base_score))
+    # XGBoost's ProbToMargin for logistic: -log(1/p - 1), in float32
+    base_margin = -np.log(np.float32(1.0) / base_score - np.float32(1.0))
+
+    names = feature_names or booster.feature_names or [f"f{i}" for i in range(int(learner["learner_model_param"]["num_feature"]))]
+    meta = {"kind": XGB_LOGISTIC, "feature_names": list(names), "classes": [0, 1],
+            "max_depth": depth, "base_margin": float(base_margin), "n_trees": len(trees)}
+    return arrays, meta
+
+
+def export_rf(model, feature_names=None):
+    """Flatten a scikit-learn RandomForestClassifier into arrays + metadata."""
+    trees = []
+    for est in model.estimators_:
+        t = est.tree_
+        value = t.value[:, 0, :].astype(np.float64)
+        # same normalisation as DecisionTreeClassifier.predict_proba
+        norm = value.sum(axis=1, keepdims=True)
+        norm[norm == 0.0] = 1.0
+        missing_left = getattr(t, "missing_go_to_left", None)
+        trees.append({
+            "feature": t.feature,
+            "threshold": t.threshold.astype(np.float64),
+            "left": t.children_left,
+            "right": t.children_right,
+            "default_left": missing_left if missing_left is not None else np.zeros(t.node_count, dtype=bool),
+            "value": value / norm,
+        })
+    arrays, depth = _flatten(trees)
+    names = feature_names or list(getattr(model, "feature_names_in_", [f"f{i}" for i in range(model.n_features_in_)]))
+    meta = {"kind": RF_CLASSIFIER, "feature_names": [str(n) for n in names],
+            "classes": model.classes_.tolist(), "max_depth": depth, "n_trees": len(trees)}
+    return arrays, meta
+
+
+def export_model(model):
+    if hasattr(model, "get_booster"):
+        return export_xgb(model)
+    if hasattr(model, "estimators_"):
+        return export_rf(model)
+    raise TypeError(f"Don't know how to export {type(model).__name__}")
+
+
+def verify(model, compiled, X):
+    """Return (labels identical, probabilities bit-identical) of compiled vs original on X."""
+    import pandas as pd
+
+    frame = pd.DataFrame(X, columns=compiled.feature_names)
+    expected = np.asarray(model.predict(frame))
+    got = compiled.predict(X)
+    same = bool(np.array_equal(expected, got))
+    single = all(compiled.predict_one(tuple(row)) == e for row, e in zip(X[:200], expected[:200]))
+    proba_same = bool(np.array_equal(np.asarray(model.predict_proba(frame)), compiled.predict_proba(X)))
+    return same and single, proba_same
+
+
+def _verification_data(compiled, n_random=20_000, seed=0):
+    """Processed rows for the model's features, plus random probes in the same ranges."""
+    rng = np.random.default_rng(seed)
+    X = None
+    try:
+        from processed_store import load_processed
+        X = load_processed(columns=compiled.feature_names).to_numpy(dtype=np.float32)
+    except Exception:
+        pass
+    lo = np.nanmin(X, axis=0) if X is not None and len(X) else np.zeros(compiled.n_features)
+    hi = np.nanmax(X, axis=0) if X is not None and len(X) else np.full(compiled.n_features, 4095.0)
+    probes = rng.uniform(lo - 1, hi + 1, size=(n_random, compiled.n_features)).astype(np.float32)
+    probes[rng.random(probes.shape) < 0.01] = np.nan  # exercise the missing-value branches
+    return probes if X is None else np.vstack([X, probes])
+
+
+def check_export(model, arrays, meta):
+    """(labels identical, probabilities identical) of the exported arrays vs ``model``."""
+    compiled = TreeEnsemble(arrays, meta)
+    return verify(model, compiled, _verification_data(compiled))
+
+
+def export_file(pkl_path):
+    """Export one pickle to ``.npz``; nothing is written unless the export reproduces the model."""
+    pkl_path = Path(pkl_path)
+    model = joblib.load(pkl_path)
+    arrays, meta = export_model(model)
+    out = pkl_path.with_suffix(".npz")
+    same, proba_same = check_export(model, arrays, meta)
+    print(f"{pkl_path.name} -> {out.name}: {meta['n_trees']} trees, depth {meta['max_depth']}, "
+          f"labels identical: {same}, probabilities identical: {proba_same}")
+    if not (same and proba_same):
+        out.unlink(missing_ok=True)  # an older export would be preferred over the new .pkl
+        raise SystemExit(f"Exported {pkl_path.name} does not reproduce the original predictions")
+    save_compiled(out, arrays, meta)
+    return out
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or DEFAULT_MODELS
+    for name in names:
+        path = Path(name)
+        export_file(path if path.exists() else models_folder / name)
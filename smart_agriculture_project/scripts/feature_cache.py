@@ -0,0 +1,164 @@
+# smart_agriculture_project/scripts/feature_cache.py
+"""
+Feature matrices built once from the processed store and cached as ``.npy``.
+
+    data/cache/features/<key>/X.npy           float32, rows x FEATURES
+    data/cache/features/<key>/y.npy           int8 target
+    data/cache/features/<key>/train_idx.npy   the shared stratified split
+    data/cache/features/<key>/test_idx.npy
+    data/cache/features/<key>/meta.json       features, rows, class counts, newest row, data sha256
+
+``key`` hashes the source files (path, size, mtime of every live Parquet file
+or the CSV fallback) together with the features, target, time window and
+split settings. When preprocessing adds a batch, the key changes and the next
+call rebuilds. Until then every trainer opens the same arrays with
+``mmap_mode="r"``, so parallel workers share one copy through the page cache
+and nobody re-reads or re-splits the store.
+
+    from feature_cache import load_features
+    fs = load_features()
+    model.fit(fs.frame(fs.train_idx), fs.y[fs.train_idx])
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from processed_store import CSV_EXPORT_FILE, STORE_DIR, _files_for_range, load_processed
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "data" / "cache" / "features"
+KEEP_ENTRIES = 4  # older cache entries are pruned after a build
+
+FEATURES = ['TEMP_C', 'HUMIDITY', 'SOIL_PCT', 'LDR']
+TARGET = 'irrigation_needed'
+TEST_SIZE = 0.2
+SEED = 42
+ARRAYS = ("X", "y", "train_idx", "test_idx")
+
+
+class FeatureSet:
+    """Cached feature matrix, target and train/test split (arrays are memory-mapped)."""
+
+    def __init__(self, path, meta, arrays):
+        self.path = Path(path)
+        self.meta = meta
+        self.key = meta["key"]
+        self.features = meta["features"]
+        self.X, self.y, self.train_idx, self.test_idx = (arrays[a] for a in ARRAYS)
+        self.built = False  # True when this call built the entry (cache miss)
+
+    def frame(self, idx=None):
+        """Rows ``idx`` (default: all) as a DataFrame with the feature names."""
+        import pandas as pd
+
+        X = self.X if idx is None else self.X[idx]
+        return pd.DataFrame(np.asarray(X), columns=self.features)
+
+    def __repr__(self):
+        return f"FeatureSet({self.key}, {len(self.y)} rows, {len(self.features)} features)"
+
+
+def source_files(store_dir=STORE_DIR, csv_file=CSV_EXPORT_FILE):
+    """The files ``load_processed`` would read: live Parquet files, else the CSV export."""
+    files = _files_for_range(Path(store_dir), None, None) if Path(store_dir).exists() else []
+    return sorted(files) or ([Path(csv_file)] if Path(csv_file).exists() else [])
+
+
+def cache_key(features=FEATURES, target=TARGET, last_days=None, test_size=TEST_SIZE, seed=SEED,
+              store_dir=STORE_DIR, csv_file=CSV_EXPORT_FILE):
+    """Hash of the source files' identity plus everything that shapes the arrays."""
+    files = []
+    for f in source_files(store_dir, csv_file):
+        st = f.stat()
+        files.append([str(f), st.st_size, st.st_mtime_ns])
+    spec = {"features": list(features), "target": target, "last_days": last_days,
+            "as_of": date.today().isoformat() if last_days is not None else None,
+            "test_size": test_size, "seed": seed, "files": files}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def split_indices(y, test_size=TEST_SIZE, seed=SEED):
+    """Stratified train/test indices; train and test on everything when a class is too small."""
+    from sklearn.model_selection import StratifiedShuffleSplit
+
+    everything = np.arange(len(y))
+    classes, counts = np.unique(y, return_counts=True)
+    if len(classes) < 2 or counts.min() < 2:
+        print("Dataset too small or too imbalanced. Training on all data.")
+        return everything, everything
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+    train_idx, test_idx = next(sss.split(np.zeros(len(y)), y))
+    return np.sort(train_idx), np.sort(test_idx)
+
+
+def open_cached(path):
+    """Open a cache entry directory (arrays memory-mapped, read-only)."""
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+    arrays = {a: np.load(path / f"{a}.npy", mmap_mode="r") for a in ARRAYS}
+    return FeatureSet(path, meta, arrays)
+
+
+def _build(path, key, features, target, last_days, test_size, seed, store_dir, csv_file):
+    t0 = time.perf_counter()
+    import pandas as pd
+
+    data = load_processed(columns=list(features) + [target, "system_timestamp"], last_days=last_days,
+                          store_dir=store_dir, csv_fallback=csv_file)
+    data = data.dropna(subset=list(features) + [target])
+    newest = pd.to_datetime(data["system_timestamp"], errors="coerce", format="ISO8601").max()
+    X = np.ascontiguousarray(data[list(features)].to_numpy(dtype=np.float32))
+    y = data[target].to_numpy().astype(np.int8)
+    train_idx, test_idx = split_indices(y, test_size, seed)
+    classes, counts = np.unique(y, return_counts=True)
+
+    digest = hashlib.sha256(X.tobytes())
+    digest.update(y.tobytes())
+    meta = {"key": key, "features": list(features), "target": target, "last_days": last_days,
+            "rows": int(len(y)), "train_rows": int(len(train_idx)), "test_rows": int(len(test_idx)),
+            "classes": {str(c): int(n) for c, n in zip(classes, counts)},
+            "data_until": None if pd.isna(newest) else newest.isoformat(),
+            "data_sha256": digest.hexdigest(), "build_seconds": round(time.perf_counter() - t0, 4),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    # write beside the final name and rename, so a half-written entry is never opened
+    tmp = path.with_name(f".tmp-{key}-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, arr in zip(ARRAYS, (X, y, train_idx, test_idx)):
+        np.save(tmp / f"{name}.npy", arr)
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+    try:
+        os.rename(tmp, path)
+    except OSError:  # another process built the same key first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def prune(cache_dir=CACHE_DIR, keep=KEEP_ENTRIES):
+    entries = sorted((p for p in Path(cache_dir).iterdir() if p.is_dir() and not p.name.startswith(".")),
+                     key=lambda p: p.stat().st_mtime)
+    for old in entries[:-keep] if keep else []:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_features(features=FEATURES, target=TARGET, last_days=None, test_size=TEST_SIZE, seed=SEED,
+                  store_dir=STORE_DIR, csv_file=CSV_EXPORT_FILE, cache_dir=CACHE_DIR, rebuild=False):
+    """The cached ``FeatureSet`` for the current processed data, built on a miss."""
+    key = cache_key(features, target, last_days, test_size, seed, store_dir, csv_file)
+    path = Path(cache_dir) / key
+    if rebuild:
+        shutil.rmtree(path, ignore_errors=True)
+    built = not (path / "meta.json").exists()
+    if built:
+        _build(path, key, features, target, last_days, test_size, seed, store_dir, csv_file)
+        prune(cache_dir)
+    os.utime(path)  # recently used entries survive pruning
+    fs = open_cached(path)
+    fs.built = built
+    return fs
@@ -0,0 +1,210 @@
+# smart_agriculture_project/scripts/irrigation_control.py
+"""
+Event-driven irrigation control: reading -> prediction -> pump command.
+
+``ControlLoop`` wakes up as soon as the ESP32's port has data. It runs each
+reading through parse, feature, predict and actuate right away; there is no
+polling interval. ``PumpController`` sits between the model and the pump:
+
+    hysteresis      switch ON at P(irrigation) >= on_threshold, OFF only once it
+                    has dropped to <= off_threshold, so a probability hovering
+                    near 0.5 cannot toggle the pump on every reading
+    min_on/min_off  once switched, the pump keeps its state at least this long
+    max_on          safety stop for a run that never sees a dry->wet prediction
+
+Every stage is timed into a histogram (metrics.py):
+
+    control_read_seconds       serial read of one chunk
+    control_parse_seconds      FrameDecoder on that chunk
+    control_feature_seconds    model lookup + record -> feature tuple
+    control_predict_seconds    inference
+    control_actuate_seconds    command queued -> acknowledged by the board
+    control_e2e_seconds        data readable -> decision (and command) done
+    control_actuation_e2e_seconds  the same, for readings that sent a command
+
+plus the counters ``control_readings_total`` / ``control_commands_total``,
+``control_malformed_frames_total`` and ``control_skipped_readings_total``
+(frames without a usable model feature); both kinds are also printed.
+Run.py publishes them for the backend's ``/metrics``.
+"""
+import asyncio
+import time
+
+from actuator import ActuatorClient
+from metrics import counter, histogram, report, timer
+from sensor_protocol import FrameDecoder
+
+READ = histogram("control_read_seconds", "serial read of one chunk")
+PARSE = histogram("control_parse_seconds", "frame decoding of one chunk")
+FEATURE = histogram("control_feature_seconds", "model lookup and record -> features")
+PREDICT = histogram("control_predict_seconds", "model inference")
+ACTUATE = histogram("control_actuate_seconds", "pump command until acknowledged")
+E2E = histogram("control_e2e_seconds", "data readable -> decision done")
+ACTUATION_E2E = histogram("control_actuation_e2e_seconds", "data readable -> pump command acknowledged")
+READINGS = counter("control_readings_total", "readings decided on")
+COMMANDS = counter("control_commands_total", "pump commands sent")
+MALFORMED = counter("control_malformed_frames_total", "sensor frames that could not be parsed")
+SKIPPED = counter("control_skipped_readings_total", "readings missing a model feature")
+
+
+class PumpController:
+    """Hysteresis and minimum on/off times on top of the model's probability."""
+
+    def __init__(self, on_threshold=0.6, off_threshold=0.4, min_on=30.0, min_off=60.0,
+                 max_on=None, state="OFF", clock=time.monotonic):
+        if off_threshold > on_threshold:
+            raise ValueError("off_threshold must not be above on_threshold")
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.min_on = min_on
+        self.min_off = min_off
+        self.max_on = max_on
+        self.state = state
+        self.clock = clock
+        self.changed_at = float("-inf")  # the first decision is never held back
+        self._previous = (state, self.changed_at)
+
+    def update(self, probability, now=None):
+        """Feed one P(irrigation needed); returns "ON"/"OFF" when the pump must switch, else None."""
+        now = self.clock() if now is None else now
+        held = now - self.changed_at
+        if self.state == "OFF":
+            if probability >= self.on_threshold and held >= self.min_off:
+                return self._switch("ON", now)
+        else:
+            too_long = self.max_on is not None and held >= self.max_on
+            if (probability <= self.off_threshold and held >= self.min_on) or too_long:
+                return self._switch("OFF", now)
+        return None
+
+    def force(self, state, now=None):
+        """Record a switch made outside ``update`` (manual command, shutdown)."""
+        if state != self.state:
+            self._switch(state, self.clock() if now is None else now)
+
+    def undo(self):
+        """Take back the last switch, e.g. when the pump never confirmed it."""
+        self.state, self.changed_at = self._previous
+
+    def _switch(self, state, now):
+        self._previous = (self.state, self.changed_at)
+        self.state = state
+        self.changed_at = now
+        return state
+
+
+class ControlLoop:
+    """
+    Drives one ESP32's pump from the readings on its actuator connection.
+
+    The loop shares the ``ActuatorClient``'s serial connection: it decodes the
+    chunks the client reads and sends its commands through the client's queue,
+    so each command is acknowledged and retried. ``get_model`` returns the
+    current model (the registry hot-swaps it).
+    ``on_prediction(record, label, probability, model)`` and
+    ``on_command(CommandResult)`` run after the command is out, so recording
+    them never delays actuation. A running pump is switched off when the loop
+    stops. The frame decoder starts over whenever the actuator reconnects.
+    """
+
+    def __init__(self, actuator: ActuatorClient, get_model, controller: PumpController, features=None,
+                 on_prediction=None, on_command=None):
+        self.actuator = actuator
+        self.get_model = get_model
+        self.controller = controller
+        self.features = features
+        self.on_prediction = on_prediction
+        self.on_command = on_command
+        self.decoder = FrameDecoder(skip_first=True)
+        self.readings = 0
+        self.commands = 0
+        self.skipped = 0
+        self._malformed = 0
+        self._chunks = asyncio.Queue()
+        actuator.on_chunk = lambda *chunk: self._chunks.put_nowait(chunk)
+        actuator.on_connect = lambda: self._chunks.put_nowait(None)  # in order with the chunks
+
+    async def command(self, cmd):
+        """Send a command outside the control path (e.g. OFF on shutdown)."""
+        result = await self.actuator.send(cmd)
+        if result.ok:  # the pump only changed state once the board confirmed it
+            self.controller.force(cmd)
+        if self.on_command is not None:
+            self.on_command(result)
+        return result
+
+    async def _on_record(self, record, arrived):
+        """Feature -> predict -> decide -> actuate for one reading that arrived at ``arrived``."""
+        t0 = time.perf_counter()
+        model = self.get_model()
+        try:
+            x = tuple(float(record[f]) for f in self.features or model.features)
+        except (KeyError, TypeError, ValueError) as e:
+            self.skipped += 1
+            SKIPPED.inc()
+            print(f"[{self.actuator.device_id}] Skipping incomplete reading ({e}): {record}")
+            return
+        t1 = time.perf_counter()
+        FEATURE.observe(t1 - t0)
+
+        with timer(PREDICT):  # a timer() stage, so METRICS_PROFILE can sample it
+            proba = model.predict_proba_one(x)
+        probability = float(proba[-1])
+        label = int(probability > 0.5)
+        t2 = time.perf_counter()
+
+        cmd = self.controller.update(probability)
+        result = None
+        if cmd is not None:
+            result = await self.actuator.send(cmd)
+            t3 = time.perf_counter()
+            ACTUATE.observe(t3 - t2)
+            ACTUATION_E2E.observe(t3 - arrived)
+            self.commands += 1
+            COMMANDS.inc()
+            if not result.ok:
+                self.controller.undo()  # not confirmed: decide again on the next reading
+        E2E.observe(time.perf_counter() - arrived)
+        self.readings += 1
+        READINGS.inc()
+
+        if self.on_prediction is not None:
+            self.on_prediction(record, label, probability, model)
+        if result is not None and self.on_command is not None:
+            self.on_command(result)
+
+    def _report_malformed(self):
+        MALFORMED.inc(self.decoder.malformed - self._malformed)
+        self._malformed = self.decoder.malformed
+        for error in self.decoder.errors:
+            print(f"[{self.actuator.device_id}] Malformed sensor frame: {error}")
+        self.decoder.errors.clear()
+
+    async def run(self):
+        await self.actuator.start()
+        try:
+            while True:
+                item = await self._chunks.get()
+                if item is None:
+                    self.decoder.reset()  # reopened port: the first line is partial again
+                    continue
+                chunk, readable_at, read_seconds = item
+                READ.observe(read_seconds)
+                t0 = time.perf_counter()
+                records = self.decoder.feed(chunk)
+                PARSE.observe(time.perf_counter() - t0)
+                if self.decoder.malformed != self._malformed:
+                    self._report_malformed()
+                for record in records:
+                    await self._on_record(record, readable_at)
+        finally:
+            if self.controller.state == "ON":
+                try:
+                    await self.command("OFF")  # never leave the pump running unattended
+                except Exception as e:
+                    print("Could not switch the pump off:", e)
+            await self.actuator.stop()
+
+
+def latency_report():
+    return report("control_")
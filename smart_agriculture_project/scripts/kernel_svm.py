@@ -0,0 +1,248 @@
+# smart_agriculture_project/scripts/kernel_svm.py
+"""
+RBF-kernel SVM for large datasets: Nystroem features + linear SVM trained in mini-batches.
+
+``SVC(kernel='rbf', probability=True)`` is quadratic to cubic in the number of
+rows, and its probabilities come from an extra internal 5-fold
+cross-validation. ``ApproxKernelSVM`` replaces it with:
+
+    scaling      StandardScaler, fitted with partial_fit in the first pass
+    kernel map   Nystroem on LANDMARK_ROWS rows (reservoir sample of the first
+                 pass), N_COMPONENTS features, same gamma convention as SVC
+                 (``gamma='scale'`` = 1 / n_features on standardised data)
+    linear SVM   SGDClassifier(loss='hinge') with partial_fit over EPOCHS passes,
+                 alpha = 1 / (C * n_rows), the SVC equivalent of ``C``
+    calibration  Platt scaling (a 1-D logistic regression on the decision
+                 value) fitted on a held-out share of the rows, not cross-validated
+
+Data comes in as batches, so memory is bounded by one batch plus the samples
+(landmarks, calibration rows), whatever the number of rows. Input batches can
+be in-memory arrays (``fit``) or the processed store streamed with
+``processed_store.iter_batches`` (``fit_batches`` / the command line).
+
+train_all.py uses this model for ``svm_water`` above ``EXACT_SVM_MAX_ROWS``
+training rows.
+
+    python kernel_svm.py                    # stream the store, publish svm_water
+    python kernel_svm.py --no-publish
+"""
+import argparse
+import time
+
+import numpy as np
+
+from feature_cache import FEATURES, TARGET
+
+# --- Config ---
+N_COMPONENTS = 300       # Nystroem features
+LANDMARK_ROWS = 5_000    # rows sampled to fit the kernel map
+EPOCHS = 3               # SGD passes over the data
+BATCH_SIZE = 65_536
+CALIBRATION_SHARE = 0.02  # rows held out for Platt scaling ...
+CALIBRATION_ROWS = 50_000  # ... at most this many are kept
+TEST_SHARE = 0.05         # command line only: rows held out for the report
+SEED = 42
+
+
+def row_buckets(start, n):
+    """Stable bucket 0..999 per global row number, so every pass holds out the same rows."""
+    idx = np.arange(start, start + n, dtype=np.uint64)
+    return ((idx * np.uint64(2654435761)) % np.uint64(1_000_003)) % np.uint64(1000)
+
+
+class _Reservoir:
+    """Uniform sample of at most ``size`` rows from a stream (algorithm R, vectorised per batch)."""
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.X, self.y = None, None
+        self.seen = 0
+
+    def add(self, X, y):
+        if not len(X):
+            return
+        if self.X is None:
+            self.X = np.empty((self.size, X.shape[1]), dtype=np.float64)
+            self.y = np.empty(self.size, dtype=y.dtype)
+        fill = min(max(self.size - self.seen, 0), len(X))
+        self.X[self.seen:self.seen + fill], self.y[self.seen:self.seen + fill] = X[:fill], y[:fill]
+        if fill < len(X):
+            pos = self.seen + np.arange(fill, len(X))
+            slots = self.rng.integers(0, pos + 1)
+            keep = slots < self.size
+            self.X[slots[keep]], self.y[slots[keep]] = X[fill:][keep], y[fill:][keep]
+        self.seen += len(X)
+
+    def sample(self):
+        n = min(self.seen, self.size)
+        return (self.X[:n], self.y[:n]) if n else (np.empty((0, 0)), np.empty(0))
+
+
+def array_batches(X, y, batch_size=BATCH_SIZE):
+    """A batch source over in-memory (or memory-mapped) arrays."""
+    X = X.to_numpy() if hasattr(X, "to_numpy") else X
+    y = y.to_numpy() if hasattr(y, "to_numpy") else y
+
+    def batches():
+        for i in range(0, len(y), batch_size):
+            yield np.asarray(X[i:i + batch_size], dtype=np.float64), np.asarray(y[i:i + batch_size])
+    return batches
+
+
+def store_batches(features=FEATURES, target=TARGET, batch_size=BATCH_SIZE, **kw):
+    """A batch source over the processed store (one Parquet batch in memory at a time)."""
+    from processed_store import iter_batches
+
+    def batches():
+        for df in iter_batches(columns=list(features) + [target], batch_size=batch_size, **kw):
+            df = df.dropna()
+            yield df[list(features)].to_numpy(dtype=np.float64), df[target].to_numpy(dtype=np.int64)
+    return batches
+
+
+class ApproxKernelSVM:
+    """Nystroem + SGD hinge-loss SVM with held-out Platt calibration; ``predict_proba`` like SVC."""
+
+    def __init__(self, C=1.0, gamma="scale", n_components=N_COMPONENTS, epochs=EPOCHS,
+                 landmark_rows=LANDMARK_ROWS, calibration_share=CALIBRATION_SHARE,
+                 calibration_rows=CALIBRATION_ROWS, random_state=SEED):
+        self.C = C
+        self.gamma = gamma
+        self.n_components = n_components
+        self.epochs = epochs
+        self.landmark_rows = landmark_rows
+        self.calibration_share = calibration_share
+        self.calibration_rows = calibration_rows
+        self.random_state = random_state
+        self.classes_ = np.array([0, 1])
+
+    def fit(self, X, y):
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        return self.fit_batches(array_batches(X, y))
+
+    def fit_batches(self, batches):
+        """Fit from ``batches()``, a callable returning a fresh iterator of (X, y) arrays per pass."""
+        from sklearn.kernel_approximation import Nystroem
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+
+        cal_cut = int(self.calibration_share * 1000)
+        rng = np.random.default_rng(self.random_state)
+
+        # pass 1: scaler, kernel landmarks, calibration rows
+        self.scaler_ = StandardScaler()
+        landmarks = _Reservoir(self.landmark_rows, self.random_state)
+        calibration = _Reservoir(self.calibration_rows, self.random_state + 1)
+        n_train = 0
+        start = 0
+        for X, y in batches():
+            held = row_buckets(start, len(y)) < cal_cut
+            start += len(y)
+            self.scaler_.partial_fit(X[~held])
+            landmarks.add(X[~held], y[~held])
+            calibration.add(X[held], y[held])
+            n_train += int((~held).sum())
+        if not n_train:
+            raise ValueError("No training rows")
+
+        gamma = 1.0 / self.scaler_.n_features_in_ if self.gamma == "scale" else self.gamma
+        self.map_ = Nystroem(kernel="rbf", gamma=gamma, random_state=self.random_state,
+                             n_components=min(self.n_components, landmarks.seen))
+        self.map_.fit(self.scaler_.transform(landmarks.sample()[0]))
+
+        # passes 2..: linear SVM on the kernel features, one batch at a time
+        self.linear_ = SGDClassifier(loss="hinge", alpha=1.0 / (self.C * n_train),
+                                     random_state=self.random_state)
+        for _ in range(self.epochs):
+            start = 0
+            for X, y in batches():
+                keep = row_buckets(start, len(y)) >= cal_cut
+                start += len(y)
+                order = rng.permutation(int(keep.sum()))
+                self.linear_.partial_fit(self._features(X[keep][order]), y[keep][order], classes=self.classes_)
+
+        # held-out Platt scaling
+        X_cal, y_cal = calibration.sample()
+        self.calibrator_ = None
+        if len(np.unique(y_cal)) == 2:
+            self.calibrator_ = LogisticRegression(C=1e4)
+            self.calibrator_.fit(self._decision(X_cal).reshape(-1, 1), y_cal)
+        self.n_train_ = n_train
+        self.n_calibration_ = len(y_cal)
+        return self
+
+    def _features(self, X):
+        return self.map_.transform(self.scaler_.transform(X))
+
+    def _decision(self, X):
+        return self.linear_.decision_function(self._features(X))
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.concatenate([self._decision(X[i:i + BATCH_SIZE]) for i in range(0, len(X), BATCH_SIZE)]
+                              or [np.empty(0)])
+
+    def predict_proba(self, X):
+        d = self.decision_function(X)
+        if self.calibrator_ is not None:
+            p = self.calibrator_.predict_proba(d.reshape(-1, 1))[:, 1]
+        else:
+            p = 1.0 / (1.0 + np.exp(-d))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def __repr__(self):
+        return f"ApproxKernelSVM(C={self.C}, gamma={self.gamma!r}, n_components={self.n_components})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--C", type=float, default=1.0)
+    parser.add_argument("--gamma", default="scale")
+    parser.add_argument("--components", type=int, default=N_COMPONENTS)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--no-publish", action="store_true")
+    args = parser.parse_args()
+
+    # pickle the class under its module name, so other processes can load the published model
+    from kernel_svm import ApproxKernelSVM
+    from train_all import evaluate
+
+    gamma = args.gamma if args.gamma == "scale" else float(args.gamma)
+    test = _Reservoir(200_000, SEED + 2)
+    source = store_batches()
+    lo, hi = 1000 - int(TEST_SHARE * 1000), 1000  # top buckets; calibration uses the bottom ones
+
+    passes = 0
+
+    def training_batches():
+        global passes
+        passes += 1
+        start = 0
+        for X, y in source():
+            held = row_buckets(start, len(y)) >= lo
+            start += len(y)
+            if passes == 1:  # collect the test rows once
+                test.add(X[held], y[held])
+            yield X[~held], y[~held]
+
+    model = ApproxKernelSVM(C=args.C, gamma=gamma, n_components=args.components, epochs=args.epochs)
+    t0 = time.perf_counter()
+    model.fit_batches(training_batches)
+    fit_seconds = time.perf_counter() - t0
+    model.feature_names_in_ = np.asarray(FEATURES, dtype=object)
+    X_test, y_test = test.sample()
+    metrics = evaluate(model, X_test, y_test) if len(y_test) else {}
+    print(f"ApproxKernelSVM on {model.n_train_:,} rows ({model.n_calibration_:,} calibration, "
+          f"{len(y_test):,} test) in {fit_seconds:.1f} s: {metrics}")
+
+    if not args.no_publish:
+        from model_registry import publish
+        version = publish("svm_water", model, FEATURES, training_rows=model.n_train_, metrics=metrics,
+                          extra={"mode": "nystroem-sgd", "fit_seconds": fit_seconds,
+                                 "params": {"C": args.C, "gamma": args.gamma, "n_components": args.components}})
+        print(f"Model saved as svm_water v{version}")
@@ -0,0 +1,426 @@
+# smart_agriculture_project/scripts/metrics.py
+"""
+In-process metrics: counters, gauges and latency histograms, with Prometheus export.
+
+Histograms use fixed log-spaced buckets, like Prometheus histograms. An
+observation is one bisect plus one increment, memory stays constant however
+long the process runs, and quantiles are estimated by interpolating inside
+the bucket that holds them. The default buckets go from 10 us to 10 s with 8
+per decade, so an estimate is off by at most one bucket width (x1.33).
+
+    from metrics import counter, histogram, timer
+
+    PREDICT = histogram("control_predict_seconds", "model inference per reading")
+    ROWS = counter("preprocess_rows_total", "rows read from the log")
+    with timer(PREDICT):
+        ...
+    ROWS.inc(len(batch))
+    print(report())
+
+Every metric may carry fixed labels (``labels={"route": "/predict"}``); each
+label set is its own series. ``render_prometheus`` writes the registry in the
+Prometheus text format (the backend serves it at ``/metrics``).
+
+Standalone scripts (data.py, preprocess_data.py, Run.py) publish their
+registry with ``publish(process)``. A background thread rewrites
+``data/metrics/<process>.json`` every PUBLISH_INTERVAL seconds, and the
+backend merges those files into ``/metrics`` with a ``process`` label.
+
+Sampling profiler (opt-in). With ``METRICS_PROFILE=<histogram name>[,...]``
+set, a thread samples the stacks of the threads that are inside ``timer()``
+of those stages every METRICS_PROFILE_INTERVAL_MS. It writes them as
+collapsed stacks (``a;b;c count``, the input of flamegraph.pl / speedscope) to
+``data/metrics/profile-<stage>-<pid>.folded``. Unset, ``timer()`` pays one
+global lookup for it.
+"""
+import atexit
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 10 us .. 10 s, 8 buckets per decade; observations above the last bound go to +Inf
+DEFAULT_BUCKETS = tuple(round(1e-5 * 10 ** (i / 8), 10) for i in range(49))
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+METRICS_DIR = Path(os.environ.get("METRICS_DIR", BASE_DIR / "data" / "metrics"))
+PUBLISH_INTERVAL = 5.0   # seconds between file sink writes
+STALE_AFTER = 300.0      # published files not rewritten for this long are ignored (process gone)
+PROFILE_STAGES = {s for s in os.environ.get("METRICS_PROFILE", "").split(",") if s}
+PROFILE_INTERVAL = float(os.environ.get("METRICS_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_FLUSH = 10.0     # seconds between profile file rewrites
+
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonically increasing count (events, rows, seconds spent)."""
+
+    kind = "counter"
+
+    def __init__(self, name, help="", labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def state(self):
+        return {"value": self.value}
+
+
+class Gauge:
+    """Current value, either set by the owner or read from ``fn`` at collection time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help="", labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.fn = fn
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        if self.fn is None:
+            return self._value
+        try:
+            return float(self.fn())
+        except Exception:
+            return float("nan")  # the owner went away; never break a scrape
+
+    def state(self):
+        return {"value": self.value}
+
+
+class Histogram:
+    """Bucketed distribution of observed values (seconds for latencies)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Estimated q-quantile (0..1); nan when nothing was observed."""
+        with self._lock:
+            counts, total, peak = list(self.counts), self.count, self.max
+        if not total:
+            return float("nan")
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else peak
+                return min(lo + (hi - lo) * (rank - seen) / n, peak)
+            seen += n
+        return peak
+
+    def snapshot(self):
+        with self._lock:
+            count, total, peak = self.count, self.sum, self.max
+        return {"count": count, "sum": total, "mean": total / count if count else float("nan"),
+                "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99),
+                "max": peak}
+
+    def state(self):
+        with self._lock:
+            return {"buckets": list(self.buckets), "counts": list(self.counts), "count": self.count,
+                    "sum": self.sum, "max": self.max}
+
+
+def _register(cls, name, labels, **kwargs):
+    labels = tuple(sorted((labels or {}).items()))
+    key = _series(name, labels)
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(key)
+        if metric is None:
+            metric = _REGISTRY[key] = cls(name, labels=labels, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{key} is already registered as a {metric.kind}")
+        return metric
+
+
+def histogram(name, help="", buckets=DEFAULT_BUCKETS, labels=None):
+    """The histogram registered under ``name`` (and ``labels``), created on first use."""
+    return _register(Histogram, name, labels, help=help, buckets=buckets)
+
+
+def counter(name, help="", labels=None):
+    return _register(Counter, name, labels, help=help)
+
+
+def gauge(name, help="", labels=None, fn=None):
+    """The gauge under ``name``; a new ``fn`` replaces the previous owner's (e.g. a restarted service)."""
+    metric = _register(Gauge, name, labels, help=help)
+    if fn is not None:
+        metric.fn = fn
+    return metric
+
+
+def histograms(prefix=""):
+    with _REGISTRY_LOCK:
+        return [m for key, m in sorted(_REGISTRY.items()) if key.startswith(prefix) and m.kind == "histogram"]
+
+
+class timer:
+    """Observe the wall time of the ``with`` block in ``hist`` (and profile it when enabled)."""
+
+    __slots__ = ("hist", "t0", "sampled")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.sampled = PROFILE_STAGES and self.hist.name in PROFILE_STAGES and _sampler_enter(self.hist.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0)
+        if self.sampled:
+            _sampler_exit(self.sampled)
+
+
+def report(prefix=""):
+    """Table of count / mean / p50 / p90 / p99 / max (ms) for the registered histograms."""
+    lines = [f"{'stage':<34} {'count':>9} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)"]
+    for h in histograms(prefix):
+        s = h.snapshot()
+        if not s["count"]:
+            continue
+        lines.append(f"{_series(h.name, h.labels):<34} {s['count']:>9,} "
+                     + " ".join(f"{s[k] * 1000:>8.3f}" for k in ("mean", "p50", "p90", "p99", "max")))
+    return "\n".join(lines)
+
+
+# ---------------- export ----------------
+def collect(skip_unused=False):
+    """
+    JSON-serialisable state of every registered metric. ``skip_unused`` leaves
+    out counters and histograms that never counted anything (declared by a
+    shared module, but not used by this process).
+    """
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+    states = [{"name": m.name, "kind": m.kind, "help": m.help, "labels": [list(kv) for kv in m.labels],
+               **m.state()} for m in metrics]
+    if skip_unused:
+        states = [s for s in states if s["kind"] == "gauge" or s.get("count", s.get("value"))]
+    return states
+
+
+def _number(value):
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(states=None, extra_labels=None):
+    """Prometheus text format (version 0.0.4) for ``states`` (default: this process's registry)."""
+    states = collect() if states is None else states
+    extra = tuple(sorted((extra_labels or {}).items()))
+    by_name = {}
+    for s in states:
+        by_name.setdefault(s["name"], []).append(s)
+    lines = []
+    for name, series in sorted(by_name.items()):
+        lines.append(f"# HELP {name} {series[0]['help'] or name}".rstrip())
+        lines.append(f"# TYPE {name} {series[0]['kind']}")
+        for s in series:
+            labels = tuple(tuple(kv) for kv in s["labels"]) + extra
+            if s["kind"] != "histogram":
+                lines.append(f"{_series(name, labels)} {_number(s['value'])}")
+                continue
+            cumulative = 0
+            for bound, n in zip(list(s["buckets"]) + [float("inf")], s["counts"]):
+                cumulative += n
+                lines.append(f"{_series(name + '_bucket', labels + (('le', _number(float(bound))),))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {_number(s['sum'])}")
+            lines.append(f"{_series(name + '_count', labels)} {s['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class FileSink:
+    """Rewrites ``<directory>/<process>.json`` with this process's metrics every ``interval`` seconds."""
+
+    def __init__(self, process, directory=METRICS_DIR, interval=PUBLISH_INTERVAL):
+        self.process = process
+        self.path = Path(directory) / f"{process}.json"
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"process": self.process, "pid": os.getpid(), "updated": time.time(),
+                                   "metrics": collect(skip_unused=True)}))
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print("Could not publish metrics:", e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"metrics-{self.process}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self.write()  # final state
+        except OSError:
+            pass
+
+
+def publish(process, directory=METRICS_DIR, interval=PUBLISH_INTERVAL):
+    """Start the file sink for a standalone script; the last write happens at exit."""
+    sink = FileSink(process, directory, interval).start()
+    atexit.register(sink.stop)
+    return sink
+
+
+def read_published(directory=METRICS_DIR, max_age=STALE_AFTER):
+    """[(process, states)] from the files written by ``publish``, skipping stale ones."""
+    out = []
+    now = time.time()
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # being replaced / not ours
+        if isinstance(data, dict) and "metrics" in data and now - data.get("updated", 0) <= max_age:
+            out.append((data.get("process", path.stem), data["metrics"]))
+    return out
+
+
+# ---------------- sampling profiler ----------------
+class StackSampler:
+    """
+    Samples the Python stacks of the threads registered with ``enter`` and
+    counts them as collapsed stacks per stage. ``sys._current_frames`` is read
+    from a separate thread, so the profiled code runs unchanged between samples.
+    """
+
+    def __init__(self, directory=METRICS_DIR, interval=PROFILE_INTERVAL):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.active = {}   # thread id -> stage
+        self.stacks = {}   # stage -> {collapsed stack: samples}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="metrics-profiler", daemon=True)
+        self._thread.start()
+        atexit.register(self.write)
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            if self.active:
+                frames = sys._current_frames()
+                with self._lock:
+                    for tid, stage in list(self.active.items()):
+                        frame = frames.get(tid)
+                        if frame is not None:
+                            counts = self.stacks.setdefault(stage, {})
+                            stack = self._collapse(frame)
+                            counts[stack] = counts.get(stack, 0) + 1
+            if time.monotonic() - last_flush >= PROFILE_FLUSH:
+                self.write()
+                last_flush = time.monotonic()
+
+    def write(self):
+        """Rewrite ``profile-<stage>-<pid>.folded`` for every stage sampled so far."""
+        with self._lock:
+            stacks = {stage: dict(counts) for stage, counts in self.stacks.items()}
+        for stage, counts in stacks.items():
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path = self.directory / f"profile-{stage}-{os.getpid()}.folded"
+                path.write_text("".join(f"{s} {n}\n" for s, n in sorted(counts.items())))
+            except OSError as e:
+                print("Could not write profile:", e)
+
+
+_sampler = None
+
+
+def _sampler_enter(stage):
+    global _sampler
+    if _sampler is None:
+        with _REGISTRY_LOCK:
+            if _sampler is None:
+                _sampler = StackSampler()
+    tid = threading.get_ident()
+    outer = _sampler.active.get(tid)
+    _sampler.active[tid] = stage
+    return (tid, outer)
+
+
+def _sampler_exit(entered):
+    tid, outer = entered  # a profiled stage nested in another one hands the thread back to it
+    if outer is None:
+        _sampler.active.pop(tid, None)
+    else:
+        _sampler.active[tid] = outer
@@ -0,0 +1,296 @@
+# smart_agriculture_project/scripts/model_registry.py
+"""
+Versioned model store over ``data/models`` with lazy, shared, hot-reloadable loading.
+
+Layout (one directory per model name, one per version):
+
+    data/models/xgb_water/CURRENT            -> "3"  (replaced atomically)
+    data/models/xgb_water/v0003/meta.json    features, training rows, metrics, ...
+    data/models/xgb_water/v0003/model.pkl    the original estimator
+    data/models/xgb_water/v0003/tree.json    tree models only: evaluator metadata
+    data/models/xgb_water/v0003/*.npy        tree models only: node arrays
+
+``publish`` writes a new version into a temporary directory, renames it into
+place and only then moves ``CURRENT``, so readers never see a half-written
+version. Tree models (XGBoost / random forest) that pass export_trees' check
+are also exported to plain ``.npy`` node arrays that are opened with
+``mmap_mode="r"``: every process that loads the same version shares one copy
+of the weights through the page cache.
+
+``ModelRegistry.get(name)`` loads on first use and caches in-process. At most
+every ``check_interval`` seconds it re-reads ``CURRENT``; when a new version has
+been published it loads it and swaps the cached reference in one assignment.
+A ``LoadedModel`` is never mutated, so predictions already running on the old
+version finish on it.
+
+Models not yet in the registry load from the flat ``<name>.npz`` / ``<name>.pkl``
+files (version 0), so nothing breaks before the first ``publish``.
+
+    python model_registry.py list
+    python model_registry.py import xgb_water.pkl rf_water.pkl   # register existing pickles
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from tree_model import TreeEnsemble, load_compiled, save_compiled
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "data" / "models"
+KEEP_VERSIONS = 5       # older versions are pruned on publish (the current one never is)
+CHECK_INTERVAL = 2.0    # seconds between checks of CURRENT; 0 = every call, None = never
+TREE_ARRAYS = ("roots", "feature", "threshold", "left", "right", "default_left", "value", "children")
+
+
+class LoadedModel:
+    """One immutable model version: tree evaluator (memory-mapped) or unpickled estimator."""
+
+    def __init__(self, name, version, meta, ensemble=None, estimator=None):
+        self.name = name
+        self.version = version
+        self.meta = meta
+        self.ensemble = ensemble
+        self.estimator = estimator
+        self.features = list(meta.get("features") or (ensemble.feature_names if ensemble else []))
+
+    def predict_proba(self, X):
+        if self.ensemble is not None:
+            return self.ensemble.predict_proba(X)
+        return np.asarray(self.estimator.predict_proba(self._frame(X)))
+
+    def predict(self, X):
+        if self.ensemble is not None:
+            return self.ensemble.predict(X)
+        return np.asarray(self.estimator.predict(self._frame(X)))
+
+    def predict_one(self, row):
+        """Label for one reading given as a tuple of floats in ``features`` order."""
+        if self.ensemble is not None:
+            return self.ensemble.predict_one(row)
+        return self.predict(np.asarray([row], dtype=np.float32))[0].item()
+
+    def predict_proba_one(self, row):
+        """Class probabilities for one reading given in ``features`` order."""
+        if self.ensemble is not None:
+            return self.ensemble.predict_proba_one(row)
+        return self.predict_proba(np.asarray([row], dtype=np.float32))[0]
+
+    def _frame(self, X):
+        import pandas as pd
+
+        X = np.asarray(X, dtype=np.float32)
+        return pd.DataFrame(X.reshape(-1, X.shape[-1]), columns=self.features or None)
+
+    def __repr__(self):
+        return f"LoadedModel({self.name!r}, v{self.version})"
+
+
+# ---------------- on-disk layout ----------------
+def _version_dir(name, version, models_dir=MODELS_DIR):
+    return Path(models_dir) / name / f"v{version:04d}"
+
+
+def list_versions(name, models_dir=MODELS_DIR):
+    root = Path(models_dir) / name
+    if not root.is_dir():
+        return []
+    return sorted(int(p.name[1:]) for p in root.glob("v[0-9]*") if p.is_dir() and p.name[1:].isdigit())
+
+
+def current_version(name, models_dir=MODELS_DIR):
+    """Version named by CURRENT, or 0 when the model has never been published."""
+    try:
+        return int((Path(models_dir) / name / "CURRENT").read_text().strip())
+    except (OSError, ValueError):
+        return 0
+
+
+def _write_tree(vdir, arrays, tree_meta):
+    """Node arrays as .npy in the dtypes TreeEnsemble uses, so mmap needs no conversion."""
+    arrays = dict(arrays)
+    arrays["children"] = np.stack([arrays["left"], arrays["right"]], axis=1).ravel()
+    for key in ("children", "roots", "feature"):
+        arrays[key] = arrays[key].astype(np.intp)
+    for key in TREE_ARRAYS:
+        np.save(vdir / f"{key}.npy", np.ascontiguousarray(arrays[key]))
+    (vdir / "tree.json").write_text(json.dumps(tree_meta))
+
+
+def publish(name, model, features, training_rows=None, metrics=None, extra=None,
+            models_dir=MODELS_DIR, keep=KEEP_VERSIONS, flat_copy=True):
+    """
+    Store ``model`` as the next version of ``name`` and make it current.
+
+    Tree models are exported for the array evaluator as well. With ``flat_copy``
+    the legacy ``<name>.pkl`` (and ``<name>.npz``) files are refreshed too, for
+    scripts that still load them directly. Returns the new version number.
+    """
+    import joblib
+
+    models_dir = Path(models_dir)
+    root = models_dir / name
+    root.mkdir(parents=True, exist_ok=True)
+    version = max(list_versions(name, models_dir) + [current_version(name, models_dir)]) + 1
+
+    try:
+        from export_trees import check_export, export_model
+        arrays, tree_meta = export_model(model)
+    except (ImportError, TypeError, ValueError):
+        arrays, tree_meta = None, None
+    if arrays is not None and not all(check_export(model, arrays, tree_meta)):
+        print(f"{name}: exported trees do not reproduce the model's predictions; storing the pickle only")
+        arrays, tree_meta = None, None
+
+    meta = {
+        "name": name,
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model_class": type(model).__name__,
+        "features": list(features) or (tree_meta or {}).get("feature_names", []),
+        "training_rows": training_rows,
+        "metrics": metrics or {},
+        "format": "tree" if arrays is not None else "pickle",
+    }
+    meta.update(extra or {})
+
+    tmp = root / f".tmp-v{version:04d}-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    joblib.dump(model, tmp / "model.pkl")
+    if arrays is not None:
+        if features:
+            tree_meta["feature_names"] = list(features)
+        _write_tree(tmp, arrays, tree_meta)
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+    os.rename(tmp, _version_dir(name, version, models_dir))
+
+    pointer = root / "CURRENT.tmp"
+    pointer.write_text(f"{version}\n")
+    os.replace(pointer, root / "CURRENT")
+
+    if flat_copy:
+        shutil.copyfile(root / f"v{version:04d}" / "model.pkl", models_dir / f".{name}.pkl.tmp")
+        os.replace(models_dir / f".{name}.pkl.tmp", models_dir / f"{name}.pkl")
+        if arrays is not None:
+            save_compiled(models_dir / f"{name}.npz", arrays, tree_meta)
+        else:
+            (models_dir / f"{name}.npz").unlink(missing_ok=True)  # would shadow the new .pkl
+
+    for old in list_versions(name, models_dir)[:-keep] if keep else []:
+        if old != version:
+            shutil.rmtree(_version_dir(name, old, models_dir), ignore_errors=True)
+    return version
+
+
+def load_version(name, version, models_dir=MODELS_DIR, mmap=True):
+    """Load one version; version 0 means the legacy flat files."""
+    models_dir = Path(models_dir)
+    if version == 0:
+        npz = models_dir / f"{name}.npz"
+        if npz.exists():
+            ensemble = load_compiled(npz)
+            return LoadedModel(name, 0, {"features": ensemble.feature_names}, ensemble=ensemble)
+        import joblib
+        estimator = joblib.load(models_dir / f"{name}.pkl")
+        features = [str(f) for f in getattr(estimator, "feature_names_in_", [])]
+        return LoadedModel(name, 0, {"features": features}, estimator=estimator)
+
+    vdir = _version_dir(name, version, models_dir)
+    meta = json.loads((vdir / "meta.json").read_text())
+    if (vdir / "tree.json").exists():
+        tree_meta = json.loads((vdir / "tree.json").read_text())
+        arrays = {k: np.load(vdir / f"{k}.npy", mmap_mode="r" if mmap else None) for k in TREE_ARRAYS}
+        return LoadedModel(name, version, meta, ensemble=TreeEnsemble(arrays, tree_meta))
+    import joblib
+    return LoadedModel(name, version, meta, estimator=joblib.load(vdir / "model.pkl"))
+
+
+# ---------------- in-process cache ----------------
+class ModelRegistry:
+    def __init__(self, models_dir=MODELS_DIR, check_interval=CHECK_INTERVAL, mmap=True):
+        self.models_dir = Path(models_dir)
+        self.check_interval = check_interval
+        self.mmap = mmap
+        self._models = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Current ``LoadedModel`` for ``name``; loads lazily and picks up new versions."""
+        model = self._models.get(name)
+        if model is not None and not self._due(name):
+            return model
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None and not self._due(name):
+                return model
+            self._checked[name] = time.monotonic()
+            version = current_version(name, self.models_dir)
+            if model is None or model.version != version:
+                try:
+                    loaded = load_version(name, version, self.models_dir, self.mmap)
+                except Exception as e:
+                    if model is None:
+                        raise
+                    print(f"Keeping {model}: could not load {name} v{version}: {e}")
+                else:
+                    if model is not None:
+                        print(f"Model {name}: v{model.version} -> v{loaded.version}")
+                    model = self._models[name] = loaded
+            return model
+
+    def _due(self, name):
+        if self.check_interval is None:
+            return False
+        return time.monotonic() - self._checked.get(name, 0.0) >= self.check_interval
+
+    def meta(self, name):
+        return self.get(name).meta
+
+    def loaded(self):
+        return {name: m.version for name, m in self._models.items()}
+
+
+_default = None
+
+
+def get_registry():
+    global _default
+    if _default is None:
+        _default = ModelRegistry()
+    return _default
+
+
+def get_model(name):
+    """Shortcut for ``get_registry().get(name)``."""
+    return get_registry().get(name)
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if cmd == "import":
+        import joblib
+        for arg in sys.argv[2:]:
+            path = Path(arg) if Path(arg).exists() else MODELS_DIR / arg
+            model = joblib.load(path)
+            features = [str(f) for f in getattr(model, "feature_names_in_", [])]
+            if not features and hasattr(model, "get_booster"):
+                features = model.get_booster().feature_names or []
+            version = publish(path.stem, model, features, extra={"imported_from": path.name}, flat_copy=False)
+            print(f"{path.name} -> {path.stem} v{version}")
+    elif cmd == "list":
+        names = sys.argv[2:] or sorted(p.name for p in MODELS_DIR.iterdir() if (p / "CURRENT").exists())
+        for name in names:
+            current = current_version(name)
+            for v in list_versions(name):
+                meta = json.loads((_version_dir(name, v) / "meta.json").read_text())
+                print(f"{name:<22} v{v:<4} {'*' if v == current else ' '} {meta['created']}  "
+                      f"{meta['format']:<7} rows={meta.get('training_rows')} metrics={meta.get('metrics')}")
+    else:
+        raise SystemExit(f"usage: {Path(__file__).name} [list [name...] | import <model.pkl>...]")
@@ -0,0 +1,247 @@
+# smart_agriculture_project/scripts/online_update.py
+"""
+Incremental updates of the XGBoost water model from rows added since the last checkpoint.
+
+One update:
+
+    1. read only the processed rows newer than the checkpoint (day partitions
+       after it, see processed_store), sorted by time
+    2. drift check of those rows against the reference statistics
+       (mean shift in reference standard deviations, share of values outside
+       the reference min/max). Drift schedules a full retrain instead of an update
+    3. the newest HOLDOUT_SHARE of the rows is the rolling holdout; the rest
+       continues boosting the current booster for ROUNDS_PER_UPDATE rounds
+    4. the candidate is published only if its holdout log loss / accuracy are
+       no worse than the current model's (within the tolerances); the
+       checkpoint then moves to the newest row it trained on, so the holdout
+       rows are trained on by the next update
+
+Cost is proportional to the new rows (plus one prediction pass of the
+existing trees over them), not to the history. A full retrain is scheduled
+when the data drifts, when the model has grown to MAX_TREES trees, or after
+MAX_REJECTS rejected candidates in a row. The request is written to
+``data/models/retrain_requested.json``. train_all.py clears it, and
+``--retrain`` runs it right away.
+
+The checkpoint (``data/models/online_checkpoint.json``) holds the model
+version it belongs to, the newest trained row and the reference statistics:
+the statistics of the rows the model was fully trained on, which train_all.py
+stores in the version's metadata (``reference_stats``). Not the live
+``scaler_stats.json``, which keeps taking in new rows and would hide the drift.
+When another tool publishes a new version, the checkpoint re-anchors on that
+version's ``data_until`` and ``reference_stats``.
+
+    python online_update.py                  # one update
+    python online_update.py --interval 3600  # every hour
+    python online_update.py --interval 3600 --retrain
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from feature_cache import FEATURES, TARGET
+from model_registry import MODELS_DIR, _version_dir, current_version, publish
+from processed_store import load_processed
+from running_stats import ColumnStats
+from train_all import RETRAIN_REQUEST_FILE, evaluate
+
+# --- Config ---
+BASE_DIR = Path(__file__).resolve().parent.parent
+SCALER_FILE = BASE_DIR / "data" / "processed" / "scaler_stats.json"
+CHECKPOINT_FILE = MODELS_DIR / "online_checkpoint.json"
+
+MODEL_NAME = "xgb_water"
+ROUNDS_PER_UPDATE = 10     # boosting rounds added per accepted update
+MIN_NEW_ROWS = 200         # wait for at least this many new rows
+HOLDOUT_SHARE = 0.2        # newest share of the new rows used as the rolling holdout
+LOSS_TOLERANCE = 0.02      # candidate log loss may be at most 2% above the current model's
+ACCURACY_TOLERANCE = 0.005
+MAX_TREES = 500            # schedule a full retrain once the booster has grown this far
+MAX_REJECTS = 3            # ... or after this many rejected candidates in a row
+DRIFT_Z = 1.0              # mean shift, in reference standard deviations
+DRIFT_OUT_OF_RANGE = 0.05  # share of values outside the reference min/max
+
+
+def _read_json(path, default):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def _current_meta(name, version, models_dir=MODELS_DIR):
+    if version == 0:
+        return {}
+    return _read_json(_version_dir(name, version, models_dir) / "meta.json", {})
+
+
+def _load_estimator(name, version, models_dir=MODELS_DIR):
+    import joblib
+
+    if version == 0:
+        return joblib.load(Path(models_dir) / f"{name}.pkl")
+    return joblib.load(_version_dir(name, version, models_dir) / "model.pkl")
+
+
+def anchor(name, version, scaler_file=SCALER_FILE, models_dir=MODELS_DIR):
+    """Fresh checkpoint for a version trained elsewhere (full retrain, manual publish)."""
+    meta = _current_meta(name, version, models_dir)
+    # data_until / reference_stats are recorded by train_all.py; older versions only know when they
+    # were built, and fall back to the current scaler statistics
+    since = meta.get("data_until") or meta.get("created") or datetime.now().isoformat(timespec="seconds")
+    reference = meta.get("reference_stats") or _read_json(scaler_file, {})
+    return {"version": version, "data_until": since, "reference": reference,
+            "updates": 0, "rejects": 0, "anchored": datetime.now().isoformat(timespec="seconds")}
+
+
+def new_rows(since, features=FEATURES, target=TARGET):
+    """Rows with ``system_timestamp`` strictly after ``since``, oldest first."""
+    since = pd.Timestamp(since)
+    data = load_processed(columns=list(features) + [target, "system_timestamp"], start=since)
+    data = data.dropna(subset=list(features) + [target])
+    ts = pd.to_datetime(data["system_timestamp"], errors="coerce", format="ISO8601")
+    data = data.assign(system_timestamp=ts)[ts > since]
+    return data.sort_values("system_timestamp", kind="stable").reset_index(drop=True)
+
+
+def drift(data, reference, features=FEATURES):
+    """{feature: reason} for the features whose new values moved away from the reference stats."""
+    drifted = {}
+    for col in features:
+        if col not in reference or not len(data):
+            continue
+        ref = ColumnStats.from_dict(reference[col])
+        values = data[col].to_numpy(dtype=float)
+        reasons = []
+        if ref.count > 1 and ref.std > 0:
+            z = abs(values.mean() - ref.mean) / ref.std
+            if z > DRIFT_Z:
+                reasons.append(f"mean shifted {z:.2f} std")
+        if ref.min is not None and ref.max is not None:
+            outside = float(((values < ref.min) | (values > ref.max)).mean())
+            if outside > DRIFT_OUT_OF_RANGE:
+                reasons.append(f"{outside:.0%} outside [{ref.min:g}, {ref.max:g}]")
+        if reasons:
+            drifted[col] = "; ".join(reasons)
+    return drifted
+
+
+def request_retrain(name, reason, path=RETRAIN_REQUEST_FILE):
+    requests = _read_json(path, {})
+    requests[name] = {"reason": reason, "requested": datetime.now().isoformat(timespec="seconds")}
+    _write_json(path, requests)
+    print(f"[{name}] full retrain scheduled: {reason}")
+
+
+def holds_up(candidate, current):
+    """Promotion gate: the candidate's holdout metrics are not worse than the current model's."""
+    if "log_loss" in candidate and "log_loss" in current:
+        if candidate["log_loss"] > current["log_loss"] * (1 + LOSS_TOLERANCE):
+            return False
+    return candidate["accuracy"] >= current["accuracy"] - ACCURACY_TOLERANCE
+
+
+def update(name=MODEL_NAME, checkpoint_file=CHECKPOINT_FILE, scaler_file=SCALER_FILE, models_dir=MODELS_DIR):
+    """Run one incremental update; returns a status string (promoted, rejected, waiting, ...)."""
+    import xgboost as xgb
+
+    checkpoints = _read_json(checkpoint_file, {})
+    version = current_version(name, models_dir)
+    state = checkpoints.get(name)
+    if state is None or state["version"] != version:
+        state = anchor(name, version, scaler_file, models_dir)
+        print(f"[{name}] checkpoint anchored on v{version}, rows after {state['data_until']}")
+
+    def save(status):
+        state["last_status"] = status
+        state["last_run"] = datetime.now().isoformat(timespec="seconds")
+        checkpoints[name] = state
+        _write_json(checkpoint_file, checkpoints)
+        return status
+
+    data = new_rows(state["data_until"])
+    if len(data) < MIN_NEW_ROWS:
+        print(f"[{name}] {len(data)} new rows, waiting for {MIN_NEW_ROWS}")
+        return save("waiting")
+
+    drifted = drift(data, state["reference"])
+    if drifted:
+        request_retrain(name, "drift: " + ", ".join(f"{c} {r}" for c, r in drifted.items()))
+        return save("drift")
+
+    split = len(data) - max(1, int(len(data) * HOLDOUT_SHARE))
+    train, holdout = data.iloc[:split], data.iloc[split:]
+    X_train, y_train = train[FEATURES], train[TARGET].astype(int)
+    X_hold, y_hold = holdout[FEATURES], holdout[TARGET].astype(int)
+    if y_train.nunique() < 2:
+        print(f"[{name}] {len(data)} new rows hold only one class, waiting for more")
+        return save("waiting")
+
+    current = _load_estimator(name, version, models_dir)
+    booster = current.get_booster()
+    params = current.get_params()
+    params.pop("use_label_encoder", None)
+    params["n_estimators"] = ROUNDS_PER_UPDATE
+    t0 = time.perf_counter()
+    candidate = xgb.XGBClassifier(**params)
+    candidate.fit(X_train, y_train, xgb_model=booster)  # continues boosting: only new rounds are fitted
+    fit_seconds = time.perf_counter() - t0
+
+    before, after = evaluate(current, X_hold, y_hold), evaluate(candidate, X_hold, y_hold)
+    print(f"[{name}] {len(train)} new rows (+{len(holdout)} holdout) in {fit_seconds:.2f} s; "
+          f"holdout accuracy {before['accuracy']:.4f} -> {after['accuracy']:.4f}, "
+          f"log loss {before.get('log_loss', float('nan')):.4f} -> {after.get('log_loss', float('nan')):.4f}")
+
+    if not holds_up(after, before):
+        state["rejects"] += 1
+        if state["rejects"] >= MAX_REJECTS:
+            request_retrain(name, f"{state['rejects']} incremental updates rejected in a row")
+        return save("rejected")
+
+    trees = candidate.get_booster().num_boosted_rounds()
+    new_until = train["system_timestamp"].max().isoformat()
+    meta = _current_meta(name, version, models_dir)
+    new_version = publish(name, candidate, FEATURES,
+                          training_rows=(meta.get("training_rows") or 0) + len(train), metrics=after,
+                          extra={"online": True, "base_version": version, "data_until": new_until,
+                                 "update_rows": len(train), "holdout_rows": len(holdout),
+                                 "holdout_before": before, "trees": trees,
+                                 "params": meta.get("params"), "feature_key": meta.get("feature_key"),
+                                 "reference_stats": state["reference"]},
+                          models_dir=models_dir)
+    print(f"[{name}] promoted v{new_version} ({trees} trees)")
+    state.update(version=new_version, data_until=new_until, updates=state["updates"] + 1, rejects=0)
+    if trees >= MAX_TREES:
+        request_retrain(name, f"booster has {trees} trees")
+    return save("promoted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--interval", type=float, default=None, help="keep running, one update every N seconds")
+    parser.add_argument("--retrain", action="store_true", help="run a scheduled full retrain right away")
+    args = parser.parse_args()
+
+    while True:
+        status = update(args.model)
+        if args.retrain and args.model in _read_json(RETRAIN_REQUEST_FILE, {}):
+            from train_all import format_report, train_all, write_report
+            report = train_all([args.model])  # clears the request and re-anchors the checkpoint
+            write_report(report)
+            print(format_report(report))
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
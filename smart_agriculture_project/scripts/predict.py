@@ -1,11 +1,12 @@
 # predict.py placeholder
 import json
 from datetime import datetime
-import joblib
+
+from model_registry import get_model
 
 # Load models
-model_water = joblib.load("data/models/xgb_water.pkl")
-model_fert = joblib.load("data/models/xgb_fertilizer.pkl")
+model_water = get_model("xgb_water")
+model_fert = get_model("xgb_fertilizer")
 
 # Simulated sensor reading (replace with real sensor input)
 sensor_data = {
@@ -1,187 +1,342 @@
 import pandas as pd
 import json
+import os
 from pathlib import Path
 import time
 import numpy as np
 
+from dedup_index import DEFAULT_DEVICE, DedupIndex
+from metrics import counter, gauge, histogram, publish, timer
+from processed_store import STORE_DIR, batch_id, compact_partition, import_csv, write_batch
+from rollups import ROLLUP_DIR, rebuild as rebuild_rollups, update_rollups
+from running_stats import RunningStats
+from sensor_log import START, LogPosition, SegmentLogReader, migrate_legacy_json
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 raw_json_file = BASE_DIR / "data" / "raw" / "data.json"
+raw_log_dir = BASE_DIR / "data" / "raw" / "segments"
 processed_folder = BASE_DIR / "data" / "processed"
 processed_folder.mkdir(exist_ok=True, parents=True)
-processed_file = processed_folder / "processed_data.csv"
+processed_file = processed_folder / "processed_data.csv"   # CSV export, kept for compatibility
+store_dir = STORE_DIR                                       # day-partitioned Parquet store
 scaler_file = processed_folder / "scaler_stats.json"
+checkpoint_file = processed_folder / "preprocess_checkpoint.json"
+
+POLL_INTERVAL = 2        # seconds to wait when the log has nothing new
+MAX_BATCH = 50_000       # cap rows parsed per cycle so catch-up stays bounded
+DEDUP_WINDOW = 3600      # seconds; late arrivals older than newest - window are dropped
+KEEP_CSV_EXPORT = True   # also append rows to processed_data.csv for older tools
+STATS_HALFLIFE = 30 * 24 * 3600  # seconds; half-life of the decayed running stats
+DECAYED_NORMALIZATION = False    # scale *_norm by decayed mean +- 3 std instead of all-time min/max
+
+# decayed stats are a Python loop per row, so they are only kept when they are used
+stats_halflife = STATS_HALFLIFE if DECAYED_NORMALIZATION else None
+
+# per-stage timings, published to data/metrics/preprocess.json for the backend's /metrics
+READ = histogram("preprocess_read_seconds", "segment log read of one batch")
+TRANSFORM = histogram("preprocess_transform_seconds", "parse, fill, encode and derive one batch")
+DEDUP = histogram("preprocess_dedup_seconds", "dedup of one batch")
+NORMALIZE = histogram("preprocess_normalize_seconds", "running stats update and normalisation")
+STORE = histogram("preprocess_store_seconds", "Parquet store write of one batch")
+ROLLUP = histogram("preprocess_rollup_seconds", "rollup update of one batch")
+CSV = histogram("preprocess_csv_seconds", "CSV export append of one batch")
+CHECKPOINT = histogram("preprocess_checkpoint_seconds", "checkpoint + scaler stats save")
+COMPACT = histogram("preprocess_compact_seconds", "partition compaction after one batch")
+BATCH = histogram("preprocess_batch_seconds", "one batch, read to compaction")
+ROWS_READ = counter("preprocess_rows_read_total", "raw readings read from the log")
+ROWS_STORED = counter("preprocess_rows_stored_total", "processed rows stored")
 
-# expected columns / header (keeps raw values)
+numeric_cols = ['TEMP_C', 'HUMIDITY', 'SOIL_PCT', 'LDR']
+to_scale = numeric_cols + ['heat_index']
+
+# column layout of processed_data.csv (raw values, derived features, *_norm)
 cols = [
-    "time", "TEMP_C", "HUMIDITY", "SOIL_PCT", "SOIL_STATUS", "LDR",
+    "ts", "TEMP_C", "HUMIDITY", "SOIL_PCT", "SOIL_STATUS", "LDR",
     "LIGHT_LEVEL", "system_timestamp", "soil_status", "light_level",
-    "heat_index", "irrigation_needed", "fertilizer_needed"
+    "heat_index", "irrigation_needed", "fertilizer_needed", "SOIL_PCT_raw",
+    "HUMIDITY_norm", "LDR_norm", "SOIL_PCT_norm", "TEMP_C_norm", "heat_index_norm",
 ]
 
-if not processed_file.exists():
-    pd.DataFrame(columns=cols).to_csv(processed_file, index=False)
 
-# load persistent scaler stats if present
-if scaler_file.exists():
+# ---------------- checkpoint ----------------
+def load_checkpoint():
+    """Last committed log position, CSV size, dedup index and stats, or None on first run."""
+    if not checkpoint_file.exists():
+        return None
     try:
-        scaler_stats = json.loads(scaler_file.read_text())
-    except Exception:
-        scaler_stats = {}
-else:
-    scaler_stats = {}
+        cp = json.loads(checkpoint_file.read_text())
+        dedup = DedupIndex.from_dict(cp["dedup"], window_seconds=DEDUP_WINDOW) if "dedup" in cp else None
+        stats = RunningStats.from_dict(cp["stats"], to_scale, stats_halflife) if "stats" in cp else None
+        return {"position": LogPosition(cp["segment"], cp["offset"]),
+                "csv_bytes": int(cp["csv_bytes"]),
+                "dedup": dedup,
+                "stats": stats}
+    except Exception as e:
+        print("Warning: ignoring unreadable checkpoint:", e)
+        return None
 
-print("Starting continuous preprocessing... Press Ctrl+C to stop.")
 
-try:
-    while True:
-        # Load JSON data
-        try:
-            with open(raw_json_file, 'r') as f:
-                json_data = json.load(f)
-        except Exception as e:
-            print("Error reading JSON:", e)
-            time.sleep(2)
-            continue
+def save_checkpoint(position, csv_bytes, dedup, stats):
+    """
+    Write the checkpoint atomically (temp file + rename). The dedup index and
+    running stats are stored in the same file so they always match the committed rows.
+    """
+    tmp = checkpoint_file.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"segment": position.segment, "offset": position.offset,
+                               "csv_bytes": csv_bytes, "dedup": dedup.to_dict(),
+                               "stats": stats.to_dict()},
+                              separators=(",", ":")))
+    os.replace(tmp, checkpoint_file)
 
-        if not json_data:
-            time.sleep(2)
-            continue
 
-        new_data = pd.DataFrame(json_data)
+def recover_csv(checkpoint):
+    """Drop rows appended after the last checkpoint (a crash between append and commit)."""
+    if checkpoint is None or not processed_file.exists():
+        return
+    size = processed_file.stat().st_size
+    if size > checkpoint["csv_bytes"]:
+        with open(processed_file, "r+b") as f:
+            f.truncate(checkpoint["csv_bytes"])
+        print(f"Recovered: truncated {size - checkpoint['csv_bytes']} uncommitted bytes from CSV")
 
-        # quick debug of raw input (very helpful)
-        numeric_cols = ['TEMP_C', 'HUMIDITY', 'SOIL_PCT', 'LDR']
-        print("--- New raw batch sample ---")
-        print(new_data[numeric_cols].head().to_string())
-
-        # parse timestamp if present
-        if 'system_timestamp' in new_data.columns:
-            new_data['system_timestamp'] = pd.to_datetime(new_data['system_timestamp'], errors='coerce')
-
-        # ensure numeric (but don't overwrite raw permanently)
-        for col in numeric_cols:
-            if col in new_data.columns:
-                new_data[col] = pd.to_numeric(new_data[col], errors='coerce')
-
-        # read existing data once
-        existing_cols = pd.read_csv(processed_file, nrows=0).columns.tolist()
-        existing_data = pd.read_csv(processed_file, parse_dates=['system_timestamp'] if 'system_timestamp' in existing_cols else None)
-
-        # fill missing using historic mean when available, else batch mean, else 0
-        for col in numeric_cols:
-            if col in new_data.columns:
-                historic_mean = None
-                if col in existing_data.columns and not existing_data[col].dropna().empty:
-                    historic_mean = existing_data[col].dropna().mean()
-                batch_mean = new_data[col].mean()
-                fill_val = historic_mean if historic_mean is not None else (batch_mean if not np.isnan(batch_mean) else 0.0)
-                new_data[col] = new_data[col].fillna(fill_val)
-
-        # encode categorical columns
-        if 'SOIL_STATUS' in new_data.columns:
-            new_data['soil_status'] = new_data['SOIL_STATUS'].map({'Wet': 0, 'Dry': 1}).fillna(0).astype(int)
-        else:
-            new_data['soil_status'] = 0
 
-        if 'LIGHT_LEVEL' in new_data.columns:
-            new_data['light_level'] = new_data['LIGHT_LEVEL'].map({'Dark': 0, 'Dim': 1, 'Bright': 2}).fillna(1).astype(int)
-        else:
-            new_data['light_level'] = 1
+# ---------------- per-batch processing ----------------
+def process_batch(new_data, stats):
+    """Turn raw readings into processed rows. Only touches the rows in this batch."""
+    # parse timestamp if present
+    if 'system_timestamp' in new_data.columns:
+        new_data['system_timestamp'] = pd.to_datetime(new_data['system_timestamp'], errors='coerce', format='ISO8601')
 
-        # compute targets on RAW values - keep them raw
-        if 'SOIL_PCT' in new_data.columns:
-            # convert percent->fraction only if values >1
-            if new_data['SOIL_PCT'].max() > 1.0:
-                new_data['SOIL_PCT_raw'] = new_data['SOIL_PCT'] / 100.0
-            else:
-                new_data['SOIL_PCT_raw'] = new_data['SOIL_PCT']
-            new_data['irrigation_needed'] = (new_data['SOIL_PCT_raw'] < 0.4).astype(int)
-        else:
-            new_data['irrigation_needed'] = 0
+    # ensure numeric (but don't overwrite raw permanently)
+    for col in numeric_cols:
+        if col in new_data.columns:
+            new_data[col] = pd.to_numeric(new_data[col], errors='coerce')
+
+    # fill missing using historic mean when available, else batch mean, else 0
+    for col in numeric_cols:
+        if col in new_data.columns:
+            historic_mean = stats.mean(col)
+            batch_mean = new_data[col].mean()
+            fill_val = historic_mean if historic_mean is not None else (batch_mean if not np.isnan(batch_mean) else 0.0)
+            new_data[col] = new_data[col].fillna(fill_val)
+
+    # encode categorical columns
+    if 'SOIL_STATUS' in new_data.columns:
+        new_data['soil_status'] = new_data['SOIL_STATUS'].map({'Wet': 0, 'Dry': 1}).fillna(0).astype(int)
+    else:
+        new_data['soil_status'] = 0
 
-        if 'TEMP_C' in new_data.columns:
-            new_data['fertilizer_needed'] = (new_data['TEMP_C'] < 15.0).astype(int)
+    if 'LIGHT_LEVEL' in new_data.columns:
+        new_data['light_level'] = new_data['LIGHT_LEVEL'].map({'Dark': 0, 'Dim': 1, 'Bright': 2}).fillna(1).astype(int)
+    else:
+        new_data['light_level'] = 1
+
+    # compute targets on RAW values - keep them raw
+    if 'SOIL_PCT' in new_data.columns:
+        # convert percent->fraction only if values >1
+        if new_data['SOIL_PCT'].max() > 1.0:
+            new_data['SOIL_PCT_raw'] = new_data['SOIL_PCT'] / 100.0
         else:
-            new_data['fertilizer_needed'] = 0
-
-        # heat index (convert C->F -> formula -> back to C). Keep raw heat_index column
-        if 'TEMP_C' in new_data.columns and 'HUMIDITY' in new_data.columns:
-            T_f = new_data['TEMP_C'] * 9.0/5.0 + 32.0
-            RH = new_data['HUMIDITY']
-            HI_f = 0.5 * (T_f + 61.0 + ((T_f - 68.0)*1.2) + (RH * 0.094))
-            new_data['heat_index'] = (HI_f - 32.0) * 5.0/9.0
+            new_data['SOIL_PCT_raw'] = new_data['SOIL_PCT']
+        new_data['irrigation_needed'] = (new_data['SOIL_PCT_raw'] < 0.4).astype(int)
+    else:
+        new_data['irrigation_needed'] = 0
+
+    if 'TEMP_C' in new_data.columns:
+        new_data['fertilizer_needed'] = (new_data['TEMP_C'] < 15.0).astype(int)
+    else:
+        new_data['fertilizer_needed'] = 0
+
+    # heat index (convert C->F -> formula -> back to C). Keep raw heat_index column
+    if 'TEMP_C' in new_data.columns and 'HUMIDITY' in new_data.columns:
+        T_f = new_data['TEMP_C'] * 9.0/5.0 + 32.0
+        RH = new_data['HUMIDITY']
+        HI_f = 0.5 * (T_f + 61.0 + ((T_f - 68.0)*1.2) + (RH * 0.094))
+        new_data['heat_index'] = (HI_f - 32.0) * 5.0/9.0
+    else:
+        new_data['heat_index'] = np.nan
+
+    return new_data
+
+
+def normalize(new_data, stats):
+    """Add *_norm columns scaled by the running stats (raw columns are kept)."""
+    for col in to_scale:
+        if col not in new_data.columns:
+            continue
+        low, high = stats.range(col, decayed=DECAYED_NORMALIZATION)
+
+        # when range is too small, skip normalization and set norm to 0.0
+        eps = 1e-6
+        if low is not None and high is not None and high - low > eps:
+            norm = (new_data[col] - low) / (high - low)
+            new_data[f"{col}_norm"] = norm.clip(0.0, 1.0) if DECAYED_NORMALIZATION else norm
         else:
-            new_data['heat_index'] = np.nan
+            new_data[f"{col}_norm"] = 0.0
+    return new_data
 
-        # --- Normalization step but produce *_norm columns instead of overwriting raw ---
-        to_scale = numeric_cols + ['heat_index']
-        for col in to_scale:
-            if col not in new_data.columns:
-                continue
 
-            # get persistent min/max if available
-            hist_min = scaler_stats.get(col, {}).get('min', None)
-            hist_max = scaler_stats.get(col, {}).get('max', None)
+def ts_seconds(df):
+    """system_timestamp as float epoch seconds (NaN where missing)."""
+    if 'system_timestamp' not in df.columns:
+        return None
+    ts = df['system_timestamp']
+    secs = ts.to_numpy().astype('datetime64[us]').astype('int64') / 1e6
+    return np.where(ts.isna().to_numpy(), np.nan, secs)
 
-            batch_min = float(new_data[col].min())
-            batch_max = float(new_data[col].max())
 
-            # combine
-            if hist_min is None or hist_max is None:
-                global_min = batch_min
-                global_max = batch_max
-            else:
-                global_min = min(hist_min, batch_min)
-                global_max = max(hist_max, batch_max)
+def append_rows(rows, header):
+    """Append processed rows to the CSV and return the committed file size."""
+    write_header = not processed_file.exists() or processed_file.stat().st_size == 0
+    with open(processed_file, "a", newline="") as f:
+        rows.reindex(columns=header).to_csv(f, header=write_header, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    return processed_file.stat().st_size
 
-            # when range is too small, skip normalization and set norm to 0.0 or batch-centered value
-            eps = 1e-6
-            if global_max - global_min > eps:
-                new_data[f"{col}_norm"] = (new_data[col] - global_min) / (global_max - global_min)
-            else:
-                # no meaningful range: put 0.0 or 0.5 as neutral value
-                new_data[f"{col}_norm"] = 0.0
 
-            # persist back the stats
-            scaler_stats[col] = {'min': global_min, 'max': global_max}
+def dedup_keys(df):
+    """(device ids, timestamp keys in microseconds) for each row."""
+    keys = df['system_timestamp'].to_numpy().astype('datetime64[us]').astype('int64').tolist()
+    if 'device_id' in df.columns:
+        devices = df['device_id'].fillna(DEFAULT_DEVICE).astype(str).tolist()
+    else:
+        devices = [DEFAULT_DEVICE] * len(df)
+    return devices, keys
+
+
+def main():
+    publish("preprocess")
+    # the tail reads byte offsets from the segment log, so make sure data.json is in it
+    imported = migrate_legacy_json(raw_json_file, raw_log_dir)
+    if imported:
+        print(f"Imported {imported} readings from {raw_json_file} into the segment log")
+
+    checkpoint = load_checkpoint()
+    recover_csv(checkpoint)
+
+    dedup = checkpoint["dedup"] if checkpoint and checkpoint["dedup"] else DedupIndex(DEDUP_WINDOW)
+    if checkpoint and checkpoint["stats"]:
+        stats = checkpoint["stats"]
+    else:
+        # older scaler_stats.json files only hold min/max; counts/means are seeded below
+        stats = RunningStats.load(scaler_file, to_scale, stats_halflife)
+
+    if processed_file.exists() and processed_file.stat().st_size > 0:
+        header = pd.read_csv(processed_file, nrows=0).columns.tolist()
+        if checkpoint is None:
+            # first run only: seed the store, the dedup index and the running stats
+            # from rows processed before checkpoints existed
+            if not store_dir.exists():
+                rows, _ = import_csv(processed_file, store_dir)
+                print(f"Imported {rows} existing rows from {processed_file} into {store_dir}")
+            if not ROLLUP_DIR.exists():
+                print(f"Built rollups from {rebuild_rollups()} stored rows")
+            existing_data = pd.read_csv(processed_file)
+            if 'system_timestamp' in existing_data.columns:
+                existing_data['system_timestamp'] = pd.to_datetime(existing_data['system_timestamp'], errors='coerce', format='ISO8601')
+            stats.update(existing_data, ts_seconds(existing_data))
+            if 'system_timestamp' in existing_data.columns:
+                existing_data = existing_data.dropna(subset=['system_timestamp']).sort_values('system_timestamp')
+                dedup.filter_new(*dedup_keys(existing_data))
+            del existing_data
+    else:
+        header = cols
+        pd.DataFrame(columns=header).to_csv(processed_file, index=False)
+
+    position = checkpoint["position"] if checkpoint else START
+    reader = SegmentLogReader(raw_log_dir)
 
-        # Save scaler_stats to disk
+    gauge("preprocess_dedup_duplicates", "duplicate readings dropped since start", fn=lambda: dedup.duplicates)
+    gauge("preprocess_dedup_too_late", "late readings dropped since start", fn=lambda: dedup.too_late)
+    print(f"Starting continuous preprocessing from {position}... Press Ctrl+C to stop.")
+
+    while True:
+        t_batch = time.perf_counter()
         try:
-            scaler_file.write_text(json.dumps(scaler_stats))
+            with timer(READ):
+                records, next_position = reader.read_from(position, max_records=MAX_BATCH)
         except Exception as e:
-            print("Warning: could not save scaler stats:", e)
+            print("Error reading sensor log:", e)
+            time.sleep(POLL_INTERVAL)
+            continue
 
-        # Deduplicate using iso timestamp string if available, else drop exact duplicates
-        if 'system_timestamp' in new_data.columns and 'system_timestamp' in existing_data.columns:
-            existing_ts = existing_data['system_timestamp'].astype(str).tolist()
-            new_data = new_data[~new_data['system_timestamp'].astype(str).isin(existing_ts)]
-        else:
-            new_data = new_data.drop_duplicates()
+        if not records:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        ROWS_READ.inc(len(records))
+        new_data = pd.DataFrame(records)
+
+        # quick debug of raw input (very helpful)
+        print("--- New raw batch sample ---")
+        print(new_data.reindex(columns=numeric_cols).head().to_string())
+
+        with timer(TRANSFORM):
+            new_data = process_batch(new_data, stats)
+
+        # Deduplicate on (device, timestamp) with the windowed index, else drop exact duplicates
+        with timer(DEDUP):
+            if 'system_timestamp' in new_data.columns:
+                has_ts = new_data['system_timestamp'].notna()
+                timed = new_data[has_ts]
+                keep = ~has_ts & ~new_data.duplicated()  # rows without a timestamp: exact duplicates
+                keep[has_ts] = pd.Series(dedup.filter_new(*dedup_keys(timed)), index=timed.index, dtype=bool)
+                new_data = new_data[keep]  # a mask, not a concat: rows stay in log order
+            else:
+                new_data = new_data.drop_duplicates()
+
+        # stats only see rows that are actually stored; then scale with the updated range
+        with timer(NORMALIZE):
+            stats.update(new_data, ts_seconds(new_data))
+            new_data = normalize(new_data, stats)
 
-        # If no rows left, continue
         if new_data.empty:
             print("No new rows after dedupe.")
-            time.sleep(2)
-            continue
+            csv_bytes = processed_file.stat().st_size
+        else:
+            # the Parquet file is named after the batch's start position, so a replay
+            # after a crash overwrites it instead of adding a second copy
+            with timer(STORE):
+                written = write_batch(new_data, batch_id(position), store_dir)
+            # 1 min / 1 h / 1 day aggregates; late rows patch their older buckets
+            with timer(ROLLUP):
+                update_rollups(new_data, batch_id(position))
+            if KEEP_CSV_EXPORT:
+                with timer(CSV):
+                    csv_bytes = append_rows(new_data, header)
+            else:
+                csv_bytes = processed_file.stat().st_size
+            ROWS_STORED.inc(len(new_data))
+            print(f"{len(new_data)} new rows appended.")
+            print("Sample stored (raw->norm):")
+            for col in numeric_cols:
+                if col in new_data.columns and f"{col}_norm" in new_data.columns:
+                    print(f" {col}: raw min={new_data[col].min():.3f}, max={new_data[col].max():.3f} -> norm min={new_data[f'{col}_norm'].min():.3f}, max={new_data[f'{col}_norm'].max():.3f}")
+
+        # commit: rows are on disk, now move the watermark past them
+        with timer(CHECKPOINT):
+            save_checkpoint(next_position, csv_bytes, dedup, stats)
+            position = next_position
 
-        # Keep only the columns expected in CSV (and add *_norm cols if present)
-        out_cols = cols[:]  # base
-        for c in list(new_data.columns):
-            if c.endswith("_norm") and c not in out_cols:
-                out_cols.append(c)
-            if c not in out_cols and c in cols:
-                out_cols.append(c)
-
-        # append
-        combined_data = pd.concat([existing_data, new_data.reindex(columns=existing_data.columns.union(new_data.columns))], ignore_index=True)
-        combined_data.to_csv(processed_file, index=False)
-        print(f"{len(new_data)} new rows appended. Total rows: {combined_data.shape[0]}")
-        print("Sample stored (raw->norm):")
-        for col in numeric_cols:
-            if col in new_data.columns and f"{col}_norm" in new_data.columns:
-                print(f" {col}: raw min={new_data[col].min():.3f}, max={new_data[col].max():.3f} -> norm min={new_data[f'{col}_norm'].min():.3f}, max={new_data[f'{col}_norm'].max():.3f}")
-
-        time.sleep(2)
-
-except KeyboardInterrupt:
-    print("\nStopped by user.")
+            # scaler_stats.json is the copy other tools read (atomic replace)
+            try:
+                stats.save(scaler_file)
+            except Exception as e:
+                print("Warning: could not save scaler stats:", e)
+        if not new_data.empty:
+            with timer(COMPACT):
+                for partition in {p.parent for p in written}:
+                    compact_partition(partition)
+        BATCH.observe(time.perf_counter() - t_batch)
+        if dedup.duplicates or dedup.too_late:
+            print(f"Dedup: {dedup.duplicates} duplicates, {dedup.too_late} too late so far")
+        if len(records) < MAX_BATCH:
+            time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
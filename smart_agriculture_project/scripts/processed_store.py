@@ -0,0 +1,312 @@
+# smart_agriculture_project/scripts/processed_store.py
+"""
+Day-partitioned Parquet store for processed sensor rows.
+
+Layout (one folder per day of ``system_timestamp``):
+
+    data/processed/dataset/
+        date=2025-11-15/
+            part-import.parquet                  rows migrated from processed_data.csv
+            part-00000001-000000000000.parquet   one file per preprocessing batch
+            compact-00000003-000000012345.parquet  merged batches up to that id
+        date=unknown/                            rows without a timestamp
+
+Every file has the explicit ``SCHEMA`` below, so readers never re-infer dtypes.
+``load_processed`` only opens the day folders that overlap the requested time
+range, only reads the requested columns, and pushes the exact time filter down
+to the Parquet row groups.
+
+Batch ids are the sensor-log position the batch started at, zero padded so they
+sort as strings. Re-writing a batch with the same id (after a crash) replaces
+the old file, so the store stays exactly-once together with the preprocess
+checkpoint. The CSV migration has its own id, ``IMPORT_ID``, which never equals
+a batch id and is ordered before all of them.
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_DIR = BASE_DIR / "data" / "processed" / "dataset"
+CSV_EXPORT_FILE = BASE_DIR / "data" / "processed" / "processed_data.csv"
+
+UNKNOWN_DATE = "unknown"
+IMPORT_ID = "import"  # file id of the processed_data.csv migration (import_csv)
+COMPACT_AFTER = 64  # merge a day's batch files once it has this many
+
+SCHEMA = pa.schema([
+    ("ts", pa.string()),
+    ("TEMP_C", pa.float64()),
+    ("HUMIDITY", pa.float64()),
+    ("SOIL_PCT", pa.float64()),
+    ("SOIL_STATUS", pa.string()),
+    ("LDR", pa.float64()),
+    ("LIGHT_LEVEL", pa.string()),
+    ("system_timestamp", pa.timestamp("us")),
+    ("soil_status", pa.int8()),
+    ("light_level", pa.int8()),
+    ("heat_index", pa.float64()),
+    ("irrigation_needed", pa.int8()),
+    ("fertilizer_needed", pa.int8()),
+    ("SOIL_PCT_raw", pa.float64()),
+    ("HUMIDITY_norm", pa.float64()),
+    ("LDR_norm", pa.float64()),
+    ("SOIL_PCT_norm", pa.float64()),
+    ("TEMP_C_norm", pa.float64()),
+    ("heat_index_norm", pa.float64()),
+    ("device_id", pa.string()),
+])
+COLUMNS = SCHEMA.names
+
+
+def batch_id(position):
+    """Sortable file id for a batch that starts at sensor-log ``position``."""
+    return f"{position[0]:08d}-{position[1]:012d}"
+
+
+def _file_id(path):
+    """Batch id of a ``part-<id>`` / ``compact-<id>`` file."""
+    return path.stem.split("-", 1)[1]
+
+
+def _order(bid):
+    """Sort key of a batch id: the CSV import comes before every batch."""
+    return "" if bid == IMPORT_ID else bid
+
+
+def _to_table(df):
+    """Cast a processed DataFrame to ``SCHEMA`` (missing columns become nulls)."""
+    df = df.reindex(columns=COLUMNS)
+    df["system_timestamp"] = pd.to_datetime(df["system_timestamp"], errors="coerce", format="ISO8601")
+    arrays = []
+    for field in SCHEMA:
+        col = df[field.name]
+        if pa.types.is_string(field.type):
+            col = col.astype(object).where(col.notna(), None)
+            col = col.map(lambda v: v if v is None else str(v))
+        # safe=False only truncates sub-microsecond timestamp precision
+        arrays.append(pa.array(col, type=field.type, from_pandas=True,
+                               safe=not pa.types.is_timestamp(field.type)))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def _atomic_write(table, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def write_batch(df, bid, store_dir=STORE_DIR):
+    """Write one batch of processed rows, split into its day partitions."""
+    store_dir = Path(store_dir)
+    if df.empty:
+        return []
+    table = _to_table(df)
+    days = pd.Series(table.column("system_timestamp").to_pandas()).dt.strftime("%Y-%m-%d").fillna(UNKNOWN_DATE)
+    written = []
+    for day in days.unique():
+        mask = pa.array((days == day).to_numpy())
+        path = store_dir / f"date={day}" / f"part-{bid}.parquet"
+        _atomic_write(table.filter(mask), path)
+        written.append(path)
+    return written
+
+
+# ---------------- partition bookkeeping ----------------
+def _partitions(store_dir):
+    if not store_dir.is_dir():
+        return []
+    return sorted(p for p in store_dir.iterdir() if p.is_dir() and p.name.startswith("date="))
+
+
+def _live_files(partition):
+    """Files that hold the partition's rows: newest compact file plus batches after it."""
+    parts, compacts = [], []
+    for p in partition.iterdir():
+        if p.suffix != ".parquet":
+            continue
+        if p.name.startswith("compact-"):
+            compacts.append(p)
+        elif p.name.startswith("part-"):
+            parts.append(p)
+    def key(p):
+        return _order(_file_id(p))
+
+    if not compacts:
+        return sorted(parts, key=key)
+    newest = max(compacts, key=key)
+    return [newest] + sorted((p for p in parts if key(p) > key(newest)), key=key)
+
+
+def _stale_files(partition):
+    live = set(_live_files(partition))
+    return [p for p in partition.iterdir() if p.suffix == ".parquet" and p not in live]
+
+
+def compact_partition(partition, min_files=COMPACT_AFTER):
+    """
+    Merge a day's batch files into one ``compact-<last id>.parquet``. The new file
+    is in place before the old ones are removed; until they are, readers already
+    skip them because their ids are covered by the compact file.
+    """
+    files = _live_files(partition)
+    if len(files) < min_files:
+        return False
+    last = _file_id(files[-1])
+    table = pa.concat_tables([pq.read_table(f, schema=SCHEMA) for f in files])
+    _atomic_write(table.sort_by("system_timestamp"), partition / f"compact-{last}.parquet")
+    for stale in _stale_files(partition):
+        stale.unlink(missing_ok=True)
+    return True
+
+
+def compact(store_dir=STORE_DIR, min_files=COMPACT_AFTER):
+    """Compact every partition with at least ``min_files`` live files."""
+    return sum(compact_partition(p, min_files) for p in _partitions(Path(store_dir)))
+
+
+# ---------------- reading ----------------
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def _files_for_range(store_dir, start, end):
+    first = start.strftime("%Y-%m-%d") if start else None
+    last = end.strftime("%Y-%m-%d") if end else None
+    files = []
+    for partition in _partitions(store_dir):
+        day = partition.name[len("date="):]
+        if day == UNKNOWN_DATE:
+            if start or end:
+                continue  # no timestamp -> can't be inside a time range
+        elif (first and day < first) or (last and day > last):
+            continue
+        files.extend(_live_files(partition))
+    return files
+
+
+def _time_filter(start, end):
+    """Row filter on system_timestamp, pushed down to Parquet statistics."""
+    ts = ds.field("system_timestamp")
+    flt = None
+    if start is not None:
+        flt = ts >= pa.scalar(start, type=pa.timestamp("us"))
+    if end is not None:
+        cond = ts < pa.scalar(end, type=pa.timestamp("us"))
+        flt = cond if flt is None else flt & cond
+    return flt
+
+
+def load_processed(columns=None, start=None, end=None, last_days=None,
+                   store_dir=STORE_DIR, csv_fallback=CSV_EXPORT_FILE):
+    """
+    Load processed rows as a typed DataFrame.
+
+    columns   -- list of columns to read (default: all)
+    start/end -- ``system_timestamp`` range, start inclusive / end exclusive
+    last_days -- shorthand for ``start = now - last_days``
+
+    Falls back to the CSV export when the store has not been created yet.
+    """
+    store_dir = Path(store_dir)
+    start, end = _as_datetime(start), _as_datetime(end)
+    if last_days is not None:
+        start = datetime.now() - timedelta(days=last_days)
+
+    if not _partitions(store_dir):
+        return _load_csv(csv_fallback, columns, start, end)
+
+    unknown = [c for c in (columns or []) if c not in COLUMNS]
+    if unknown:
+        raise KeyError(f"Columns not in processed store: {unknown}")
+
+    files = _files_for_range(store_dir, start, end)
+    if not files:
+        return _to_table(pd.DataFrame(columns=COLUMNS)).select(columns or COLUMNS).to_pandas()
+
+    dataset = ds.dataset([str(f) for f in files], schema=SCHEMA, format="parquet")
+    flt = _time_filter(start, end)
+    return dataset.to_table(columns=columns, filter=flt).to_pandas()
+
+
+def iter_batches(columns=None, start=None, end=None, batch_size=65_536, store_dir=STORE_DIR):
+    """Stream the store as DataFrames of at most ``batch_size`` rows (bounded memory)."""
+    store_dir = Path(store_dir)
+    start, end = _as_datetime(start), _as_datetime(end)
+    files = _files_for_range(store_dir, start, end)
+    if not files:
+        return
+    dataset = ds.dataset([str(f) for f in files], schema=SCHEMA, format="parquet")
+    flt = _time_filter(start, end)
+    for batch in dataset.to_batches(columns=columns, filter=flt, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def _load_csv(csv_file, columns, start, end):
+    if not Path(csv_file).exists():
+        raise FileNotFoundError(f"No processed store at {STORE_DIR} and no CSV at {csv_file}")
+    usecols = None
+    if columns is not None:
+        usecols = list(columns)
+        if (start or end) and "system_timestamp" not in usecols:
+            usecols.append("system_timestamp")
+    df = pd.read_csv(csv_file, usecols=usecols)
+    if start or end:
+        ts = pd.to_datetime(df["system_timestamp"], errors="coerce", format="ISO8601")
+        mask = ts.notna()
+        if start:
+            mask &= ts >= start
+        if end:
+            mask &= ts < end
+        df = df[mask]
+    return df[columns] if columns is not None else df
+
+
+# ---------------- CSV compatibility ----------------
+def export_csv(path=CSV_EXPORT_FILE, store_dir=STORE_DIR):
+    """Write the whole store to a CSV (for tools that still expect processed_data.csv)."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    header = True
+    with open(tmp, "w", newline="") as f:
+        for df in iter_batches(store_dir=store_dir):
+            df.to_csv(f, header=header, index=False)
+            header = False
+        if header:
+            pd.DataFrame(columns=COLUMNS).to_csv(f, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def import_csv(path=CSV_EXPORT_FILE, store_dir=STORE_DIR):
+    """One-off migration of an existing processed_data.csv into the store."""
+    df = pd.read_csv(path)
+    written = write_batch(df, IMPORT_ID, store_dir)
+    return len(df), written
+
+
+if __name__ == "__main__":
+    usage = "usage: python processed_store.py [import|export|compact]"
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "import":
+        rows, files = import_csv()
+        print(f"Imported {rows} rows from {CSV_EXPORT_FILE} into {len(files)} partition file(s)")
+    elif cmd == "export":
+        print("CSV export written to", export_csv())
+    elif cmd == "compact":
+        print(f"Compacted {compact(min_files=2)} partition(s)")
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,218 @@
+# smart_agriculture_project/scripts/rollups.py
+"""
+Fixed-interval aggregates (1 min / 1 h / 1 day) of the processed sensor rows.
+
+For every device, bucket and field the rollups keep count, sum, min and max.
+These merge exactly, so a new batch only has to be aggregated on its own and
+merged into the buckets it touches. Late rows simply patch their (older)
+bucket. Means are sum / count at read time.
+
+Layout (small Parquet files, one per partition):
+
+    data/processed/rollups/
+        1min/date=2025-11-15.parquet
+        1h/month=2025-11.parquet
+        1d/year=2025.parquet
+
+Each file records the id of the last preprocessing batch merged into it. When
+a batch is replayed after a crash, partitions that already contain it are
+skipped, so nothing is counted twice. ``preprocess_data.py`` calls
+``update_rollups`` for every batch it stores.
+
+    python rollups.py rebuild        # recompute everything from the processed store
+    python rollups.py show 1h 2025-11-14 2025-11-16
+"""
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dedup_index import DEFAULT_DEVICE
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ROLLUP_DIR = BASE_DIR / "data" / "processed" / "rollups"
+
+# name -> (bucket seconds, pandas floor frequency, partition key format)
+RESOLUTIONS = {
+    "1min": (60, "min", "date=%Y-%m-%d"),
+    "1h": (3600, "h", "month=%Y-%m"),
+    "1d": (86400, "D", "year=%Y"),
+}
+FIELDS = ["SOIL_PCT", "TEMP_C", "HUMIDITY", "LDR"]
+AGGREGATES = ("count", "sum", "min", "max")
+KEYS = ["device_id", "bucket"]
+VALUE_COLUMNS = [f"{agg}_{f}" for f in FIELDS for agg in AGGREGATES]
+LAST_BATCH_KEY = b"last_batch"
+
+SCHEMA = pa.schema(
+    [("device_id", pa.string()), ("bucket", pa.timestamp("us"))]
+    + [(c, pa.int64() if c.startswith("count_") else pa.float64()) for c in VALUE_COLUMNS]
+)
+
+
+def aggregate(df, resolution):
+    """Per (device, bucket) count/sum/min/max of ``FIELDS`` for raw rows in ``df``."""
+    freq = RESOLUTIONS[resolution][1]
+    ts = pd.to_datetime(df["system_timestamp"], errors="coerce", format="ISO8601")
+    ok = ts.notna().to_numpy()
+    if not ok.any():
+        return pd.DataFrame(columns=SCHEMA.names)
+    frame = pd.DataFrame({
+        "device_id": (df["device_id"].fillna(DEFAULT_DEVICE).astype(str)
+                      if "device_id" in df.columns else DEFAULT_DEVICE),
+        "bucket": ts.dt.floor(freq),
+    })
+    for f in FIELDS:
+        frame[f] = pd.to_numeric(df[f], errors="coerce") if f in df.columns else np.nan
+    grouped = frame[ok].groupby(KEYS, sort=True)[FIELDS].agg(list(AGGREGATES))
+    grouped.columns = [f"{agg}_{f}" for f, agg in grouped.columns]
+    return grouped.reset_index()[SCHEMA.names]
+
+
+def merge(a, b):
+    """Combine two aggregate frames bucket by bucket."""
+    if a is None or a.empty:
+        return b
+    both = pd.concat([a, b], ignore_index=True)
+    # counts and sums add up; min/max of an empty side are NaN, which min/max skip
+    how = {c: {"count": "sum"}.get(c.split("_", 1)[0], c.split("_", 1)[0]) for c in VALUE_COLUMNS}
+    return both.groupby(KEYS, sort=True).agg(how).reset_index()[SCHEMA.names]
+
+
+def _partition_path(resolution, bucket, rollup_dir=ROLLUP_DIR):
+    return Path(rollup_dir) / resolution / f"{bucket.strftime(RESOLUTIONS[resolution][2])}.parquet"
+
+
+def _read_partition(path):
+    """(aggregates DataFrame, last merged batch id) of one partition file."""
+    if not path.exists():
+        return None, ""
+    meta = pq.read_schema(path).metadata or {}
+    return pq.read_table(path, schema=SCHEMA).to_pandas(), meta.get(LAST_BATCH_KEY, b"").decode()
+
+
+def _write_partition(df, path, last_batch):
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    table = table.replace_schema_metadata({LAST_BATCH_KEY: last_batch.encode()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def update_rollups(df, batch, rollup_dir=ROLLUP_DIR):
+    """
+    Merge one batch of processed rows into every resolution. ``batch`` is the
+    batch id (sortable string); partitions that already include it are left
+    alone. Returns the number of partition files rewritten.
+    """
+    if df.empty:
+        return 0
+    written = 0
+    for resolution in RESOLUTIONS:
+        agg = aggregate(df, resolution)
+        if agg.empty:
+            continue
+        paths = agg["bucket"].map(lambda b: _partition_path(resolution, b, rollup_dir))
+        for path, part in agg.groupby(paths, sort=False):
+            existing, last = _read_partition(path)
+            if last and last >= batch:
+                continue  # replay of a batch this partition already has
+            _write_partition(merge(existing, part), path, batch)
+            written += 1
+    return written
+
+
+def load_rollup(resolution, start=None, end=None, device=None, rollup_dir=ROLLUP_DIR):
+    """
+    Buckets of one resolution with start <= bucket < end, with ``mean_*`` added.
+    Only partition files overlapping the range are opened.
+    """
+    folder = Path(rollup_dir) / resolution
+    if not folder.is_dir():
+        return pd.DataFrame(columns=SCHEMA.names)
+    fmt = RESOLUTIONS[resolution][2]
+    lo = pd.Timestamp(start).strftime(fmt) if start is not None else None
+    hi = pd.Timestamp(end).strftime(fmt) if end is not None else None
+    frames = []
+    for path in sorted(folder.glob("*.parquet")):
+        key = path.stem  # fixed-width keys sort chronologically
+        if (lo is not None and key < lo) or (hi is not None and key > hi):
+            continue
+        frames.append(_read_partition(path)[0])
+    if not frames:
+        return pd.DataFrame(columns=SCHEMA.names)
+    df = pd.concat(frames, ignore_index=True)
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df["bucket"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df["bucket"] < pd.Timestamp(end)).to_numpy()
+    if device is not None:
+        mask &= (df["device_id"] == device).to_numpy()
+    df = df[mask].sort_values(KEYS, ignore_index=True)
+    for f in FIELDS:
+        df[f"mean_{f}"] = df[f"sum_{f}"] / df[f"count_{f}"].where(df[f"count_{f}"] > 0)
+    return df
+
+
+def pick_resolution(start, end, points):
+    """
+    Coarsest resolution that still gives at least ``points`` buckets between
+    ``start`` and ``end``; None when even 1-minute buckets are too coarse
+    (then the raw samples should be used).
+    """
+    span = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds()
+    for name, (seconds, _, _) in sorted(RESOLUTIONS.items(), key=lambda kv: -kv[1][0]):
+        if span / seconds >= points:
+            return name
+    return None
+
+
+def rebuild(rollup_dir=ROLLUP_DIR):
+    """
+    Recompute all rollups from the processed store, one day at a time, into a
+    fresh folder that then replaces the old one. Run it while preprocessing is
+    stopped.
+    """
+    from processed_store import STORE_DIR, _partitions, load_processed
+
+    rollup_dir = Path(rollup_dir)
+    tmp_dir = rollup_dir.with_name(rollup_dir.name + ".rebuild")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    rows = 0
+    columns = ["system_timestamp", "device_id"] + FIELDS
+    for partition in _partitions(STORE_DIR):
+        try:
+            start = datetime.strptime(partition.name.split("=", 1)[1], "%Y-%m-%d")
+        except ValueError:
+            continue  # rows without a timestamp have no bucket
+        df = load_processed(columns=columns, start=start, end=start + timedelta(days=1))
+        # batch id "": every batch preprocessed after the rebuild sorts later and is merged
+        update_rollups(df, "", tmp_dir)
+        rows += len(df)
+    shutil.rmtree(rollup_dir, ignore_errors=True)
+    if tmp_dir.exists():
+        os.replace(tmp_dir, rollup_dir)
+    return rows
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if cmd == "rebuild":
+        print(f"Rolled up {rebuild()} rows into {ROLLUP_DIR}")
+    elif cmd == "show":
+        resolution = sys.argv[2] if len(sys.argv) > 2 else "1h"
+        start = sys.argv[3] if len(sys.argv) > 3 else None
+        end = sys.argv[4] if len(sys.argv) > 4 else None
+        df = load_rollup(resolution, start, end)
+        means = ["device_id", "bucket"] + [f"mean_{f}" for f in FIELDS] + ["min_SOIL_PCT", "max_SOIL_PCT", "count_SOIL_PCT"]
+        print(df[means].to_string(index=False) if not df.empty else "(no rollups)")
+    else:
+        raise SystemExit(f"usage: {Path(__file__).name} [rebuild | show [1min|1h|1d] [start] [end]]")
@@ -0,0 +1,165 @@
+# smart_agriculture_project/scripts/running_stats.py
+"""
+Streaming per-column statistics for the preprocessing pipeline.
+
+For every column it keeps count, mean, variance (Welford / Chan merge), min and
+max, updated from each new batch only. Optionally it also keeps exponentially
+decayed mean/variance with a half-life in seconds, so normalisation can follow
+seasonal drift instead of being pinned to the all-time range.
+
+The state is written to ``scaler_stats.json`` atomically. Each column keeps its
+``min`` / ``max`` keys, so older readers of that file keep working.
+"""
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+class ColumnStats:
+    __slots__ = ("count", "mean", "m2", "min", "max", "ew_mean", "ew_var", "ew_last_ts")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.ew_mean = None
+        self.ew_var = 0.0
+        self.ew_last_ts = None
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    @property
+    def ew_std(self):
+        return math.sqrt(self.ew_var)
+
+    def update(self, values):
+        """Merge a batch (1-D float array, NaNs already removed) in O(len(values))."""
+        n_b = len(values)
+        if n_b == 0:
+            return
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+        b_min, b_max = float(values.min()), float(values.max())
+        self.min = b_min if self.min is None else min(self.min, b_min)
+        self.max = b_max if self.max is None else max(self.max, b_max)
+
+    def update_decayed(self, values, timestamps, halflife):
+        """Exponentially decayed mean/variance; older readings fade with ``halflife`` seconds."""
+        rate = math.log(2) / halflife
+        mean, var, last = self.ew_mean, self.ew_var, self.ew_last_ts
+        for x, t in zip(values.tolist(), timestamps.tolist()):
+            if mean is None:
+                mean, var, last = x, 0.0, t
+                continue
+            alpha = 1.0 - math.exp(-rate * max(t - last, 0.0)) if last is not None else 1.0
+            diff = x - mean
+            mean += alpha * diff
+            var = (1.0 - alpha) * (var + alpha * diff * diff)
+            last = t if last is None else max(last, t)
+        self.ew_mean, self.ew_var, self.ew_last_ts = mean, var, last
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min, "max": self.max,
+                "ew_mean": self.ew_mean, "ew_var": self.ew_var, "ew_last_ts": self.ew_last_ts}
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls()
+        s.count = int(d.get("count", 0))
+        s.mean = float(d.get("mean", 0.0))
+        s.m2 = float(d.get("m2", 0.0))
+        s.min = d.get("min")
+        s.max = d.get("max")
+        s.ew_mean = d.get("ew_mean")
+        s.ew_var = float(d.get("ew_var", 0.0))
+        s.ew_last_ts = d.get("ew_last_ts")
+        return s
+
+
+class RunningStats:
+    """Per-column ``ColumnStats`` with batch updates and atomic persistence."""
+
+    def __init__(self, columns, halflife=None):
+        self.columns = list(columns)
+        self.halflife = halflife  # seconds; None disables decayed stats
+        self._stats = {col: ColumnStats() for col in self.columns}
+
+    def __getitem__(self, col):
+        return self._stats[col]
+
+    def mean(self, col):
+        s = self._stats.get(col)
+        return s.mean if s is not None and s.count else None
+
+    def update(self, df, timestamps=None):
+        """
+        Fold the rows of ``df`` into the statistics. ``timestamps`` (seconds, one per
+        row) drives the decayed statistics when a half-life is configured.
+        """
+        for col in self.columns:
+            if col not in df.columns:
+                continue
+            values = np.asarray(df[col], dtype=float)
+            ok = ~np.isnan(values)
+            self._stats[col].update(values[ok])
+            if self.halflife and timestamps is not None:
+                ts = np.asarray(timestamps, dtype=float)
+                ok &= ~np.isnan(ts)
+                order = np.argsort(ts[ok], kind="stable")
+                self._stats[col].update_decayed(values[ok][order], ts[ok][order], self.halflife)
+
+    def range(self, col, decayed=False, width=3.0):
+        """
+        (low, high) used for min-max scaling: the all-time min/max, or with
+        ``decayed`` the decayed mean +- ``width`` decayed standard deviations.
+        """
+        s = self._stats[col]
+        if decayed and s.ew_mean is not None:
+            return s.ew_mean - width * s.ew_std, s.ew_mean + width * s.ew_std
+        return s.min, s.max
+
+    # ---------------- persistence ----------------
+    def to_dict(self):
+        return {col: s.to_dict() for col, s in self._stats.items()}
+
+    @classmethod
+    def from_dict(cls, state, columns, halflife=None):
+        """Restore from ``to_dict`` output; legacy {col: {min, max}} files load too."""
+        rs = cls(columns, halflife)
+        for col in columns:
+            if col in state:
+                rs._stats[col] = ColumnStats.from_dict(state[col])
+        return rs
+
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(self.to_dict()))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, columns, halflife=None):
+        path = Path(path)
+        try:
+            state = json.loads(path.read_text())
+        except (OSError, ValueError):
+            state = {}
+        return cls.from_dict(state, columns, halflife)
@@ -0,0 +1,279 @@
+# smart_agriculture_project/scripts/sensor_db.py
+"""
+SQLite store for sensor readings, model predictions and actuator events.
+
+The database runs in WAL mode: one writer (the collector) and any number of
+readers (backend, scripts) work at the same time without blocking each other.
+``synchronous=NORMAL`` syncs at checkpoints, not at every commit. Commits are
+still atomic, and a power cut can lose at most the last moments of data, like
+the segment log's group commit.
+
+Tables (timestamps are integer milliseconds since the epoch, UTC):
+
+    readings        (device_id, ts) primary key, WITHOUT ROWID: rows are stored
+                    clustered by device and time, so a range query is a single
+                    index seek followed by a sequential scan; re-inserting a
+                    reading is a no-op
+    predictions     model outputs, indexed on (device_id, ts)
+    actuator_events pump commands (source auto/manual), indexed on (device_id, ts)
+
+Schema changes go into ``MIGRATIONS``; ``PRAGMA user_version`` records how many
+have been applied.
+
+    python sensor_db.py import                   # segment log (or data.json) -> sensors.db
+    python sensor_db.py import --json ../data/raw/data.json
+    python sensor_db.py stats
+"""
+import argparse
+import json
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dedup_index import DEFAULT_DEVICE
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_FILE = BASE_DIR / "data" / "sensors.db"
+
+MIGRATIONS = [
+    """
+    CREATE TABLE readings (
+        device_id   TEXT    NOT NULL,
+        ts          INTEGER NOT NULL,
+        temp_c      REAL,
+        humidity    REAL,
+        soil_pct    REAL,
+        ldr         REAL,
+        soil_status TEXT,
+        light_level TEXT,
+        PRIMARY KEY (device_id, ts)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE predictions (
+        id          INTEGER PRIMARY KEY,
+        device_id   TEXT    NOT NULL,
+        ts          INTEGER NOT NULL,
+        model       TEXT    NOT NULL,
+        version     INTEGER,
+        label       INTEGER NOT NULL,
+        probability REAL
+    );
+    CREATE INDEX predictions_device_ts ON predictions (device_id, ts);
+
+    CREATE TABLE actuator_events (
+        id          INTEGER PRIMARY KEY,
+        device_id   TEXT    NOT NULL,
+        ts          INTEGER NOT NULL,
+        command     TEXT    NOT NULL,
+        source      TEXT    NOT NULL,
+        status      TEXT
+    );
+    CREATE INDEX actuator_events_device_ts ON actuator_events (device_id, ts);
+    """,
+]
+
+READING_COLUMNS = ("device_id", "ts", "temp_c", "humidity", "soil_pct", "ldr", "soil_status", "light_level")
+INSERT_READING = (f"INSERT OR IGNORE INTO readings ({', '.join(READING_COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(READING_COLUMNS))})")
+
+
+def connect(path=DB_FILE, readonly=False, check_same_thread=True):
+    """Open the database with the WAL settings above and apply pending migrations."""
+    path = Path(path)
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=check_same_thread)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    if not readonly:
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -65536")        # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size = 268435456")      # 256 MiB memory-mapped reads
+    if not readonly:
+        migrate(conn)
+    return conn
+
+
+def migrate(conn):
+    """Apply the migrations this database has not seen yet."""
+    applied = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[applied:], start=applied + 1):
+        conn.executescript(f"BEGIN; {script}; PRAGMA user_version = {number}; COMMIT;")
+    return len(MIGRATIONS) - applied
+
+
+# ---------------- conversions ----------------
+def to_ms(stamp):
+    """
+    ISO timestamp or datetime -> int ms since the epoch; None if unparseable.
+    Naive stamps are local time, as the collector writes them (``datetime.now()``),
+    so readings line up with predictions / actuator events stamped with ``time.time()``.
+    """
+    if stamp is None:
+        return None
+    try:
+        dt = stamp if isinstance(stamp, datetime) else datetime.fromisoformat(str(stamp))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return int(dt.timestamp() * 1000)
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def reading_row(record):
+    """Collector record (dict of strings) -> ``READING_COLUMNS`` tuple, or None without a timestamp."""
+    ts = to_ms(record.get("system_timestamp"))
+    if ts is None:
+        return None
+    return (record.get("device_id") or DEFAULT_DEVICE, ts,
+            _float(record.get("TEMP_C")), _float(record.get("HUMIDITY")),
+            _float(record.get("SOIL_PCT")), _float(record.get("LDR")),
+            record.get("SOIL_STATUS"), record.get("LIGHT_LEVEL"))
+
+
+# ---------------- writes ----------------
+def insert_readings(conn, rows):
+    """Insert many ``READING_COLUMNS`` tuples in one transaction; duplicates are skipped."""
+    with conn:
+        cur = conn.executemany(INSERT_READING, rows)
+    return cur.rowcount
+
+
+def insert_prediction(conn, model, label, probability=None, version=None,
+                      device_id=DEFAULT_DEVICE, ts=None):
+    with conn:
+        conn.execute("INSERT INTO predictions (device_id, ts, model, version, label, probability) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     (device_id, ts or int(time.time() * 1000), model, version, int(label), probability))
+
+
+def insert_actuator_event(conn, command, source, status=None, device_id=DEFAULT_DEVICE, ts=None):
+    with conn:
+        conn.execute("INSERT INTO actuator_events (device_id, ts, command, source, status) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (device_id, ts or int(time.time() * 1000), command, source, status))
+
+
+class ReadingWriter:
+    """
+    Batched insert path for the collector: rows are buffered and written in one
+    transaction per ``batch_size`` rows or ``flush_interval`` seconds, whichever
+    comes first.
+    """
+
+    def __init__(self, path=DB_FILE, batch_size=500, flush_interval=1.0, check_same_thread=True):
+        self.conn = connect(path, check_same_thread=check_same_thread)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self.written = 0
+
+    def add(self, record):
+        row = reading_row(record)
+        if row is not None:
+            self._rows.append(row)
+        self._maybe_flush()
+
+    def add_rows(self, rows):
+        self._rows.extend(rows)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._rows) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self.written += max(insert_readings(self.conn, self._rows), 0)
+            self._rows = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- reads ----------------
+def query_readings(conn, device_id=DEFAULT_DEVICE, start_ms=None, end_ms=None, limit=None):
+    """Readings of one device with start_ms <= ts < end_ms, oldest first."""
+    sql = f"SELECT {', '.join(READING_COLUMNS[1:])} FROM readings WHERE device_id = ?"
+    args = [device_id]
+    if start_ms is not None:
+        sql += " AND ts >= ?"
+        args.append(start_ms)
+    if end_ms is not None:
+        sql += " AND ts < ?"
+        args.append(end_ms)
+    sql += " ORDER BY ts"
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(limit)
+    return conn.execute(sql, args).fetchall()
+
+
+def latest_reading(conn, device_id=DEFAULT_DEVICE):
+    return conn.execute(f"SELECT {', '.join(READING_COLUMNS[1:])} FROM readings "
+                        "WHERE device_id = ? ORDER BY ts DESC LIMIT 1", (device_id,)).fetchone()
+
+
+# ---------------- import ----------------
+def import_records(records, path=DB_FILE, batch_size=10_000):
+    """Insert an iterable of collector records; returns (rows read, rows inserted)."""
+    seen = 0
+    with ReadingWriter(path, batch_size=batch_size, flush_interval=float("inf")) as writer:
+        for record in records:
+            seen += 1
+            writer.add(record)
+    return seen, writer.written
+
+
+if __name__ == "__main__":
+    from sensor_log import DEFAULT_LOG_DIR, LEGACY_JSON_FILE, SegmentLogReader, list_segments
+
+    parser = argparse.ArgumentParser(description="SQLite sensor store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="load the segment log or data.json into the database")
+    imp.add_argument("--json", help="import this data.json instead of the segment log")
+    imp.add_argument("--log-dir", default=str(DEFAULT_LOG_DIR))
+    imp.add_argument("--db", default=str(DB_FILE))
+    st = sub.add_parser("stats", help="row counts and time span per device")
+    st.add_argument("--db", default=str(DB_FILE))
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        if args.json:
+            source = json.loads(Path(args.json).read_text())
+        elif list_segments(args.log_dir):
+            source = SegmentLogReader(args.log_dir)
+        else:
+            source = json.loads(Path(LEGACY_JSON_FILE).read_text())
+        t0 = time.perf_counter()
+        seen, inserted = import_records(source, args.db)
+        print(f"Read {seen} records, inserted {inserted} new readings into {args.db} "
+              f"in {time.perf_counter() - t0:.1f}s")
+    else:
+        conn = connect(args.db, readonly=True)
+        for device, n, lo, hi in conn.execute(
+                "SELECT device_id, COUNT(*), MIN(ts), MAX(ts) FROM readings GROUP BY device_id"):
+            span = [datetime.fromtimestamp(v / 1000).isoformat() for v in (lo, hi)]
+            print(f"{device:<16} {n:>12,} readings  {span[0]} .. {span[1]}")
+        for table in ("predictions", "actuator_events"):
+            print(f"{table:<16} {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]:>12,} rows")
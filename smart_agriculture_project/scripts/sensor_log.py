@@ -0,0 +1,249 @@
+# smart_agriculture_project/scripts/sensor_log.py
+"""
+Append-only, segmented sensor log.
+
+Readings are stored one JSON object per line (JSON Lines) in numbered segment
+files under ``data/raw/segments``:
+
+    sensors-00000001.jsonl
+    sensors-00000002.jsonl
+    ...
+
+Appending a reading is a single ``write`` to the open segment, so its cost does
+not depend on how much history has been collected. A segment is closed and a new
+one started when it grows past ``max_segment_bytes`` or is older than
+``max_segment_age``. fsync is group-committed: at most one fsync per
+``fsync_interval`` seconds, plus one on rollover and on close.
+
+Readers address records with a ``LogPosition`` (segment number, byte offset), so
+a consumer can remember where it stopped and resume from there.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from sensor_protocol import NUMERIC_FIELDS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_LOG_DIR = BASE_DIR / "data" / "raw" / "segments"
+LEGACY_JSON_FILE = BASE_DIR / "data" / "raw" / "data.json"
+
+SEGMENT_PREFIX = "sensors-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class LogPosition(NamedTuple):
+    segment: int
+    offset: int
+
+
+START = LogPosition(0, 0)
+
+
+def coerce_record(record: dict) -> dict:
+    """Return a copy of ``record`` with numeric sensor fields stored as numbers."""
+    out = dict(record)
+    for key, typ in NUMERIC_FIELDS.items():
+        val = out.get(key)
+        if isinstance(val, str):
+            try:
+                out[key] = typ(val.strip())
+            except ValueError:
+                out[key] = None
+    return out
+
+
+def segment_path(log_dir: Path, number: int) -> Path:
+    return Path(log_dir) / f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(log_dir=DEFAULT_LOG_DIR) -> List[int]:
+    """Sorted segment numbers present in ``log_dir``."""
+    log_dir = Path(log_dir)
+    if not log_dir.is_dir():
+        return []
+    numbers = []
+    for p in log_dir.iterdir():
+        name = p.name
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            try:
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+    return sorted(numbers)
+
+
+class SegmentLogWriter:
+    """Appends readings to the newest segment, rolling over by size or age."""
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, max_segment_bytes=64 * 1024 * 1024,
+                 max_segment_age=24 * 3600, fsync_interval=1.0):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.fsync_interval = fsync_interval
+
+        self._file = None
+        self._segment = 0
+        self._size = 0
+        self._opened_at = 0.0
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+
+        segments = list_segments(self.log_dir)
+        # always start a fresh segment so a torn tail from a crash is never appended to
+        self._open_segment(segments[-1] + 1 if segments else 1)
+
+    def _open_segment(self, number):
+        self._file = open(segment_path(self.log_dir, number), "ab", buffering=0)
+        self._segment = number
+        self._size = self._file.tell()
+        self._opened_at = time.monotonic()
+
+    def _roll(self):
+        self.sync()
+        self._file.close()
+        self._open_segment(self._segment + 1)
+
+    def append(self, record: dict) -> LogPosition:
+        """Append one reading and return the position just after it."""
+        line = (json.dumps(coerce_record(record), separators=(",", ":")) + "\n").encode()
+
+        now = time.monotonic()
+        if self._size and (self._size + len(line) > self.max_segment_bytes
+                           or now - self._opened_at > self.max_segment_age):
+            self._roll()
+
+        self._file.write(line)
+        self._size += len(line)
+        self._dirty = True
+
+        # group commit: one fsync covers every append since the last one
+        if now - self._last_fsync >= self.fsync_interval:
+            self.sync()
+        return LogPosition(self._segment, self._size)
+
+    def append_many(self, records) -> LogPosition:
+        pos = None
+        for record in records:
+            pos = self.append(record)
+        return pos
+
+    def sync(self):
+        if self._dirty and self._file is not None:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SegmentLogReader:
+    """Reads records from a segment log, optionally starting at a saved position."""
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR):
+        self.log_dir = Path(log_dir)
+
+    def read_from(self, position: LogPosition = START,
+                  max_records: Optional[int] = None) -> Tuple[List[dict], LogPosition]:
+        """
+        Return ``(records, next_position)`` for every complete line after ``position``.
+        A partially written last line is left for the next call.
+        """
+        records = []
+        pos = LogPosition(*position)
+        for number in list_segments(self.log_dir):
+            if number < pos.segment:
+                continue
+            offset = pos.offset if number == pos.segment else 0
+            with open(segment_path(self.log_dir, number), "rb") as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # torn / in-progress write
+                    offset += len(raw)
+                    raw = raw.strip()
+                    if raw:
+                        try:
+                            records.append(json.loads(raw))
+                        except json.JSONDecodeError:
+                            pass
+                    if max_records is not None and len(records) >= max_records:
+                        return records, LogPosition(number, offset)
+            pos = LogPosition(number, offset)
+        return records, pos
+
+    def __iter__(self) -> Iterator[dict]:
+        for number in list_segments(self.log_dir):
+            with open(segment_path(self.log_dir, number), "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    raw = raw.strip()
+                    if raw:
+                        try:
+                            yield json.loads(raw)
+                        except json.JSONDecodeError:
+                            continue
+
+
+def end_position(log_dir=DEFAULT_LOG_DIR) -> LogPosition:
+    """Position just after the last complete record, for readers that only want new data."""
+    segments = list_segments(log_dir)
+    if not segments:
+        return START
+    path = segment_path(Path(log_dir), segments[-1])
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    cut = tail.rfind(b"\n")
+    return LogPosition(segments[-1], size - len(tail) + cut + 1 if cut >= 0 else size - len(tail))
+
+
+def read_all_records(log_dir=DEFAULT_LOG_DIR, legacy_json=LEGACY_JSON_FILE) -> List[dict]:
+    """
+    All readings in the log. Falls back to the legacy ``data.json`` array when
+    no segments exist yet, so consumers work before and after migration.
+    """
+    if list_segments(log_dir):
+        return list(SegmentLogReader(log_dir))
+    legacy_json = Path(legacy_json) if legacy_json else None
+    if legacy_json and legacy_json.exists():
+        try:
+            with open(legacy_json, "r") as f:
+                return [coerce_record(r) for r in json.load(f)]
+        except (json.JSONDecodeError, OSError):
+            return []
+    return []
+
+
+def migrate_legacy_json(json_file=LEGACY_JSON_FILE, log_dir=DEFAULT_LOG_DIR) -> int:
+    """
+    Copy readings from the old ``data.json`` into the segment log. Only runs when
+    the log is still empty; returns the number of records imported.
+    """
+    json_file = Path(json_file)
+    if list_segments(log_dir) or not json_file.exists():
+        return 0
+    try:
+        with open(json_file, "r") as f:
+            records = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return 0
+    with SegmentLogWriter(log_dir) as writer:
+        writer.append_many(records)
+    return len(records)
@@ -0,0 +1,210 @@
+# smart_agriculture_project/scripts/sensor_protocol.py
+"""
+Parser for the ESP32 sensor line protocol.
+
+The firmware prints one frame per line:
+
+    ts=00:01:23; TEMP_C=25.0; HUMIDITY=60.0; SOIL_PCT=45; SOIL_STATUS=Wet; LDR=2000; LIGHT_LEVEL=Bright
+
+Frames are parsed into typed records: numeric fields become floats and the
+status fields become ``SoilStatus`` / ``LightLevel`` members. Both are str
+enums, so records still serialise to the same JSON and SQLite values as
+before. Unknown keys (``device_id`` or anything newer firmware adds) are kept
+as strings.
+
+A line that starts with ``ts=`` but cannot be parsed is a malformed frame.
+It raises ``FrameError``, which says what is wrong with the line. Other lines
+(boot messages, debug prints) are not frames at all.
+
+    parse_line(line)          one frame -> record, or FrameError
+    parse_frames(data)        many lines at once (bytes/str blob or iterable)
+    FrameDecoder().feed(b)    raw serial chunks -> records; partial lines are
+                              kept until the rest arrives
+"""
+import re
+from collections import deque
+from enum import Enum
+
+FRAME_PREFIX = "ts="
+MAX_LINE = 4096  # a "line" longer than this without a newline is line noise
+
+
+class SoilStatus(str, Enum):
+    WET = "Wet"
+    DRY = "Dry"
+
+
+class LightLevel(str, Enum):
+    DARK = "Dark"
+    DIM = "Dim"
+    BRIGHT = "Bright"
+
+
+# numeric sensor fields and the type they are stored as
+NUMERIC_FIELDS = {"TEMP_C": float, "HUMIDITY": float, "SOIL_PCT": float, "LDR": float}
+ENUM_FIELDS = {"SOIL_STATUS": SoilStatus, "LIGHT_LEVEL": LightLevel}
+REQUIRED_FIELDS = frozenset(("ts", *NUMERIC_FIELDS))
+
+# value -> member lookups (a dict hit is much cheaper than calling the Enum)
+_ENUM_VALUES = {key: {m.value: m for m in enum} for key, enum in ENUM_FIELDS.items()}
+_SOIL = _ENUM_VALUES["SOIL_STATUS"]
+_LIGHT = _ENUM_VALUES["LIGHT_LEVEL"]
+
+# frames in the firmware's own field order are matched in one go
+_CANONICAL = re.compile(
+    r"ts=([^;]*?)\s*;\s*TEMP_C=([^;]*);\s*HUMIDITY=([^;]*);\s*SOIL_PCT=([^;]*);\s*"
+    r"SOIL_STATUS=([^;]*?)\s*;\s*LDR=([^;]*);\s*LIGHT_LEVEL=([^;]*?)\s*;?"
+)
+
+
+class FrameError(ValueError):
+    """A line that looks like a sensor frame but cannot be parsed."""
+
+    def __init__(self, reason, line):
+        super().__init__(f"{reason}: {line!r}")
+        self.reason = reason
+        self.line = line
+
+
+def parse_line(line):
+    """One frame (str or bytes) -> typed record dict; raises ``FrameError``."""
+    if isinstance(line, (bytes, bytearray)):
+        line = line.decode(errors="replace")
+    line = line.strip()
+    match = _CANONICAL.fullmatch(line)
+    if match is not None:
+        ts, temp, humidity, soil, status, ldr, light = match.groups()
+        try:
+            return {"ts": ts, "TEMP_C": float(temp), "HUMIDITY": float(humidity), "SOIL_PCT": float(soil),
+                    "SOIL_STATUS": _SOIL[status], "LDR": float(ldr), "LIGHT_LEVEL": _LIGHT[light]}
+        except (ValueError, KeyError):
+            pass  # the generic parser below reports what is wrong
+    return _parse_fields(line)
+
+
+def _parse_fields(line):
+    """Field-by-field parse for frames in any order or with extra keys."""
+    if not line.startswith(FRAME_PREFIX):
+        reason = "garbage before 'ts='" if FRAME_PREFIX in line else "not a sensor frame"
+        raise FrameError(reason, line)
+    record = {}
+    for part in line.split(";"):
+        key, sep, value = part.partition("=")
+        key = key.strip()
+        if not sep:
+            if key:
+                raise FrameError(f"field {key!r} has no value", line)
+            continue  # empty part, e.g. a trailing ';'
+        value = value.strip()
+        try:
+            if key in NUMERIC_FIELDS:
+                record[key] = float(value)
+            elif key in _ENUM_VALUES:
+                record[key] = _ENUM_VALUES[key][value]
+            else:
+                record[key] = value
+        except (ValueError, KeyError):
+            raise FrameError(f"bad {key} value {value!r}", line) from None
+    if not REQUIRED_FIELDS <= record.keys():
+        raise FrameError(f"missing {', '.join(sorted(REQUIRED_FIELDS - record.keys()))}", line)
+    return record
+
+
+def parse_frames(data, errors=None):
+    """
+    Parse many lines at once (a bytes/str blob or an iterable of lines).
+    Lines without ``ts=`` are skipped; malformed frames are appended to
+    ``errors`` when a list is given. Returns the list of records.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode(errors="replace")
+    if isinstance(data, str):
+        data = data.split("\n")
+    records, _ = _parse_lines(data, errors)
+    return records
+
+
+def _parse_lines(lines, errors=None):
+    """(records, number of non-empty lines without ``ts=``); the hot loop of the bulk paths."""
+    records = []
+    append = records.append
+    fullmatch = _CANONICAL.fullmatch
+    soil, light = _SOIL, _LIGHT
+    ignored = 0
+    for line in lines:
+        line = line.strip()
+        match = fullmatch(line)
+        if match is not None:
+            ts, temp, humidity, moisture, status, ldr, level = match.groups()
+            try:
+                append({"ts": ts, "TEMP_C": float(temp), "HUMIDITY": float(humidity),
+                        "SOIL_PCT": float(moisture), "SOIL_STATUS": soil[status], "LDR": float(ldr),
+                        "LIGHT_LEVEL": light[level]})
+                continue
+            except (ValueError, KeyError):
+                pass
+        if FRAME_PREFIX not in line:
+            ignored += line != ""
+            continue
+        try:
+            append(_parse_fields(line))
+        except FrameError as e:
+            if errors is not None:
+                errors.append(e)
+    return records, ignored
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for one serial stream. ``feed`` takes raw chunks as
+    they arrive and returns the records completed by that chunk; the unfinished
+    tail is kept for the next call.
+
+    Counters: ``frames`` parsed, ``malformed`` frames (the most recent kept in
+    ``errors``), ``ignored`` lines without ``ts=``, ``overflows`` (runaway lines
+    without a newline, dropped). With ``skip_first`` the first line is dropped
+    unseen, since a port opened mid-transmission starts inside a line.
+    """
+
+    def __init__(self, skip_first=False, keep_errors=100, max_line=MAX_LINE):
+        self.max_line = max_line
+        self.frames = 0
+        self.malformed = 0
+        self.ignored = 0
+        self.overflows = 0
+        self.errors = deque(maxlen=keep_errors)
+        self._buffer = b""
+        self._skip = skip_first
+
+    def feed(self, chunk):
+        data = self._buffer + chunk if self._buffer else chunk
+        cut = data.rfind(b"\n") + 1
+        self._buffer = data[cut:]
+        if len(self._buffer) > self.max_line:
+            self._buffer = b""
+            self.overflows += 1
+        if not cut:
+            return []
+        lines = data[:cut].decode(errors="replace").split("\n")
+        lines.pop()  # empty string after the final newline
+        if self._skip:
+            self._skip = False
+            del lines[0]
+        errors = []
+        records, ignored = _parse_lines(lines, errors)
+        self.frames += len(records)
+        self.ignored += ignored
+        if errors:
+            self.malformed += len(errors)
+            self.errors.extend(errors)
+        return records
+
+    def reset(self, skip_first=True):
+        """Forget the partial line, e.g. after the port was reopened."""
+        self._buffer = b""
+        self._skip = skip_first
+
+    def stats(self):
+        return {"frames": self.frames, "malformed": self.malformed, "ignored": self.ignored,
+                "overflows": self.overflows,
+                "last_error": str(self.errors[-1]) if self.errors else None}
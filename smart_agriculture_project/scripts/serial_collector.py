@@ -0,0 +1,360 @@
+# smart_agriculture_project/scripts/serial_collector.py
+"""
+Asyncio collector for any number of ESP32 serial ports.
+
+Each port has its own reader task. The task waits until the port is readable
+and then drains everything buffered. It decodes the chunk with
+sensor_protocol.FrameDecoder and tags each record with its device id. There is
+no fixed sleep between reads, so a record is timestamped when it arrives and
+a fast node cannot fill its OS buffer while the loop sleeps. Records of one
+device get strictly increasing stamps (at least 1 ms apart), because
+(device, system_timestamp) is their key in SQLite and in the dedup index.
+
+All readers put records on one bounded queue. A single storage task drains it
+in batches into the segment log and the SQLite store. If storage falls behind,
+the queue fills and readers stop reading until there is room. The backlog then
+waits in the serial driver and in the nodes' flow control instead of growing
+without limit in memory.
+
+Ports can be device paths or COM names, pty slaves (for tests) or pyserial URLs
+such as ``loop://``. On POSIX the readers wait on the file descriptor in the
+event loop; anything without one (Windows COM ports, URL handlers) is read in
+a worker thread with a short timeout.
+
+Stages are timed into metrics.py histograms (``collector_*``); data.py
+publishes them for the backend's ``/metrics``.
+"""
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import serial
+import serial.tools.list_ports
+
+from metrics import counter, gauge, histogram, timer
+from sensor_db import ReadingWriter, reading_row, to_ms
+from sensor_log import SegmentLogWriter
+from sensor_protocol import FrameDecoder
+
+READ_SIZE = 64 * 1024       # max bytes taken from a port per wakeup
+THREAD_READ_TIMEOUT = 0.2   # seconds a worker-thread read waits for data
+
+READ = histogram("collector_read_seconds", "serial read of one chunk")
+PARSE = histogram("collector_parse_seconds", "frame decoding of one chunk")
+LOG_WRITE = histogram("collector_log_write_seconds", "segment log append of one batch")
+DB_WRITE = histogram("collector_db_write_seconds", "SQLite insert of one batch")
+FLUSH = histogram("collector_flush_seconds", "fsync of the log + database commit")
+RECORDS = counter("collector_records_total", "readings decoded")
+STORED = counter("collector_stored_total", "readings written to storage")
+ERRORS = counter("collector_storage_errors_total", "failed log / database writes")
+BLOCKED = counter("collector_blocked_seconds_total", "reader time spent waiting for room in the queue")
+
+
+def detect_ports():
+    """Every port that looks like a USB/UART bridge (ESP32 dev boards)."""
+    return [p.device for p in serial.tools.list_ports.comports()
+            if "USB" in p.description or "UART" in p.description]
+
+
+def device_id_for(port):
+    """Default device id for a port: its name without the /dev/ prefix."""
+    return Path(port).name if port.startswith("/") else port.replace("://", "-").strip("-/")
+
+
+def open_port(port, baud=115200):
+    """
+    Open a device path, COM name or pyserial URL. Ports with a file descriptor
+    (POSIX) are made non-blocking so ``read_chunks`` can wait on them in the
+    event loop; the others keep a short read timeout for a worker thread.
+    """
+    if "://" in port:
+        ser = serial.serial_for_url(port, baud, timeout=THREAD_READ_TIMEOUT)
+    else:
+        ser = serial.Serial(port, baud, timeout=THREAD_READ_TIMEOUT)
+    if sys.platform != "win32" and hasattr(ser, "fd"):
+        ser.timeout = 0
+    return ser
+
+
+async def read_chunks(ser, name="port"):
+    """Yield whatever the port has buffered each time it becomes readable."""
+    async with aclosing(read_chunks_timed(ser, name)) as chunks:
+        async for data, _, _ in chunks:
+            yield data
+
+
+async def read_chunks_timed(ser, name="port"):
+    """
+    ``read_chunks`` yielding (data, perf_counter when the port became readable,
+    seconds spent in the read). Worker-thread ports only learn about data when
+    the blocking read returns, so there both are taken at that point.
+    """
+    loop = asyncio.get_running_loop()
+    if ser.timeout == 0:
+        fd = ser.fd
+        readable = asyncio.Event()
+        readable_at = 0.0
+
+        def on_readable():
+            nonlocal readable_at
+            if not readable.is_set():
+                readable_at = time.perf_counter()
+                readable.set()
+
+        loop.add_reader(fd, on_readable)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                t0 = time.perf_counter()
+                data = ser.read(READ_SIZE)
+                if data:
+                    yield data, readable_at, time.perf_counter() - t0
+        finally:
+            loop.remove_reader(fd)
+    else:
+        # one thread per port, so slow ports never wait for each other
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"read-{name}")
+        try:
+            while True:
+                data = await loop.run_in_executor(executor, ser.read, max(1, ser.in_waiting))
+                if data:
+                    yield data, time.perf_counter(), 0.0
+        finally:
+            executor.shutdown(wait=False)
+
+
+class DeviceReader:
+    """Reads one serial port and feeds parsed, tagged records into ``queue``."""
+
+    def __init__(self, port, device_id, queue, baud=115200, reconnect_delay=2.0, boot_delay=0.0):
+        self.port = port
+        self.device_id = device_id
+        self.queue = queue
+        self.baud = baud
+        self.reconnect_delay = reconnect_delay
+        self.boot_delay = boot_delay
+        self.records = 0
+        self.decoder = FrameDecoder(skip_first=True)
+        self.reconnects = 0
+        self.blocked = 0.0  # seconds spent waiting for room in the queue
+        self._serial = None
+        self._last_ms = 0
+
+    def _stamp(self):
+        """
+        Arrival time for one record, strictly increasing per device at ms
+        resolution: (device, system_timestamp) is the SQLite and dedup key, so
+        frames that arrive in the same chunk must not share it.
+        """
+        now = datetime.now()
+        ms = to_ms(now)
+        if ms <= self._last_ms:
+            now += timedelta(milliseconds=self._last_ms + 1 - ms)
+            ms = self._last_ms + 1
+        self._last_ms = ms
+        return now.isoformat()
+
+    async def _handle(self, chunk):
+        with timer(PARSE):
+            records = self.decoder.feed(chunk)
+        if not records:
+            return
+        for record in records:
+            record["system_timestamp"] = self._stamp()
+            record.setdefault("device_id", self.device_id)
+            if self.queue.full():
+                t0 = time.monotonic()
+                await self.queue.put(record)
+                waited = time.monotonic() - t0
+                self.blocked += waited
+                BLOCKED.inc(waited)
+            else:
+                self.queue.put_nowait(record)
+        self.records += len(records)
+        RECORDS.inc(len(records))
+
+    async def run(self):
+        while True:
+            try:
+                self._serial = await asyncio.get_running_loop().run_in_executor(None, open_port, self.port, self.baud)
+                print(f"[{self.device_id}] connected on {self.port}")
+                if self.boot_delay:
+                    await asyncio.sleep(self.boot_delay)  # wait for the ESP32 to boot
+                self.decoder.reset()  # the first partial line after opening is dropped
+                async with aclosing(read_chunks_timed(self._serial, self.device_id)) as chunks:
+                    async for chunk, _, read_seconds in chunks:
+                        READ.observe(read_seconds)
+                        await self._handle(chunk)
+            except (serial.SerialException, OSError) as e:
+                print(f"[{self.device_id}] serial error on {self.port}: {e}")
+            finally:
+                if self._serial is not None:
+                    self._serial.close()
+                    self._serial = None
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+
+class StorageWriter:
+    """
+    Drains the record queue into the segment log and (optionally) SQLite.
+
+    Writes happen on one dedicated thread, so the readers keep running while a
+    batch is written or fsynced. Queue batches are capped at ``max_batch``.
+    """
+
+    def __init__(self, queue, log: SegmentLogWriter, db: ReadingWriter = None,
+                 max_batch=1000, idle_flush=1.0):
+        self.queue = queue
+        self.log = log
+        self.db = db
+        self.max_batch = max_batch
+        self.idle_flush = idle_flush
+        self.stored = 0
+        self.batches = 0
+        self.errors = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+
+    def _store(self, batch):
+        written = False
+        try:
+            with timer(LOG_WRITE):
+                self.log.append_many(batch)
+            written = True
+        except Exception as e:
+            self.errors += 1
+            ERRORS.inc()
+            print("Error writing to log:", e)
+        if self.db is not None:
+            try:
+                with timer(DB_WRITE):
+                    self.db.add_rows([row for row in map(reading_row, batch) if row is not None])
+                written = True
+            except Exception as e:
+                self.errors += 1
+                ERRORS.inc()
+                print("Error writing to database:", e)
+        self.batches += 1
+        if written:  # in at least one store
+            self.stored += len(batch)
+            STORED.inc(len(batch))
+
+    def _flush(self):
+        with timer(FLUSH):
+            self.log.sync()
+            if self.db is not None:
+                self.db.flush()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    first = await asyncio.wait_for(self.queue.get(), self.idle_flush)
+                except asyncio.TimeoutError:
+                    # quiet period: make what is buffered durable and visible
+                    await loop.run_in_executor(self._executor, self._flush)
+                    continue
+                batch = [first]
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+                await loop.run_in_executor(self._executor, self._store, batch)
+        finally:
+            # store what is still queued before shutting down
+            rest = []
+            while not self.queue.empty():
+                rest.append(self.queue.get_nowait())
+            if rest:
+                self._executor.submit(self._store, rest).result()
+            self._executor.submit(self._flush).result()
+
+    def close(self):
+        """Close the log and the database on the storage thread."""
+        def _close():
+            self.log.close()
+            if self.db is not None:
+                self.db.close()
+        self._executor.submit(_close).result()
+        self._executor.shutdown()
+
+
+class Collector:
+    """Reader tasks for a set of ports plus the storage task, with port rescans."""
+
+    def __init__(self, storage: StorageWriter, ports=None, baud=115200, rescan_interval=10.0,
+                 reconnect_delay=2.0, boot_delay=0.0):
+        self.storage = storage
+        self.queue = storage.queue
+        self.ports = dict(ports) if ports else None  # port -> device id; None = auto-detect
+        self.baud = baud
+        self.rescan_interval = rescan_interval
+        self.reconnect_delay = reconnect_delay
+        self.boot_delay = boot_delay
+        self.readers = {}
+        self._tasks = []
+        gauge("collector_devices", "ports being read", fn=lambda: len(self.readers))
+        gauge("collector_queue_depth", "readings waiting for storage", fn=self.queue.qsize)
+        gauge("collector_malformed_frames", "malformed frames since start",
+              fn=lambda: sum(r.decoder.malformed for r in self.readers.values()))
+
+    def _start_reader(self, port, device_id):
+        reader = DeviceReader(port, device_id, self.queue, self.baud, self.reconnect_delay, self.boot_delay)
+        self.readers[port] = reader
+        self._tasks.append(asyncio.create_task(reader.run(), name=f"reader-{device_id}"))
+
+    def _scan(self):
+        ports = self.ports if self.ports is not None else {p: device_id_for(p) for p in detect_ports()}
+        for port, device_id in ports.items():
+            if port not in self.readers:
+                self._start_reader(port, device_id)
+
+    def stats(self):
+        return {
+            "devices": len(self.readers),
+            "records": sum(r.records for r in self.readers.values()),
+            "stored": self.storage.stored,
+            "queued": self.queue.qsize(),
+            "malformed": sum(r.decoder.malformed for r in self.readers.values()),
+            "ignored": sum(r.decoder.ignored for r in self.readers.values()),
+            "blocked_s": round(sum(r.blocked for r in self.readers.values()), 3),
+        }
+
+    async def run(self, stats_interval=None):
+        """Run until cancelled; prints a status line every ``stats_interval`` seconds."""
+        storage_task = asyncio.create_task(self.storage.run(), name="storage")
+        try:
+            self._scan()
+            if not self.readers:
+                print("No ESP32 found yet; waiting for one to be connected...")
+            last_scan = last_stats = time.monotonic()
+            last_stored = 0
+            while True:
+                await asyncio.sleep(min(self.rescan_interval, stats_interval or self.rescan_interval))
+                now = time.monotonic()
+                if self.ports is None and now - last_scan >= self.rescan_interval:
+                    self._scan()
+                    last_scan = now
+                if stats_interval and now - last_stats >= stats_interval:
+                    s = self.stats()
+                    rate = (s["stored"] - last_stored) / (now - last_stats)
+                    print(f"{s['devices']} devices, {s['stored']} stored ({rate:.1f}/s), "
+                          f"{s['queued']} queued, {s['malformed']} malformed frames")
+                    for reader in self.readers.values():
+                        if reader.decoder.errors:
+                            print(f"[{reader.device_id}] last malformed frame: {reader.decoder.errors[-1]}")
+                            reader.decoder.errors.clear()
+                    last_stats, last_stored = now, s["stored"]
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            storage_task.cancel()
+            await asyncio.gather(storage_task, return_exceptions=True)
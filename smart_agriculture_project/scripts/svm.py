@@ -1,26 +1,27 @@
 from pathlib import Path
-import pandas as pd
 from sklearn.model_selection import StratifiedShuffleSplit
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.svm import SVC
 from sklearn.metrics import accuracy_score
-import joblib
+
+from model_registry import publish
+from processed_store import load_processed
 
 # --- Paths ---
 BASE_DIR = Path(__file__).resolve().parent.parent  # project root
-processed_file = BASE_DIR / "data" / "processed" / "processed_data.csv"
 models_folder = BASE_DIR / "data" / "models"
 models_folder.mkdir(exist_ok=True)
 
-# --- Load CSV ---
-if not processed_file.exists():
-    raise FileNotFoundError(f"Processed CSV not found at: {processed_file}")
+# same columns as train_models.py (train_all.py trains both from one cached matrix)
+FEATURES = ['TEMP_C','HUMIDITY','SOIL_PCT','LDR']
 
-data = pd.read_csv(processed_file)
+# --- Load processed data ---
+data = load_processed(columns=FEATURES + ['irrigation_needed'])
 print("Processed data loaded successfully")
 
 # --- Features and targets ---
-X = data[['temperature_c','humidity_percent','soil_moisture_percent','ldr_value']]
+X = data[FEATURES]
 y_water = data['irrigation_needed'].astype(int)
 
 # --- Stratified split ---
@@ -29,25 +30,25 @@ for train_idx, test_idx in sss.split(X, y_water):
     X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
     y_train, y_test = y_water.iloc[train_idx], y_water.iloc[test_idx]
 
-# --- Scale features (important for SVM) ---
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# --- Train SVM classifier ---
-svm_model = SVC(
-    kernel='rbf',        # radial basis function kernel
-    C=1.0,               # regularization parameter
-    gamma='scale',       # kernel coefficient
-    probability=True,    # enable probability predictions
-    random_state=42
-)
-
-svm_model.fit(X_train_scaled, y_train)
-y_pred = svm_model.predict(X_test_scaled)
-print("SVM Water Prediction Accuracy:", accuracy_score(y_test, y_pred))
-
-# --- Save SVM model and scaler ---
-joblib.dump(svm_model, models_folder / "svm_water.pkl")
-joblib.dump(scaler, models_folder / "svm_scaler.pkl")
-print(f"SVM model and scaler saved at {models_folder}")
+# --- Scale features (important for SVM) + train SVM classifier ---
+# the scaler travels with the model, so registry consumers get raw-feature predictions
+svm_model = Pipeline([
+    ("scaler", StandardScaler()),
+    ("svc", SVC(
+        kernel='rbf',        # radial basis function kernel
+        C=1.0,               # regularization parameter
+        gamma='scale',       # kernel coefficient
+        probability=True,    # enable probability predictions
+        random_state=42
+    )),
+])
+
+svm_model.fit(X_train, y_train)
+y_pred = svm_model.predict(X_test)
+acc = accuracy_score(y_test, y_pred)
+print("SVM Water Prediction Accuracy:", acc)
+
+# --- Save SVM pipeline (new registry version + flat svm_water.pkl) ---
+version = publish("svm_water", svm_model, FEATURES, training_rows=len(X_train),
+                  metrics={"accuracy": float(acc)})
+print(f"SVM model saved as svm_water v{version} in {models_folder}")
@@ -0,0 +1,279 @@
+# smart_agriculture_project/scripts/synthetic_sensors.py
+"""
+Synthetic ESP32 sensor streams learned from the recorded readings.
+
+``SensorModel.fit`` learns from ``data/raw/data.json`` (or any list of
+records):
+
+    marginals       each numeric column's empirical distribution (quantiles)
+                    and the number of decimals the firmware prints
+    time structure  lag-1 autocorrelation per column and the correlation of
+                    the innovations across columns (a Gaussian copula with a
+                    VAR(1) on the normal scores), from consecutive readings
+                    at most MAX_GAP seconds apart
+    enums           SOIL_STATUS / LIGHT_LEVEL as the nearest recorded value
+                    of SOIL_PCT / LDR
+    interval        the median gap between consecutive readings
+
+Generated values follow the recorded distributions and drift from reading to
+reading like the real sensors, instead of being independent draws.
+Generation is vectorised over devices, so hundreds of virtual devices cost
+little CPU. Output goes to:
+
+    pty pairs       ``open_ptys`` + ``write_ptys``: each device is a pseudo
+                    terminal that data.py / Run.py open like a serial port
+    the pipeline    ``records`` yields collector-style dicts (device_id,
+                    system_timestamp) for the segment log, preprocess_data.py
+                    or the database
+    text            ``lines`` yields the firmware's ``ts=...;TEMP_C=...`` lines
+
+    python synthetic_sensors.py --devices 8 --rate 2 --pty          # prints the port names
+    python synthetic_sensors.py --devices 50 --rows 1000000 --log ../data/raw/segments
+    python synthetic_sensors.py --devices 1 --steps 5                # lines on stdout
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+from sensor_protocol import NUMERIC_FIELDS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RAW_JSON_FILE = BASE_DIR / "data" / "raw" / "data.json"
+MAX_GAP = 60.0  # seconds; readings further apart don't count as consecutive
+COLUMNS = list(NUMERIC_FIELDS)
+ENUMS = {"SOIL_STATUS": "SOIL_PCT", "LIGHT_LEVEL": "LDR"}  # enum -> numeric column it follows
+
+
+def _decimals(text):
+    text = str(text)
+    return len(text) - text.index(".") - 1 if "." in text else 0
+
+
+class SensorModel:
+    """Copula + VAR(1) model of one device's readings."""
+
+    def __init__(self, quantiles, decimals, phi, innovation_chol, start_chol, enum_tables, interval):
+        self.quantiles = quantiles                # column -> sorted recorded values
+        self.decimals = decimals                  # column -> decimals printed
+        self.phi = np.asarray(phi)                # lag-1 autocorrelation of the normal scores
+        self.innovation_chol = np.asarray(innovation_chol)
+        self.start_chol = np.asarray(start_chol)  # stationary correlation, for the first reading
+        self.enum_tables = enum_tables            # enum -> (sorted numeric values, labels)
+        self.interval = interval
+
+    @classmethod
+    def fit(cls, records):
+        rows = []
+        for r in records:
+            try:
+                rows.append(([float(r[c]) for c in COLUMNS], r))
+            except (KeyError, TypeError, ValueError):
+                continue  # incomplete reading
+        if len(rows) < 3:
+            raise ValueError("Need at least 3 complete readings to fit a sensor model")
+        stamps = np.array([datetime.fromisoformat(r["system_timestamp"]).timestamp()
+                           if r.get("system_timestamp") else np.nan for _, r in rows])
+        order = np.argsort(stamps, kind="stable")
+        values = np.array([v for v, _ in rows])[order]
+        stamps = stamps[order]
+        raw = [rows[i][1] for i in order]
+
+        n = len(values)
+        quantiles = {c: np.sort(values[:, j]) for j, c in enumerate(COLUMNS)}
+        decimals = {c: max(_decimals(r[c]) for r in raw) for c in COLUMNS}
+
+        # normal scores (ties share their mean rank)
+        z = np.empty_like(values)
+        for j in range(len(COLUMNS)):
+            ranks = np.searchsorted(quantiles[COLUMNS[j]], values[:, j], side="left") \
+                + np.searchsorted(quantiles[COLUMNS[j]], values[:, j], side="right")
+            z[:, j] = ndtri(np.clip(ranks / (2 * n), 0.5 / n, 1 - 0.5 / n))
+
+        gaps = np.diff(stamps)
+        pairs = np.flatnonzero(np.isfinite(gaps) & (gaps <= MAX_GAP) & (gaps > 0))
+        if len(pairs) >= 3:
+            prev, nxt = z[pairs], z[pairs + 1]
+            phi = np.array([np.corrcoef(prev[:, j], nxt[:, j])[0, 1] if prev[:, j].std() and nxt[:, j].std()
+                            else 0.0 for j in range(len(COLUMNS))])
+            phi = np.clip(np.nan_to_num(phi), 0.0, 0.995)
+            innovations = nxt - phi * prev
+            interval = float(np.median(gaps[pairs]))
+        else:
+            phi = np.zeros(len(COLUMNS))
+            innovations = z
+            interval = 2.0
+        jitter = 1e-6 * np.eye(len(COLUMNS))
+        innovation_chol = np.linalg.cholesky(np.cov(innovations, rowvar=False) + jitter)
+        start_chol = np.linalg.cholesky(np.corrcoef(z, rowvar=False) + jitter)
+
+        enum_tables = {}
+        for enum, col in ENUMS.items():
+            pairs_ = sorted((float(r[col]), r[enum]) for r in raw if r.get(enum))
+            if pairs_:
+                enum_tables[enum] = (np.array([p[0] for p in pairs_]), np.array([p[1] for p in pairs_]))
+        return cls(quantiles, decimals, phi, innovation_chol, start_chol, enum_tables, interval)
+
+    @classmethod
+    def from_json(cls, path=RAW_JSON_FILE):
+        return cls.fit(json.loads(Path(path).read_text()))
+
+    # ---------------- generation ----------------
+    def scores(self, devices, steps, seed=0):
+        """Normal scores, shape (steps, devices, columns)."""
+        rng = np.random.default_rng(seed)
+        k = len(COLUMNS)
+        out = np.empty((steps, devices, k))
+        z = rng.standard_normal((devices, k)) @ self.start_chol.T
+        noise = rng.standard_normal((steps, devices, k)) @ self.innovation_chol.T
+        for t in range(steps):
+            if t:
+                z = self.phi * z + noise[t]
+            out[t] = z
+        return out
+
+    def values(self, devices, steps, seed=0):
+        """{column: array (steps, devices)} of readings, plus the enum columns."""
+        z = self.scores(devices, steps, seed)
+        out = {}
+        for j, col in enumerate(COLUMNS):
+            q = self.quantiles[col]
+            probs = (np.arange(len(q)) + 0.5) / len(q)
+            out[col] = np.round(np.interp(ndtr(z[..., j]), probs, q), self.decimals[col])
+        for enum, (keys, labels) in self.enum_tables.items():
+            col = out[ENUMS[enum]]
+            idx = np.clip(np.searchsorted(keys, col), 1, len(keys) - 1)
+            nearer_left = (col - keys[idx - 1]) <= (keys[idx] - col)
+            out[enum] = labels[np.where(nearer_left, idx - 1, idx)]
+        return out
+
+    def blocks(self, devices, seed=0, block=256):
+        """Endless ``values`` blocks that continue each other (the AR state carries over)."""
+        rng = np.random.default_rng(seed)
+        while True:
+            yield self.values(devices, block, int(rng.integers(2 ** 31)))
+
+    def lines(self, devices=1, steps=None, seed=0, interval=None, block=256):
+        """
+        Yields one list of encoded lines (one per device) per time step, for
+        ``steps`` steps or forever. ``ts`` is each device's uptime.
+        """
+        interval = self.interval if interval is None else interval
+        t = 0
+        for vals in self.blocks(devices, seed, block):
+            text = {c: vals[c].astype(str) if self.decimals[c] else vals[c].astype(int).astype(str)
+                    for c in COLUMNS}
+            for i in range(block):
+                if steps is not None and t >= steps:
+                    return
+                secs = int(t * interval)
+                ts = f"{secs // 3600 % 100:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}"
+                yield [(f"ts={ts}; TEMP_C={text['TEMP_C'][i, d]}; HUMIDITY={text['HUMIDITY'][i, d]}; "
+                        f"SOIL_PCT={text['SOIL_PCT'][i, d]}; SOIL_STATUS={vals['SOIL_STATUS'][i, d]}; "
+                        f"LDR={text['LDR'][i, d]}; LIGHT_LEVEL={vals['LIGHT_LEVEL'][i, d]}\n").encode()
+                       for d in range(devices)]
+                t += 1
+
+    def records(self, devices=1, steps=None, seed=0, start=None, interval=None, device_prefix="sim"):
+        """Collector-style records (``device_id``, ``system_timestamp``), devices interleaved in time."""
+        interval = self.interval if interval is None else interval
+        start = start or datetime.now()
+        t = 0
+        for vals in self.blocks(devices, seed):
+            for i in range(len(vals["TEMP_C"])):
+                if steps is not None and t >= steps:
+                    return
+                secs = int(t * interval)
+                ts = f"{secs // 3600 % 100:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}"
+                stamp = (start + timedelta(seconds=t * interval)).isoformat()
+                for d in range(devices):
+                    yield {"ts": ts, **{c: float(vals[c][i, d]) for c in COLUMNS},
+                           "SOIL_STATUS": str(vals["SOIL_STATUS"][i, d]),
+                           "LIGHT_LEVEL": str(vals["LIGHT_LEVEL"][i, d]),
+                           "system_timestamp": stamp, "device_id": f"{device_prefix}-{d:03d}"}
+                t += 1
+
+
+# ---------------- pty stand-ins ----------------
+def open_ptys(n):
+    """``n`` raw pty pairs; returns (master fds, slave port names). POSIX only."""
+    import tty
+
+    masters, ports = [], []
+    for _ in range(n):
+        master, slave = os.openpty()
+        tty.setraw(slave)  # no echo / line editing, like a real UART
+        masters.append(master)
+        ports.append(os.ttyname(slave))
+    return masters, ports
+
+
+def write_ptys(model, masters, rate=None, seconds=None, seed=0, stamp=False):
+    """
+    Write each device's lines to its pty master at ``rate`` lines/s per device
+    (default: the learned interval; 0 = as fast as the readers take them).
+    With ``stamp`` every line carries ``SENT=<unix time>`` for latency measurements.
+    """
+    rate = 1.0 / model.interval if rate is None else rate
+    interval = 1.0 / rate if rate else 0.0
+    end = time.time() + seconds if seconds else None
+    next_tick = time.time()
+    for lines in model.lines(len(masters), seed=seed, interval=interval or model.interval):
+        now = time.time()
+        if end is not None and now >= end:
+            return
+        for fd, line in zip(masters, lines):
+            if stamp:
+                line = line[:-1] + f"; SENT={now:.6f}\n".encode()
+            os.write(fd, line)  # blocks when the pty buffer is full (backpressure)
+        if interval:
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.time()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=None, help="lines/s per device (default: as recorded)")
+    parser.add_argument("--seconds", type=float, default=None, help="--pty: stop after this long")
+    parser.add_argument("--steps", type=int, default=10, help="stdout: readings per device")
+    parser.add_argument("--pty", action="store_true", help="serve the devices on pty pairs")
+    parser.add_argument("--log", type=Path, help="append --rows records to this segment log folder")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--source", type=Path, default=RAW_JSON_FILE, help="recorded readings to learn from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = SensorModel.from_json(args.source)
+    print(f"# learned from {args.source}: interval {model.interval:.2f} s, "
+          f"lag-1 autocorrelation {dict(zip(COLUMNS, model.phi.round(3)))}")
+    if args.pty:
+        masters, ports = open_ptys(args.devices)
+        for i, port in enumerate(ports):
+            print(f"# device sim-{i:03d}: {port}")
+        try:
+            write_ptys(model, masters, args.rate, args.seconds, args.seed)
+        except KeyboardInterrupt:
+            pass
+    elif args.log:
+        from sensor_log import SegmentLogWriter
+
+        steps = -(-args.rows // args.devices)
+        with SegmentLogWriter(args.log) as log:
+            batch = []
+            for record in model.records(args.devices, steps, args.seed):
+                batch.append(record)
+                if len(batch) >= 10_000:
+                    log.append_many(batch)
+                    batch.clear()
+            log.append_many(batch)
+        print(f"# wrote {steps * args.devices:,} records to {args.log}")
+    else:
+        for lines in model.lines(args.devices, args.steps, args.seed):
+            for line in lines:
+                print(line.decode(), end="")
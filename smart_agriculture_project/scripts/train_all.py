@@ -0,0 +1,228 @@
+# smart_agriculture_project/scripts/train_all.py
+"""
+Train XGBoost, SVM and random forest in one run from one cached feature matrix.
+
+The feature matrix and train/test split come from ``feature_cache`` (built
+once, memory-mapped by every worker). Each model trains in its own worker
+process, is evaluated on the same test rows and is published to the model
+registry. Parameters come from ``PARAMS``, overridden by ``tuned_params.json``
+when tune.py has written one. The comparison goes to
+``data/models/training_report.json`` and ``training_report.md``.
+
+Wall time of the run is printed next to what running train_models.py, svm.py
+and the forest script one after another costs: every script loads and splits
+the data on its own, then fits one model.
+
+    python train_all.py
+    python train_all.py --models xgb_water rf_water
+    python train_all.py --sequential          # same work, one model after another
+    python train_all.py --default-params      # ignore tuned_params.json from tune.py
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from feature_cache import CACHE_DIR, FEATURES, TARGET, load_features, open_cached
+from model_registry import MODELS_DIR, publish
+from processed_store import CSV_EXPORT_FILE, STORE_DIR
+from running_stats import ColumnStats
+
+# --- Config ---
+TRAIN_DAYS = None  # e.g. 30 to train on the last 30 days only; None = all history
+PARAMS = {
+    "xgb_water": {"n_estimators": 100, "max_depth": 4, "learning_rate": 0.1},
+    "svm_water": {"C": 1.0, "gamma": "scale"},
+    "rf_water": {"n_estimators": 100, "max_depth": 5},
+}
+SEED = 42
+EXACT_SVM_MAX_ROWS = 20_000  # above this, svm_water is kernel_svm.ApproxKernelSVM instead of SVC
+WORKERS = None  # worker processes; None = one per model (capped at the CPU count)
+REPORT_NAME = "training_report"
+TUNED_PARAMS_FILE = MODELS_DIR / "tuned_params.json"  # written by tune.py; overrides PARAMS
+RETRAIN_REQUEST_FILE = MODELS_DIR / "retrain_requested.json"  # written by online_update.py
+
+
+def model_params(name, tuned=True, path=TUNED_PARAMS_FILE):
+    """``PARAMS[name]`` with the tune.py winner for ``name`` (if any) on top."""
+    params = dict(PARAMS[name])
+    if tuned and Path(path).exists():
+        params.update(json.loads(Path(path).read_text()).get(name, {}).get("params", {}))
+    return params
+
+
+def make_estimator(name, params, threads=1, rows=None):
+    """
+    Untrained estimator for ``name``. The SVM is SVC with its scaler as one
+    pipeline, or the Nystroem + SGD approximation for more than
+    ``EXACT_SVM_MAX_ROWS`` training rows.
+    """
+    if name.startswith("xgb"):
+        import xgboost as xgb
+        return xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', n_jobs=threads,
+                                 random_state=SEED, **params)
+    if name.startswith("svm") and rows is not None and rows > EXACT_SVM_MAX_ROWS:
+        from kernel_svm import ApproxKernelSVM
+        return ApproxKernelSVM(random_state=SEED, **params)
+    if name.startswith("svm"):
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.svm import SVC
+        return Pipeline([("scaler", StandardScaler()),
+                         ("svc", SVC(kernel='rbf', probability=True, random_state=SEED, **params))])
+    if name.startswith("rf"):
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_jobs=threads, random_state=SEED, **params)
+    raise ValueError(f"Unknown model {name!r} (expected an xgb_*, svm_* or rf_* name)")
+
+
+def evaluate(model, X_test, y_test):
+    """Accuracy, F1, ROC AUC and log loss on the test rows (AUC/log loss need both classes)."""
+    from sklearn.metrics import accuracy_score, f1_score, log_loss, roc_auc_score
+
+    proba = np.asarray(model.predict_proba(X_test))[:, -1]
+    y_pred = (proba > 0.5).astype(int)
+    metrics = {"accuracy": float(accuracy_score(y_test, y_pred)),
+               "f1": float(f1_score(y_test, y_pred, zero_division=0))}
+    if len(np.unique(y_test)) > 1:
+        metrics["roc_auc"] = float(roc_auc_score(y_test, proba))
+        metrics["log_loss"] = float(log_loss(y_test, proba, labels=[0, 1]))
+    return metrics
+
+
+def reference_stats(X):
+    """Per-feature ``ColumnStats`` of the training rows, the drift reference for online_update.py."""
+    stats = {}
+    for col in X.columns:
+        values = X[col].to_numpy(dtype=float)
+        column = ColumnStats()
+        column.update(values[~np.isnan(values)])
+        stats[col] = column.to_dict()
+    return stats
+
+
+def train_one(name, cache_path, params, threads=1, models_dir=MODELS_DIR, publish_model=True):
+    """Fit, evaluate and publish one model from a feature cache entry. Runs in a worker process."""
+    fs = open_cached(cache_path)
+    X_train, y_train = fs.frame(fs.train_idx), np.asarray(fs.y[fs.train_idx])
+    X_test, y_test = fs.frame(fs.test_idx), np.asarray(fs.y[fs.test_idx])
+
+    model = make_estimator(name, params, threads, rows=len(y_train))
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    metrics = evaluate(model, X_test, y_test)
+    predict_seconds = time.perf_counter() - t0
+
+    version = None
+    if publish_model:
+        version = publish(name, model, fs.features, training_rows=len(y_train), metrics=metrics,
+                          extra={"train_days": fs.meta["last_days"], "feature_key": fs.key,
+                                 "data_until": fs.meta.get("data_until"), "params": params,
+                                 "reference_stats": reference_stats(X_train)}, models_dir=models_dir)
+    return {"model": name, "version": version, "params": params, "metrics": metrics,
+            "fit_seconds": fit_seconds, "predict_us_per_row": predict_seconds / max(len(y_test), 1) * 1e6,
+            "pid": os.getpid()}
+
+
+def train_all(models=None, sequential=False, workers=WORKERS, last_days=TRAIN_DAYS, rebuild_cache=False,
+              store_dir=STORE_DIR, csv_file=CSV_EXPORT_FILE, cache_dir=CACHE_DIR, models_dir=MODELS_DIR,
+              publish_model=True, tuned=True):
+    """Train ``models`` (default: all of ``PARAMS``) and return the comparison report."""
+    models = list(models or PARAMS)
+    t_start = time.perf_counter()
+    fs = load_features(FEATURES, TARGET, last_days=last_days, store_dir=store_dir, csv_file=csv_file,
+                       cache_dir=cache_dir, rebuild=rebuild_cache)
+    features_seconds = time.perf_counter() - t_start
+    cache_hit = not fs.built
+    print(f"Features {fs}: {'cache hit' if cache_hit else 'built'} in {features_seconds:.2f} s "
+          f"({fs.meta['train_rows']} train / {fs.meta['test_rows']} test rows)")
+
+    cpus = os.cpu_count() or 1
+    workers = 1 if sequential else min(workers or len(models), len(models), cpus)
+    threads = max(1, cpus // workers)
+    tuned_file = Path(models_dir) / TUNED_PARAMS_FILE.name
+    args = [(name, fs.path, model_params(name, tuned, tuned_file), threads, models_dir, publish_model)
+            for name in models]
+    if workers == 1:
+        results = [train_one(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(train_one, *zip(*args)))
+    wall = time.perf_counter() - t_start
+    if publish_model:
+        clear_retrain_requests(models, Path(models_dir) / RETRAIN_REQUEST_FILE.name)
+
+    # each legacy script loads + splits on its own before fitting its model
+    sequential_scripts = len(models) * fs.meta["build_seconds"] + sum(r["fit_seconds"] for r in results)
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "feature_key": fs.key, "features": fs.features,
+            "rows": fs.meta["rows"], "train_rows": fs.meta["train_rows"], "test_rows": fs.meta["test_rows"],
+            "workers": workers, "threads_per_worker": threads, "cache_hit": cache_hit,
+            "features_seconds": features_seconds, "build_seconds": fs.meta["build_seconds"],
+            "wall_seconds": wall, "sequential_scripts_seconds": sequential_scripts, "models": results}
+
+
+def clear_retrain_requests(names, path=RETRAIN_REQUEST_FILE):
+    """Drop the full-retrain requests online_update.py made for ``names``."""
+    path = Path(path)
+    if not path.exists():
+        return
+    requests = {k: v for k, v in json.loads(path.read_text()).items() if k not in names}
+    if requests:
+        path.write_text(json.dumps(requests, indent=2))
+    else:
+        path.unlink(missing_ok=True)
+
+
+def format_report(report):
+    lines = [f"| model | version | accuracy | f1 | roc_auc | log_loss | fit s | predict us/row |",
+             f"|---|---|---|---|---|---|---|---|"]
+    for r in report["models"]:
+        m = r["metrics"]
+        cells = [f"{m[k]:.4f}" if k in m else "-" for k in ("accuracy", "f1", "roc_auc", "log_loss")]
+        lines.append(f"| {r['model']} | {r['version'] or '-'} | " + " | ".join(cells)
+                     + f" | {r['fit_seconds']:.2f} | {r['predict_us_per_row']:.1f} |")
+    lines += ["",
+              f"{report['rows']:,} rows ({report['train_rows']:,} train / {report['test_rows']:,} test), "
+              f"features {report['feature_key']}, {report['workers']} worker(s) x "
+              f"{report['threads_per_worker']} thread(s)",
+              f"wall {report['wall_seconds']:.2f} s vs. scripts one after another "
+              f"~{report['sequential_scripts_seconds']:.2f} s "
+              f"({report['sequential_scripts_seconds'] / report['wall_seconds']:.1f}x)"]
+    return "\n".join(lines)
+
+
+def write_report(report, models_dir=MODELS_DIR):
+    models_dir = Path(models_dir)
+    models_dir.mkdir(parents=True, exist_ok=True)
+    (models_dir / f"{REPORT_NAME}.json").write_text(json.dumps(report, indent=2))
+    (models_dir / f"{REPORT_NAME}.md").write_text(format_report(report) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", nargs="+", choices=list(PARAMS), help="default: all")
+    parser.add_argument("--sequential", action="store_true", help="train one model after another")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--train-days", type=float, default=TRAIN_DAYS)
+    parser.add_argument("--rebuild-cache", action="store_true", help="ignore the cached feature matrix")
+    parser.add_argument("--default-params", action="store_true", help="ignore tune.py results")
+    parser.add_argument("--no-publish", action="store_true", help="evaluate only, leave the registry alone")
+    parser.add_argument("--store-dir", type=Path, default=STORE_DIR)
+    parser.add_argument("--csv", type=Path, default=CSV_EXPORT_FILE)
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    args = parser.parse_args()
+
+    report = train_all(args.models, args.sequential, args.workers, args.train_days, args.rebuild_cache,
+                       args.store_dir, args.csv, args.cache_dir, args.models_dir, not args.no_publish,
+                       not args.default_params)
+    write_report(report, args.models_dir)
+    print(format_report(report))
+    print(f"Report saved at {args.models_dir / REPORT_NAME}.md")
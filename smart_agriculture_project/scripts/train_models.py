@@ -1,22 +1,25 @@
 from pathlib import Path
-import pandas as pd
 import xgboost as xgb
-import joblib
 from sklearn.model_selection import StratifiedShuffleSplit, train_test_split
 from sklearn.metrics import accuracy_score
 
+from model_registry import publish
+from processed_store import load_processed
+
 # --- Paths ---
 BASE_DIR = Path(__file__).resolve().parent.parent
-processed_file = BASE_DIR / "data" / "processed" / "processed_data.csv"
 models_folder = BASE_DIR / "data" / "models"
 models_folder.mkdir(exist_ok=True)
 
-# --- Load CSV ---
-data = pd.read_csv(processed_file)
+FEATURES = ['TEMP_C','HUMIDITY','SOIL_PCT','LDR']
+TRAIN_DAYS = None  # e.g. 30 to train on the last 30 days only; None = all history
+
+# --- Load processed data (only the columns / days we train on) ---
+data = load_processed(columns=FEATURES + ['irrigation_needed'], last_days=TRAIN_DAYS)
 print("Processed data loaded successfully. Shape:", data.shape)
 
 # --- Features and target ---
-X = data[['TEMP_C','HUMIDITY','SOIL_PCT','LDR']]
+X = data[FEATURES]
 y_water = data['irrigation_needed'].astype(int)
 
 # --- Check class distribution ---
@@ -58,13 +61,15 @@ model_water.fit(X_train, y_train)
 
 # --- Predictions ---
 y_pred = model_water.predict(X_test)
+metrics = {}
 if y_test.nunique() < 2:
     print("Test set has only one class. Accuracy cannot be computed reliably.")
 else:
     acc = accuracy_score(y_test, y_pred)
+    metrics["accuracy"] = float(acc)
     print(f"Water Prediction Accuracy: {acc:.4f}")
 
-# --- Save model ---
-model_path = models_folder / "xgb_water.pkl"
-joblib.dump(model_water, model_path)
-print(f"Model saved at {model_path}")
+# --- Save model (new registry version; running consumers pick it up) ---
+version = publish("xgb_water", model_water, FEATURES, training_rows=len(X_train), metrics=metrics,
+                  extra={"train_days": TRAIN_DAYS})
+print(f"Model saved as xgb_water v{version} in {models_folder}")
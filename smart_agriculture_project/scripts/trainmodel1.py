@@ -1,22 +1,21 @@
-import serial
-import time
+from actuator import BlockingActuator
 
 PORT = "COM13"  # Change to your ESP32 COM port
 BAUD = 115200
 
+_esp = None
+
 def send_command(cmd):
+    """Send a command over one long-lived connection (opened, and the ESP32 reset, only once)."""
+    global _esp
     try:
-        with serial.Serial(PORT, BAUD, timeout=1) as ser:
-            time.sleep(2)  # wait for ESP32 reset
-            ser.write((cmd + "\n").encode())
-            time.sleep(0.5)
-            print(f"Sent command: {cmd}")
-
-            # read response for 2 seconds
-            end = time.time() + 2
-            while time.time() < end:
-                if ser.in_waiting > 0:
-                    print(ser.readline().decode().strip())
+        if _esp is None:
+            _esp = BlockingActuator(PORT, baud=BAUD, boot_delay=2)
+        result = _esp.send(cmd)
+        print(f"Sent command: {cmd} ({result.status})")
+        if result.reply:
+            print(result.reply)
+        return result
     except Exception as e:
         print("Error:", e)
 
@@ -24,3 +23,5 @@ if __name__ == "__main__":
     print("Turning motor ON continuously...")
     send_command("ON")
     print("Motor should now be ON.")
+    if _esp is not None:
+        _esp.close()
@@ -0,0 +1,164 @@
+# smart_agriculture_project/scripts/tree_model.py
+"""
+Array-backed evaluator for the exported tree models (NumPy only).
+
+``export_trees.py`` flattens a trained XGBoost booster or scikit-learn random
+forest into a single ``.npz`` file. All trees share one set of node arrays;
+``roots`` holds the index of each tree's root. Leaves point to themselves, so
+walking every tree ``max_depth`` steps always ends on a leaf without branching.
+
+Loading needs neither pandas, xgboost, sklearn nor joblib, which keeps the
+control loop's cold start small. ``predict_one`` takes a plain tuple of floats
+in ``feature_names`` order; ``predict`` takes a 2-D array for batches.
+
+Kinds:
+    xgb_logistic -- binary:logistic booster; leaf values summed in float32 from
+                    the base margin, in tree order, then passed through a sigmoid
+    rf_classifier -- random forest; per-tree class probabilities averaged
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+XGB_LOGISTIC = "xgb_logistic"
+RF_CLASSIFIER = "rf_classifier"
+ROW_CHUNK = 1024  # rows per vectorised step in the batch path
+
+
+class TreeEnsemble:
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.feature_names = list(meta["feature_names"])
+        self.classes = np.asarray(meta.get("classes", [0, 1]))
+        self.max_depth = int(meta["max_depth"])
+        self.base_margin = np.float32(meta.get("base_margin", 0.0))
+
+        self.roots = arrays["roots"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.default_left = arrays["default_left"]
+        self.value = arrays["value"]
+        self._n_trees = len(self.roots)
+        # (left, right) pairs interleaved: child = _children[2 * node + go_right].
+        # A precomputed "children" array (model registry, memory-mapped) is used as is.
+        children = arrays.get("children")
+        if children is None:
+            children = np.stack([self.left, self.right], axis=1).ravel()
+        self._children = children.astype(np.intp, copy=False)
+        self.roots = self.roots.astype(np.intp, copy=False)
+        self.feature = self.feature.astype(np.intp, copy=False)
+        # inputs are rounded to float32 like both libraries do; sklearn then
+        # compares against float64 thresholds, XGBoost against float32 ones
+        self._cmp_dtype = np.float32 if self.kind == XGB_LOGISTIC else np.float64
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    # ---------------- tree walking ----------------
+    def _go_right(self, x, thr):
+        # XGBoost: x < thr goes left; sklearn: x <= thr goes left (NaN handled separately)
+        if self.kind == XGB_LOGISTIC:
+            return x >= thr
+        return x > thr
+
+    def _step_missing(self, node, v):
+        """One step for inputs that contain NaN: NaN takes the node's default branch."""
+        right = self._go_right(v, self.threshold[node])
+        right = np.where(np.isnan(v), ~self.default_left[node], right)
+        return self._children[2 * node + right]
+
+    def _leaves_one(self, x):
+        """Leaf index per tree for one row (x: 1-D float32)."""
+        xc = x.astype(self._cmp_dtype)
+        node = self.roots
+        missing = np.isnan(xc).any()
+        for _ in range(self.max_depth):
+            v = xc[self.feature[node]]
+            if missing:
+                node = self._step_missing(node, v)
+            else:
+                node = self._children[2 * node + self._go_right(v, self.threshold[node])]
+        return node
+
+    def _leaves_batch(self, X):
+        """Leaf index per (row, tree) for a 2-D float32 batch."""
+        Xc = np.ascontiguousarray(X, dtype=self._cmp_dtype)
+        flat = Xc.ravel()
+        row_off = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self._n_trees))
+        missing = np.isnan(flat).any()
+        for _ in range(self.max_depth):
+            v = flat[row_off + self.feature[node]]
+            if missing:
+                node = self._step_missing(node, v)
+            else:
+                node = self._children[2 * node + self._go_right(v, self.threshold[node])]
+        return node
+
+    # ---------------- outputs ----------------
+    def _proba_from_leaves(self, leaves):
+        """Class probabilities, shape (n, n_classes); leaves shape (n, n_trees)."""
+        if self.kind == XGB_LOGISTIC:
+            vals = self.value[leaves]                                   # (n, T) float32
+            start = np.full((vals.shape[0], 1), self.base_margin, dtype=np.float32)
+            # cumsum accumulates sequentially, matching XGBoost's tree-by-tree sum
+            margin = np.cumsum(np.hstack([start, vals]), axis=1, dtype=np.float32)[:, -1]
+            # expf is correctly rounded; NumPy's float32 exp can be 1 ulp off, so go via float64
+            e = np.exp(-margin.astype(np.float64)).astype(np.float32)
+            p = np.float32(1.0) / (np.float32(1.0) + e)
+            return np.stack([np.float32(1.0) - p, p], axis=1)
+        # random forest: running float64 sum of per-tree probabilities, then / n_trees
+        vals = self.value[leaves]                                       # (n, T, C)
+        total = np.zeros((vals.shape[0], vals.shape[2]))
+        for t in range(self._n_trees):
+            total += vals[:, t, :]
+        return total / self._n_trees
+
+    def _labels(self, proba):
+        if self.kind == XGB_LOGISTIC:
+            return (proba[:, 1] > 0.5).astype(np.int64)
+        return self.classes.take(np.argmax(proba, axis=1))
+
+    def predict_proba_one(self, row):
+        x = np.asarray(row, dtype=np.float32)
+        return self._proba_from_leaves(self._leaves_one(x)[None, :])[0]
+
+    def predict_one(self, row):
+        """Label for one reading given as a tuple of floats in ``feature_names`` order."""
+        x = np.asarray(row, dtype=np.float32)
+        return self._labels(self._proba_from_leaves(self._leaves_one(x)[None, :]))[0].item()
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= ROW_CHUNK:
+            return self._proba_from_leaves(self._leaves_batch(X))
+        # walk in row chunks so the (rows x trees) temporaries stay cache sized
+        return np.concatenate([self._proba_from_leaves(self._leaves_batch(X[i:i + ROW_CHUNK]))
+                               for i in range(0, len(X), ROW_CHUNK)])
+
+    def predict(self, X):
+        """Labels for a 2-D batch (rows x features)."""
+        return self._labels(self.predict_proba(X))
+
+
+def save_compiled(path, arrays, meta):
+    """Write node arrays + JSON metadata to one ``.npz`` file."""
+    path = Path(path)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+    tmp.replace(path)
+
+
+def load_compiled(path):
+    """Load an ensemble written by ``save_compiled``."""
+    with np.load(path) as data:
+        arrays = {k: data[k] for k in data.files if k != "meta"}
+        meta = json.loads(data["meta"].tobytes().decode())
+    return TreeEnsemble(arrays, meta)
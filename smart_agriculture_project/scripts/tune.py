@@ -0,0 +1,293 @@
+# smart_agriculture_project/scripts/tune.py
+"""
+Budgeted hyperparameter search for the train_all.py models (asynchronous successive halving).
+
+Every trial is one configuration trained at one resource level ("rung") and
+scored by log loss on a validation split carved out of the training rows.
+The test rows stay untouched for train_all.py. Resources grow by ``ETA`` per
+rung:
+
+    xgb_water / rf_water   number of trees   (MAX_TREES / ETA**k)
+    svm_water              training rows     (all rows / ETA**k)
+
+Free workers never wait for a rung to fill up (ASHA). A worker takes the best
+not-yet-promoted configuration in the top 1/ETA of some rung to the next rung,
+and samples a new configuration at the bottom rung when nothing is
+promotable. Weak configurations therefore never get past the cheap rungs.
+Trials run in parallel processes, one CPU each. New trials stop once
+``--budget`` seconds have passed; the ones running then finish.
+
+Every finished trial is appended to ``data/cache/tuning/<model>.jsonl``. A new
+run replays the entries for the same feature cache key and search space, then
+carries on where the previous run stopped. The best configuration so far is
+written to ``data/models/tuned_params.json``. train_all.py uses those
+parameters unless it is run with ``--default-params``.
+
+    python tune.py xgb_water --budget 3600
+    python tune.py svm_water rf_water --budget 28800 --workers 8 --publish
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from feature_cache import CACHE_DIR, FEATURES, TARGET, load_features, open_cached, split_indices
+from model_registry import MODELS_DIR
+from train_all import PARAMS, TUNED_PARAMS_FILE, evaluate, make_estimator
+
+# --- Config ---
+BASE_DIR = Path(__file__).resolve().parent.parent
+TRIALS_DIR = BASE_DIR / "data" / "cache" / "tuning"
+ETA = 3              # keep the top 1/ETA of each rung, multiply the resource by ETA
+RUNGS = 4            # resource levels: max / ETA**3 .. max
+MAX_TREES = 400      # trees at the top rung (xgb_water, rf_water)
+MIN_ROWS = 200       # never fit the SVM on fewer rows than this
+VALID_SIZE = 0.2     # share of the training rows held out for scoring trials
+BUDGET = 3600.0      # seconds
+SEED = 42
+
+# ("int", lo, hi) / ("float", lo, hi) / ("log", lo, hi) / ("choice", [values])
+SPACES = {
+    "xgb_water": {
+        "max_depth": ("int", 2, 10),
+        "learning_rate": ("log", 0.01, 0.3),
+        "subsample": ("float", 0.5, 1.0),
+        "colsample_bytree": ("float", 0.5, 1.0),
+        "min_child_weight": ("log", 0.5, 20.0),
+        "reg_lambda": ("log", 0.1, 10.0),
+    },
+    "svm_water": {
+        "C": ("log", 0.01, 1000.0),
+        "gamma": ("log", 1e-4, 10.0),
+    },
+    "rf_water": {
+        "max_depth": ("choice", [4, 6, 8, 12, 16, None]),
+        "min_samples_leaf": ("int", 1, 20),
+        "max_features": ("choice", ["sqrt", 0.5, 1.0]),
+    },
+}
+RESOURCE = {"xgb_water": "n_estimators", "rf_water": "n_estimators", "svm_water": "rows"}
+
+
+def space_id(name):
+    """Short hash of a model's search space; trial logs from another space are not replayed."""
+    spec = json.dumps([SPACES[name], RESOURCE[name], ETA, RUNGS, MAX_TREES, VALID_SIZE], sort_keys=True)
+    return hashlib.sha256(spec.encode()).hexdigest()[:12]
+
+
+def sample(space, trial, seed=SEED):
+    """Configuration for trial number ``trial`` (deterministic, so resumed runs continue the sequence)."""
+    rng = np.random.default_rng([seed, trial])
+    params = {}
+    for key, (kind, *args) in space.items():
+        if kind == "int":
+            params[key] = int(rng.integers(args[0], args[1] + 1))
+        elif kind == "float":
+            params[key] = float(rng.uniform(args[0], args[1]))
+        elif kind == "log":
+            params[key] = float(math.exp(rng.uniform(math.log(args[0]), math.log(args[1]))))
+        else:
+            params[key] = args[0][int(rng.integers(len(args[0])))]
+    return params
+
+
+def resource_at(name, rung, train_rows):
+    share = ETA ** (rung - (RUNGS - 1))
+    if RESOURCE[name] == "n_estimators":
+        return max(1, round(MAX_TREES * share))
+    return min(train_rows, max(MIN_ROWS, round(train_rows * share)))
+
+
+@lru_cache(maxsize=4)
+def _validation_split(cache_path):
+    """(fs, fit rows, validation rows) inside the training rows of a cache entry."""
+    fs = open_cached(cache_path)
+    train_idx = np.asarray(fs.train_idx)
+    fit, valid = split_indices(np.asarray(fs.y[train_idx]), VALID_SIZE, SEED)
+    # a fixed shuffle, so the row resource takes a random (not time-ordered) prefix
+    fit = np.random.default_rng(SEED).permutation(train_idx[fit])
+    return fs, fit, train_idx[valid]
+
+
+def run_trial(name, trial, rung, params, cache_path):
+    """Train one configuration at one rung and score it. Runs in a worker process."""
+    fs, fit, valid = _validation_split(cache_path)
+    resource = resource_at(name, rung, len(fit))
+    model_params = dict(params)
+    if RESOURCE[name] == "rows":
+        fit = np.sort(fit[:resource])
+    else:
+        model_params[RESOURCE[name]] = resource
+    t0 = time.perf_counter()
+    model = make_estimator(name, model_params, threads=1, rows=len(fit))
+    model.fit(fs.frame(fit), np.asarray(fs.y[fit]))
+    metrics = evaluate(model, fs.frame(valid), np.asarray(fs.y[valid]))
+    return {"trial": trial, "rung": rung, "resource": resource, "params": params,
+            "loss": metrics.get("log_loss", 1.0 - metrics["accuracy"]), "metrics": metrics,
+            "seconds": time.perf_counter() - t0}
+
+
+class Asha:
+    """Promotion bookkeeping for asynchronous successive halving."""
+
+    def __init__(self, rungs=RUNGS, eta=ETA):
+        self.eta = eta
+        self.results = [dict() for _ in range(rungs)]   # rung -> {trial: result}
+        self.promoted = [set() for _ in range(rungs)]   # trials already sent up from a rung
+        self.next_trial = 0
+
+    def record(self, result):
+        trial, rung = result["trial"], result["rung"]
+        self.results[rung][trial] = result
+        if rung > 0:
+            self.promoted[rung - 1].add(trial)
+        self.next_trial = max(self.next_trial, trial + 1)
+
+    def next_job(self, running, allow_new=True):
+        """
+        (trial, rung, params) to run next. Promotes when possible, else starts a
+        new trial at rung 0 (params None); None when neither is possible.
+        """
+        for rung in range(len(self.results) - 2, -1, -1):
+            done = sorted(self.results[rung].values(), key=lambda r: r["loss"])
+            for r in done[:len(done) // self.eta]:
+                if r["trial"] not in self.promoted[rung] and (r["trial"], rung + 1) not in running:
+                    self.promoted[rung].add(r["trial"])
+                    return r["trial"], rung + 1, r["params"]
+        if not allow_new:
+            return None
+        trial = self.next_trial
+        self.next_trial += 1
+        return trial, 0, None
+
+    def best(self):
+        """Lowest-loss result on the highest rung reached so far."""
+        for rung in range(len(self.results) - 1, -1, -1):
+            if self.results[rung]:
+                return min(self.results[rung].values(), key=lambda r: r["loss"])
+        return None
+
+    def counts(self):
+        return [len(r) for r in self.results]
+
+
+def load_trials(path, feature_key, space):
+    """Finished trials from a previous run on the same data and search space."""
+    if not path.exists():
+        return []
+    trials = []
+    for line in path.read_text().splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # torn last line from a killed run
+        if entry.get("feature_key") == feature_key and entry.get("space") == space:
+            trials.append(entry)
+    return trials
+
+
+def tune(name, budget=BUDGET, workers=None, max_trials=None, last_days=None, cache_dir=CACHE_DIR,
+         trials_dir=TRIALS_DIR, fs=None):
+    """Search ``name``'s space for ``budget`` seconds; returns the best result (resumes from the trial log)."""
+    fs = fs or load_features(FEATURES, TARGET, last_days=last_days, cache_dir=cache_dir)
+    space = space_id(name)
+    trials_dir = Path(trials_dir)
+    trials_dir.mkdir(parents=True, exist_ok=True)
+    log_path = trials_dir / f"{name}.jsonl"
+
+    asha = Asha()
+    previous = load_trials(log_path, fs.key, space)
+    for entry in previous:
+        asha.record(entry)
+    if previous:
+        print(f"[{name}] resumed {len(previous)} finished trials, rungs {asha.counts()}")
+
+    workers = workers or os.cpu_count() or 1
+    deadline = time.monotonic() + budget
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(log_path, "a") as log:
+        while True:
+            while len(running) < workers and time.monotonic() < deadline:
+                job = asha.next_job(set(running.values()), max_trials is None or asha.next_trial < max_trials)
+                if job is None:
+                    break
+                trial, rung, params = job
+                if params is None:
+                    params = sample(SPACES[name], trial)
+                future = pool.submit(run_trial, name, trial, rung, params, str(fs.path))
+                running[future] = (trial, rung)
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                trial, rung = running.pop(future)
+                result = future.result()
+                result.update(feature_key=fs.key, space=space, finished=time.strftime("%Y-%m-%dT%H:%M:%S"))
+                log.write(json.dumps(result) + "\n")
+                log.flush()
+                asha.record(result)
+                print(f"[{name}] trial {trial:4d} rung {rung} ({result['resource']:>6}) "
+                      f"loss {result['loss']:.4f} in {result['seconds']:.2f} s")
+
+    best = asha.best()
+    if best is not None:
+        print(f"[{name}] rungs {asha.counts()}, best trial {best['trial']} at rung {best['rung']}: "
+              f"loss {best['loss']:.4f} {best['params']}")
+    return best
+
+
+def best_params(name, best):
+    """Model parameters for train_all.py from the best result."""
+    params = dict(best["params"])
+    if RESOURCE[name] == "n_estimators":
+        params["n_estimators"] = best["resource"]
+    return params
+
+
+def save_tuned(name, best, feature_key, path=TUNED_PARAMS_FILE):
+    path = Path(path)
+    tuned = json.loads(path.read_text()) if path.exists() else {}
+    tuned[name] = {"params": best_params(name, best), "loss": best["loss"], "metrics": best["metrics"],
+                   "rung": best["rung"], "trial": best["trial"], "feature_key": feature_key,
+                   "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(tuned, indent=2))
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("models", nargs="*", help=f"any of {', '.join(PARAMS)} (default: all)")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="seconds for all models together")
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--max-trials", type=int, default=None, help="new configurations per model")
+    parser.add_argument("--train-days", type=float, default=None)
+    parser.add_argument("--publish", action="store_true", help="retrain the winners with train_all.py")
+    args = parser.parse_args()
+
+    models = args.models or list(PARAMS)
+    unknown = [m for m in models if m not in SPACES]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+    fs = load_features(FEATURES, TARGET, last_days=args.train_days)
+    start = time.monotonic()
+    for i, name in enumerate(models):
+        # the budget left is shared evenly among the models still to tune
+        share = (args.budget - (time.monotonic() - start)) / (len(models) - i)
+        best = tune(name, share, args.workers, args.max_trials, fs=fs)
+        if best is not None:
+            save_tuned(name, best, fs.key)
+    print(f"Tuned parameters saved at {TUNED_PARAMS_FILE}")
+
+    if args.publish:
+        from train_all import format_report, train_all, write_report
+        report = train_all(models, last_days=args.train_days)
+        write_report(report, MODELS_DIR)
+        print(format_report(report))
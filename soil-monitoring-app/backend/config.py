@@ -0,0 +1,69 @@
+import os
+import sys
+from pathlib import Path
+
+# Location of the smart_agriculture_project folder (data + shared scripts).
+# Defaults to the copy next to this app; override with SMART_AGRI_PROJECT_DIR.
+BACKEND_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = Path(os.environ.get(
+    "SMART_AGRI_PROJECT_DIR",
+    BACKEND_DIR.parent.parent / "smart_agriculture_project",
+))
+SCRIPTS_DIR = PROJECT_DIR / "scripts"
+
+RAW_JSON_FILE = PROJECT_DIR / "data" / "raw" / "data.json"
+RAW_LOG_DIR = PROJECT_DIR / "data" / "raw" / "segments"
+MODELS_DIR = PROJECT_DIR / "data" / "models"
+ROLLUP_DIR = PROJECT_DIR / "data" / "processed" / "rollups"   # written by preprocess_data.py
+DB_FILE = Path(os.environ.get("SENSOR_DB", PROJECT_DIR / "data" / "sensors.db"))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+
+# /predict micro-batching: requests arriving within PREDICT_MAX_WAIT_MS of each
+# other are evaluated together, up to PREDICT_MAX_BATCH rows per model call
+WATER_MODEL = os.environ.get("WATER_MODEL", "xgb_water")
+PREDICT_MAX_BATCH = int(os.environ.get("PREDICT_MAX_BATCH", "64"))
+PREDICT_MAX_WAIT_MS = float(os.environ.get("PREDICT_MAX_WAIT_MS", "2"))
+PREDICT_WORKERS = int(os.environ.get("PREDICT_WORKERS", "1"))
+
+# Sensor snapshot served by every /sensor route: rebuilt at most every SNAPSHOT_TTL
+# seconds from the newest logged reading. With SENSOR_REPLAY=1 (demo mode) the
+# stored records are replayed, but only while no segments exist or after no new
+# reading has arrived for SENSOR_REPLAY_IDLE seconds.
+SNAPSHOT_TTL = float(os.environ.get("SNAPSHOT_TTL", "1"))
+SENSOR_REPLAY = os.environ.get("SENSOR_REPLAY", "0") == "1"
+SENSOR_REPLAY_IDLE = float(os.environ.get("SENSOR_REPLAY_IDLE", "300"))
+
+# /sensor/stream push: one producer reads each new reading once and fans it out.
+# A client whose queue holds STREAM_CLIENT_QUEUE unsent frames loses the oldest.
+STREAM_INTERVAL = float(os.environ.get("STREAM_INTERVAL", "1"))
+STREAM_CLIENT_QUEUE = int(os.environ.get("STREAM_CLIENT_QUEUE", "8"))
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT", "15"))
+
+# /sensor/history: per-device in-memory ring (24 bytes per sample; 2M samples is
+# about 46 days at one reading every 2 s), fed by tailing the segment log
+# HISTORY_BATCH records at a time
+HISTORY_CAPACITY = int(os.environ.get("HISTORY_CAPACITY", "2000000"))
+HISTORY_POLL = float(os.environ.get("HISTORY_POLL", "1"))
+HISTORY_BATCH = int(os.environ.get("HISTORY_BATCH", "50000"))
+HISTORY_MAX_POINTS = int(os.environ.get("HISTORY_MAX_POINTS", "5000"))
+
+# Pump actuators: one persistent serial connection per device, as
+# "device=port,device2=port2" (a bare port is the default device). Unset: manual
+# switching only records the state, as before. Don't give the backend a port that
+# the collector or Run.py already holds.
+ACTUATOR_PORTS = dict(
+    item.split("=", 1) if "=" in item else ("default", item)
+    for item in os.environ.get("ACTUATOR_PORTS", "").split(",") if item.strip()
+)
+ACTUATOR_BAUD = int(os.environ.get("ACTUATOR_BAUD", "115200"))
+ACTUATOR_ACK_TIMEOUT = float(os.environ.get("ACTUATOR_ACK_TIMEOUT", "1"))
+ACTUATOR_RETRIES = int(os.environ.get("ACTUATOR_RETRIES", "2"))
+
+# /metrics: the backend's own metrics plus the ones data.py, preprocess_data.py and
+# Run.py publish to METRICS_DIR (files older than METRICS_STALE seconds are skipped)
+METRICS_DIR = Path(os.environ.get("METRICS_DIR", PROJECT_DIR / "data" / "metrics"))
+METRICS_STALE = float(os.environ.get("METRICS_STALE", "300"))
+
+# make the shared pipeline modules (sensor_log, ...) importable
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.append(str(SCRIPTS_DIR))
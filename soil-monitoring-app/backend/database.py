@@ -1,5 +1,81 @@
-# Placeholder for future database integration (SQLite, Firebase, MySQL)
-# For now, not used.
+# SQLite access for the backend: a small pool of WAL connections to the shared
+# sensors.db (schema and queries live in scripts/sensor_db.py).
+import queue
+import threading
+from contextlib import contextmanager
+
+from config import DB_FILE, DB_POOL_SIZE
+from sensor_db import connect
+
+
+class ConnectionPool:
+    """
+    Fixed number of connections handed out one request at a time. WAL lets the
+    readers run in parallel with the collector's writes; SQLite's busy timeout
+    serialises the rare backend writes (actuator events, predictions).
+    """
+
+    def __init__(self, path=DB_FILE, size=DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new(self):
+        # connections move between FastAPI worker threads, one user at a time
+        return connect(self.path, check_same_thread=False)
+
+    @contextmanager
+    def connection(self, timeout=10.0):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            try:
+                conn = self._new() if grow else self._idle.get(timeout=timeout)
+            except Exception:
+                if grow:
+                    with self._lock:
+                        self._created -= 1
+                raise
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool()
+    return _pool
+
 
 def connect_db():
-    return "DB connection established (dummy)"
+    """Context manager yielding a pooled connection: ``with connect_db() as conn: ...``"""
+    return get_pool().connection()
+
+
+def close_db():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
@@ -1,8 +1,33 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from database import close_db
 from routes.sensor_routes import router
+from routes.predict_routes import router as predict_router
+from routes.metrics_routes import router as metrics_router
+from services.actuator_service import start_actuators, stop_actuators
+from services.history_service import start_history, stop_history
+from services.inference_service import start_batcher, stop_batcher
+from services.metrics_service import MetricsMiddleware
+from services.stream_service import start_stream, stop_stream
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await start_batcher()
+    await start_stream()
+    await start_history()
+    await start_actuators()
+    yield
+    await stop_actuators()
+    await stop_history()
+    await stop_stream()
+    await stop_batcher()
+    close_db()
 
-app = FastAPI(title="Soil Monitoring API")
+
+app = FastAPI(title="Soil Monitoring API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -14,6 +39,11 @@ app.add_middleware(
 )
 
 app.include_router(router)
+app.include_router(predict_router)
+app.include_router(metrics_router)
+
+# per-route latency histograms and request counters, served at /metrics
+app.add_middleware(MetricsMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
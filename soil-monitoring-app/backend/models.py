@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class SensorValue(BaseModel):
@@ -18,3 +20,20 @@ class Temperature(BaseModel):
 class LDR(BaseModel):
     ldr: int
 
+class SensorReading(BaseModel):
+    temperature: float
+    humidity: float
+    moisture: float
+    ldr: float
+    device_id: Optional[str] = None
+
+class BatchPredictRequest(BaseModel):
+    readings: List[SensorReading]
+
+class Prediction(BaseModel):
+    irrigation_needed: bool
+    probability: float
+    device_id: Optional[str] = None
+
+class BatchPrediction(BaseModel):
+    predictions: List[Prediction]
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from services.metrics_service import render_all
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: backend routes and services, plus collector / preprocessing / control."""
+    text = await run_in_threadpool(render_all)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException
+from models import BatchPrediction, BatchPredictRequest, Prediction, SensorReading
+from services.inference_service import ModelUnavailable, batcher_stats, predict_readings
+
+router = APIRouter(tags=["Irrigation Prediction"])
+
+
+def _features(reading: SensorReading):
+    return (reading.temperature, reading.humidity, reading.moisture, reading.ldr)
+
+
+async def _predict(rows):
+    try:
+        return await predict_readings(rows)
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/predict", response_model=Prediction)
+async def predict(reading: SensorReading):
+    [(needed, proba)] = await _predict([_features(reading)])
+    return Prediction(irrigation_needed=needed, probability=proba, device_id=reading.device_id)
+
+
+@router.post("/predict/batch", response_model=BatchPrediction)
+async def predict_batch(request: BatchPredictRequest):
+    results = await _predict([_features(r) for r in request.readings])
+    return BatchPrediction(predictions=[
+        Prediction(irrigation_needed=needed, probability=proba, device_id=r.device_id)
+        for r, (needed, proba) in zip(request.readings, results)
+    ])
+
+
+@router.get("/predict/stats")
+def predict_stats():
+    return batcher_stats()
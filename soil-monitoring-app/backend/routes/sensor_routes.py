@@ -1,4 +1,12 @@
-from fastapi import APIRouter
+from datetime import timedelta
+from typing import Optional
+
+import pandas as pd
+from config import HISTORY_MAX_POINTS
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from database import connect_db
+from sensor_db import READING_COLUMNS, query_readings, to_ms
 from services.sensor_service import (
     get_dummy_moisture,
     get_dummy_humidity,
@@ -6,13 +14,45 @@ from services.sensor_service import (
     get_dummy_water_status,
     get_dummy_temperature,
     get_mode,
+    get_snapshot,
     set_mode,
     manual_switch
 )
+from rollups import RESOLUTIONS, pick_resolution
+from services.history_service import (
+    DEFAULT_DEVICE,
+    DOWNSAMPLERS,
+    FIELDS,
+    query_rollup,
+    store as history,
+)
+from services.actuator_service import actuator_stats
+from services.stream_service import broadcaster
 
 router = APIRouter(tags=["Soil Monitoring API"])
 
+def _opaque_tag(tag):
+    """ETag without its weak ``W/`` prefix (If-None-Match uses the weak comparison)."""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def _etag_matches(etag, if_none_match):
+    """If-None-Match check: ``*`` or exactly one of the listed tags."""
+    if not if_none_match:
+        return False
+    tags = [_opaque_tag(tag) for tag in if_none_match.split(",")]
+    return "*" in tags or _opaque_tag(etag) in tags
+
 # Sensor endpoints
+@router.get("/sensor/snapshot")
+def snapshot(request: Request):
+    """One consistent reading with mode and pump state; 304 if the client's copy is current."""
+    data, etag = get_snapshot()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(data, headers=headers)
+
 @router.get("/sensor/moisture")
 def moisture():
     return {"value": get_dummy_moisture()}
@@ -33,6 +73,91 @@ def ldr():
 def water_status():
     return {"status": get_dummy_water_status()}
 
+def _ms(value: Optional[str]):
+    """ISO datetime or epoch seconds -> epoch milliseconds (naive times are local, see sensor_db.to_ms)."""
+    if value is None:
+        return None
+    try:
+        return int(float(value) * 1000)
+    except ValueError:
+        pass
+    ms = to_ms(value)
+    if ms is None:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+    return ms
+
+@router.get("/sensor/history")
+def sensor_history(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    points: int = Query(500, ge=3),
+    device: str = DEFAULT_DEVICE,
+    method: str = "lttb",
+    fields: Optional[str] = None,
+    resolution: str = "auto",
+):
+    """
+    Downsampled history between ``from`` and ``to`` (ISO datetime or epoch seconds;
+    default: the last 24 hours of data). ``method`` is lttb or minmax.
+
+    ``resolution=auto`` answers from the coarsest rollup (1d, 1h, 1min) that still
+    has ``points`` buckets in the range, and from the raw in-memory samples when
+    the range is too short for that; ``raw`` / ``1min`` / ``1h`` / ``1d`` force one.
+    """
+    if method not in DOWNSAMPLERS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {sorted(DOWNSAMPLERS)}")
+    if resolution not in ("auto", "raw", *RESOLUTIONS):
+        raise HTTPException(status_code=400, detail=f"resolution must be auto, raw or one of {list(RESOLUTIONS)}")
+    names = fields.split(",") if fields else list(FIELDS)
+    unknown = [n for n in names if n not in FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}")
+    points = min(points, HISTORY_MAX_POINTS)
+    start_ms, end_ms = _ms(start), _ms(end)
+    ring = history.rings.get(device)
+    if end_ms is None and ring is not None:
+        end_ms = ring.last_ts()
+    if start_ms is None and end_ms is not None:
+        start_ms = end_ms - int(timedelta(days=1).total_seconds() * 1000)
+
+    if resolution == "auto" and start_ms is not None and end_ms is not None:
+        span = pd.Timestamp(start_ms, unit="ms"), pd.Timestamp(end_ms, unit="ms")
+        resolution = pick_resolution(*span, points) or "raw"
+    if resolution in RESOLUTIONS:
+        result = query_rollup(resolution, device, start_ms, end_ms, points, method, names)
+        if result is not None:
+            return result
+    return history.query(device, start_ms, end_ms, points, method, names)
+
+@router.get("/sensor/readings")
+def sensor_readings(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    device: str = DEFAULT_DEVICE,
+    limit: int = Query(1000, ge=1, le=100_000),
+):
+    """Raw stored readings from the SQLite database (timestamps in ms, oldest first)."""
+    with connect_db() as conn:
+        rows = query_readings(conn, device, _ms(start), _ms(end), limit)
+    return {"device": device, "columns": list(READING_COLUMNS[1:]), "rows": rows}
+
+@router.get("/sensor/history/stats")
+def sensor_history_stats():
+    return history.stats()
+
+# Live push: one Server-Sent Events stream replaces polling the endpoints above
+@router.get("/sensor/stream")
+async def stream():
+    return StreamingResponse(
+        broadcaster.frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/sensor/stream/stats")
+def stream_stats():
+    return broadcaster.stats()
+
 # Switch endpoints
 @router.get("/switch/mode")
 def current_mode():
@@ -43,5 +168,17 @@ def update_mode(mode: str):
     return set_mode(mode)
 
 @router.post("/switch/manual/{state}")
-def update_manual(state: str):
-    return manual_switch(state)
+async def update_manual(state: str):
+    return await manual_switch(state)
+
+@router.get("/switch/actuators")
+def actuators():
+    return {"actuators": actuator_stats()}
+
+@router.get("/switch/events")
+def switch_events(device: str = DEFAULT_DEVICE, limit: int = Query(100, ge=1, le=10_000)):
+    """Most recent actuator events, newest first."""
+    with connect_db() as conn:
+        rows = conn.execute("SELECT ts, command, source, status FROM actuator_events "
+                            "WHERE device_id = ? ORDER BY ts DESC LIMIT ?", (device, limit)).fetchall()
+    return {"device": device, "events": [dict(zip(("ts", "command", "source", "status"), r)) for r in rows]}
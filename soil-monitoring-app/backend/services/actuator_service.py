@@ -0,0 +1,40 @@
+from config import ACTUATOR_ACK_TIMEOUT, ACTUATOR_BAUD, ACTUATOR_PORTS, ACTUATOR_RETRIES
+from actuator import ActuatorClient  # scripts/ is on sys.path via config
+from dedup_index import DEFAULT_DEVICE
+
+_clients = {}
+
+
+async def start_actuators(ports=None):
+    """Open one long-lived connection per configured device."""
+    for device, port in (ports if ports is not None else ACTUATOR_PORTS).items():
+        if device not in _clients:
+            client = ActuatorClient(port.strip(), device.strip(), baud=ACTUATOR_BAUD,
+                                    ack_timeout=ACTUATOR_ACK_TIMEOUT, retries=ACTUATOR_RETRIES, boot_delay=2)
+            await client.start()
+            _clients[device.strip()] = client
+
+
+async def stop_actuators():
+    for client in _clients.values():
+        await client.stop()
+    _clients.clear()
+
+
+def has_actuator(device=DEFAULT_DEVICE):
+    return device in _clients
+
+
+async def send_command(command, device=DEFAULT_DEVICE):
+    """
+    Queue ``command`` on the device's connection and wait for the board's answer.
+    Returns the ``CommandResult``, or None when no actuator is configured for ``device``.
+    """
+    client = _clients.get(device)
+    if client is None:
+        return None
+    return await client.send(command)
+
+
+def actuator_stats():
+    return [client.stats() for client in _clients.values()]
@@ -0,0 +1,330 @@
+import asyncio
+import threading
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import pandas as pd
+
+from config import HISTORY_BATCH, HISTORY_CAPACITY, HISTORY_POLL, RAW_JSON_FILE, RAW_LOG_DIR, ROLLUP_DIR
+from rollups import load_rollup
+from sensor_db import to_ms
+from sensor_log import START, SegmentLogReader, list_segments, read_all_records
+
+# API name -> record key, in column order
+FIELDS = {"temperature": "TEMP_C", "humidity": "HUMIDITY", "moisture": "SOIL_PCT", "ldr": "LDR"}
+DEFAULT_DEVICE = "default"
+HOUR_MS = 3_600_000
+
+
+class SeriesRing:
+    """
+    Fixed-capacity ring of samples for one device: int64 millisecond timestamps
+    plus one float32 column per field (24 bytes per sample). The oldest samples
+    are overwritten once it is full. Samples are kept in time order, so a range
+    query is two binary searches (one per contiguous half of the ring).
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY, n_fields=len(FIELDS)):
+        self.capacity = capacity
+        # np.empty only reserves address space; pages are touched as samples arrive
+        self.ts = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((capacity, n_fields), dtype=np.float32)
+        self.head = 0       # next slot to write
+        self.size = 0
+        self.late = 0       # samples that arrived older than the newest one
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.values.nbytes
+
+    def _halves(self):
+        """(start, stop) physical ranges of the logical oldest -> newest order."""
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def last_ts(self):
+        return int(self.ts[(self.head - 1) % self.capacity]) if self.size else None
+
+    def append(self, ts, values):
+        """Append a batch (ts: int64 ms, values: rows x fields), restoring time order if needed."""
+        if len(ts) == 0:
+            return
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        newest = self.last_ts()
+        if newest is not None and ts[0] < newest:
+            # late data: rare, so rebuild the (small) overlapping tail in order
+            self.late += int((ts < newest).sum())
+            tail_ts, tail_values = self.range(int(ts[0]) + 1, None)
+            merged_ts = np.concatenate([tail_ts, ts])
+            merged_values = np.concatenate([tail_values, values])
+            order = np.argsort(merged_ts, kind="stable")
+            self._truncate(self.size - len(tail_ts))
+            ts, values = merged_ts[order], merged_values[order]
+        n = len(ts)
+        if n >= self.capacity:
+            ts, values, n = ts[-self.capacity:], values[-self.capacity:], self.capacity
+        first = min(n, self.capacity - self.head)
+        self.ts[self.head:self.head + first] = ts[:first]
+        self.values[self.head:self.head + first] = values[:first]
+        if first < n:
+            self.ts[:n - first] = ts[first:]
+            self.values[:n - first] = values[first:]
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def _truncate(self, keep):
+        """Drop everything after the first ``keep`` samples (logical order)."""
+        oldest = (self.head - self.size) % self.capacity
+        self.head = (oldest + keep) % self.capacity
+        self.size = keep
+
+    def first_ts(self):
+        return int(self.ts[(self.head - self.size) % self.capacity]) if self.size else None
+
+    def range(self, start_ms=None, end_ms=None):
+        """Samples with start_ms <= ts <= end_ms, oldest first."""
+        ts_parts, value_parts = [], []
+        for a, b in self._halves():
+            seg = self.ts[a:b]
+            lo = 0 if start_ms is None else np.searchsorted(seg, start_ms, side="left")
+            hi = len(seg) if end_ms is None else np.searchsorted(seg, end_ms, side="right")
+            ts_parts.append(seg[lo:hi])
+            value_parts.append(self.values[a + lo:a + hi])
+        if not ts_parts:
+            return self.ts[:0], self.values[:0]
+        return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+
+# ---------------- downsampling ----------------
+def _bucket_edges(n, buckets):
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def minmax_indices(y, points):
+    """
+    Indices of the minimum and maximum sample of ``points // 2`` equal-count
+    buckets, in time order. Spikes survive, which plain averaging would flatten.
+    """
+    n = len(y)
+    buckets = max(1, points // 2)
+    if n <= points:
+        return np.arange(n)
+    starts = _bucket_edges(n, buckets)[:-1]
+    counts = np.diff(np.append(starts, n))
+    bucket_of = np.repeat(np.arange(buckets), counts)
+    lo_pos = np.flatnonzero(y == np.repeat(np.minimum.reduceat(y, starts), counts))
+    hi_pos = np.flatnonzero(y == np.repeat(np.maximum.reduceat(y, starts), counts))
+    # first position of the extreme value inside each bucket
+    lo = lo_pos[np.searchsorted(bucket_of[lo_pos], np.arange(buckets))]
+    hi = hi_pos[np.searchsorted(bucket_of[hi_pos], np.arange(buckets))]
+    return np.unique(np.concatenate([lo, hi]))
+
+
+def lttb_indices(ts, y, points):
+    """Largest-Triangle-Three-Buckets: indices of ``points`` samples that keep the visual shape."""
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+    x = ts.astype(np.float64)
+    yf = y.astype(np.float64)
+    edges = _bucket_edges(n - 2, points - 2) + 1
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        if nxt_lo >= nxt_hi:
+            nxt_lo, nxt_hi = n - 1, n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), yf[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (yf[lo:hi] - yf[a]) - (x[a] - x[lo:hi]) * (cy - yf[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(ts, y, points):
+    keep = minmax_indices(y, points)
+    return ts[keep], y[keep]
+
+
+def lttb(ts, y, points):
+    keep = lttb_indices(ts, y, points)
+    return ts[keep], y[keep]
+
+
+DOWNSAMPLERS = {"lttb": lttb_indices, "minmax": lambda ts, y, points: minmax_indices(y, points)}
+
+
+# ---------------- store fed from the collector's log ----------------
+# Timestamps follow sensor_db.to_ms everywhere: naive stamps are the collector's
+# local time (datetime.now()), so /sensor/history and /sensor/readings agree.
+def local_ms(wall):
+    """
+    Naive wall-clock times as int64 ms (what NumPy makes of a naive stamp) ->
+    ms since the epoch. The local UTC offset is looked up once per distinct hour.
+    """
+    hours, inverse = np.unique(wall // HOUR_MS, return_inverse=True)
+    offsets = np.array([h * HOUR_MS - to_ms(datetime(1970, 1, 1) + timedelta(hours=int(h))) for h in hours],
+                       dtype=np.int64)
+    return wall - offsets[inverse]
+
+
+def wall_time(ms):
+    """ms since the epoch -> naive local ``pd.Timestamp`` (the rollups' bucket clock)."""
+    return None if ms is None else pd.Timestamp(datetime.fromtimestamp(ms / 1000))
+
+
+def _to_ms(stamps):
+    """ISO timestamps -> int64 ms since the epoch (``to_ms`` rules); missing/unparseable ones become -1."""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")  # NumPy warns about stamps with a UTC offset
+            wall = np.array(stamps, dtype="datetime64[ms]").astype(np.int64)
+    except (ValueError, UserWarning):
+        return np.array([-1 if ms is None else ms for ms in map(to_ms, stamps)], dtype=np.int64)
+    out = np.full(len(wall), -1, dtype=np.int64)
+    ok = wall != np.iinfo(np.int64).min  # NaT
+    out[ok] = local_ms(wall[ok])
+    return out
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class HistoryStore:
+    """Per-device ``SeriesRing``s, filled by tailing the segment log."""
+
+    def __init__(self, capacity=HISTORY_CAPACITY, log_dir=RAW_LOG_DIR, batch=HISTORY_BATCH):
+        self.capacity = capacity
+        self.batch = batch
+        self.rings = {}
+        self._lock = threading.Lock()
+        self._reader = SegmentLogReader(log_dir)
+        self._log_dir = log_dir
+        self._position = None
+
+    def ingest(self, records):
+        """Add raw collector records (dicts) to the rings of their devices."""
+        if not records:
+            return 0
+        ts = _to_ms([r.get("system_timestamp") for r in records])
+        values = np.array([[_to_float(r.get(k)) for k in FIELDS.values()] for r in records], dtype=np.float32)
+        devices = np.array([r.get("device_id") or DEFAULT_DEVICE for r in records])
+        ok = ts >= 0
+        with self._lock:
+            for device in np.unique(devices[ok]):
+                sel = ok & (devices == device)
+                ring = self.rings.get(device)
+                if ring is None:
+                    ring = self.rings[device] = SeriesRing(self.capacity)
+                ring.append(ts[sel], values[sel])
+        return int(ok.sum())
+
+    def poll(self):
+        """Read whatever the collector appended since the last call, ``batch`` records at a time."""
+        added = 0
+        if self._position is None:
+            self._position = START
+            if not list_segments(self._log_dir):
+                legacy = read_all_records(self._log_dir, RAW_JSON_FILE)
+                for i in range(0, len(legacy), self.batch):
+                    added += self.ingest(legacy[i:i + self.batch])
+        while True:
+            records, self._position = self._reader.read_from(self._position, self.batch)
+            added += self.ingest(records)
+            if len(records) < self.batch:
+                return added
+
+    def query(self, device=DEFAULT_DEVICE, start_ms=None, end_ms=None, points=500,
+              method="lttb", fields=None):
+        """Downsampled raw samples per field between two timestamps (ms)."""
+        fields = fields or list(FIELDS)
+        with self._lock:
+            ring = self.rings.get(device)
+            if ring is None:
+                return {"device": device, "resolution": "raw", "samples": 0, "series": {}}
+            ts, values = ring.range(start_ms, end_ms)
+        downsample = DOWNSAMPLERS[method]
+        series = {}
+        names = list(FIELDS)
+        for name in fields:
+            y = values[:, names.index(name)]
+            ok = ~np.isnan(y)
+            t, y = ts[ok], y[ok]
+            keep = downsample(t, y, points)
+            series[name] = {"t": t[keep].tolist(), "v": _round(y[keep])}
+        return {"device": device, "resolution": "raw", "samples": len(ts), "series": series}
+
+    def stats(self):
+        with self._lock:
+            devices = {d: {"samples": r.size, "capacity": r.capacity, "late": r.late,
+                           "bytes": r.nbytes, "oldest": r.first_ts(), "newest": r.last_ts()}
+                       for d, r in self.rings.items()}
+        per_sample = np.dtype(np.int64).itemsize + len(FIELDS) * np.dtype(np.float32).itemsize
+        return {"devices": devices, "bytes_per_million_samples": per_sample * 1_000_000}
+
+
+def _round(values):
+    return np.round(np.asarray(values, dtype=np.float64), 3).tolist()
+
+
+def query_rollup(resolution, device=DEFAULT_DEVICE, start_ms=None, end_ms=None, points=500,
+                 method="lttb", fields=None, rollup_dir=ROLLUP_DIR):
+    """
+    Bucket means (plus min / max) from the preprocessing rollups, or None when
+    the rollups hold nothing for the range. More buckets than ``points`` are
+    thinned with the same downsampler as raw samples, applied to the means.
+    """
+    df = load_rollup(resolution, wall_time(start_ms), wall_time(end_ms), device, rollup_dir)
+    if df.empty:
+        return None
+    ts = local_ms(df["bucket"].to_numpy().astype("datetime64[ms]").astype(np.int64))
+    downsample = DOWNSAMPLERS[method]
+    series = {}
+    for name in fields or list(FIELDS):
+        col = FIELDS[name]
+        mean = df[f"mean_{col}"].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(mean)
+        keep = np.flatnonzero(ok)[downsample(ts[ok], mean[ok], points)]
+        series[name] = {"t": ts[keep].tolist(), "v": _round(mean[keep]),
+                        "min": _round(df[f"min_{col}"].to_numpy()[keep]),
+                        "max": _round(df[f"max_{col}"].to_numpy()[keep])}
+    return {"device": device, "resolution": resolution,
+            "samples": int(df[f"count_{FIELDS['moisture']}"].sum()), "series": series}
+
+
+# ---------------- module-level service ----------------
+store = HistoryStore()
+_tailer = None
+
+
+async def _tail(interval=HISTORY_POLL):
+    while True:
+        try:
+            await asyncio.to_thread(store.poll)
+        except Exception as e:
+            print(f"History tail failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def start_history():
+    global _tailer
+    if _tailer is None:
+        _tailer = asyncio.create_task(_tail())
+
+
+async def stop_history():
+    global _tailer
+    if _tailer is not None:
+        _tailer.cancel()
+        await asyncio.gather(_tailer, return_exceptions=True)
+        _tailer = None
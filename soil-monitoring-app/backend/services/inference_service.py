@@ -0,0 +1,181 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import (
+    MODELS_DIR,
+    PREDICT_MAX_BATCH,
+    PREDICT_MAX_WAIT_MS,
+    PREDICT_WORKERS,
+    WATER_MODEL,
+)
+from metrics import counter, histogram
+from model_registry import ModelRegistry  # scripts/ is on sys.path via config
+
+MODEL_CALL = histogram("api_predict_model_seconds", "one micro-batch through the model")
+BATCHES = counter("api_predict_batches_total", "model calls made by the /predict micro-batcher")
+BATCH_ROWS = histogram("api_predict_batch_rows", "rows per micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+
+class ModelUnavailable(RuntimeError):
+    """The water model could not be loaded (e.g. not trained yet); /predict answers 503."""
+
+
+def load_water_model(name=WATER_MODEL):
+    """
+    Return ``predict(X) -> (labels, probabilities)`` for the water model.
+    The model comes from the shared registry on every call, so a version published
+    by train_models.py is used from the next batch on; a running batch keeps the
+    version it started with. Without a trained model the API still starts, and
+    ``predict`` raises ``ModelUnavailable`` until one is published.
+    """
+    registry = ModelRegistry(MODELS_DIR)
+    try:
+        registry.get(name)  # load at startup, not on the first request
+    except Exception as e:
+        print(f"Warning: water model {name} unavailable, /predict returns 503 until it is trained: {e}")
+
+    def predict(X):
+        try:
+            model = registry.get(name)
+        except Exception as e:
+            raise ModelUnavailable(f"Water model {name} is not available: {e}") from e
+        proba = model.predict_proba(X)[:, 1]
+        return (proba > 0.5).astype(int), proba
+    return predict
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one vectorised model call.
+
+    A request waits at most ``max_wait_ms`` for others to join its batch; a batch
+    is sent as soon as it holds ``max_batch_size`` rows. Model calls run in a
+    thread pool so the event loop keeps accepting requests meanwhile.
+    ``max_batch_size=1`` gives plain per-request prediction.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=PREDICT_MAX_BATCH,
+                 max_wait_ms=PREDICT_MAX_WAIT_MS, workers=PREDICT_WORKERS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.workers = max(1, workers)
+        self._queue = None
+        self._pool = None
+        self._tasks = []
+        self.batches = 0
+        self.rows = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="predict")
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    async def predict(self, rows):
+        """Predict a list of feature tuples; resolves when their batch has run."""
+        if not self._tasks:
+            raise RuntimeError("MicroBatcher not started")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row in rows:
+            fut = loop.create_future()
+            self._queue.put_nowait((row, fut))
+            futures.append(fut)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        """First queued request, plus whatever arrives before the wait deadline."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            X = np.asarray([row for row, _ in batch], dtype=np.float32)
+            t0 = time.perf_counter()
+            try:
+                labels, proba = await loop.run_in_executor(self._pool, self.predict_fn, X)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            MODEL_CALL.observe(time.perf_counter() - t0)
+            BATCH_ROWS.observe(len(batch))
+            BATCHES.inc()
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, fut), label, p in zip(batch, labels, proba):
+                if not fut.done():
+                    fut.set_result((bool(label), float(p)))
+
+
+# ---------------- module-level service ----------------
+_predict_fn = None
+_batcher = None
+
+
+def get_predict_fn():
+    global _predict_fn
+    if _predict_fn is None:
+        _predict_fn = load_water_model()
+    return _predict_fn
+
+
+async def start_batcher():
+    global _batcher
+    _batcher = MicroBatcher(get_predict_fn())
+    await _batcher.start()
+
+
+async def stop_batcher():
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+
+
+async def predict_readings(rows):
+    """Batched async prediction used by the /predict routes."""
+    if _batcher is None:
+        await start_batcher()
+    return await _batcher.predict(rows)
+
+
+def predict_now(row):
+    """Synchronous single-row prediction (no batching) for sync callers."""
+    labels, proba = get_predict_fn()(np.asarray([row], dtype=np.float32))
+    return bool(labels[0]), float(proba[0])
+
+
+def batcher_stats():
+    if _batcher is None:
+        return {"batches": 0, "rows": 0}
+    return {"batches": _batcher.batches, "rows": _batcher.rows,
+            "avg_batch": _batcher.rows / _batcher.batches if _batcher.batches else 0.0}
@@ -0,0 +1,69 @@
+import time
+
+from config import METRICS_DIR, METRICS_STALE
+from metrics import collect, counter, gauge, histogram, read_published, render_prometheus  # scripts/ via config
+from services import history_service
+from services.stream_service import broadcaster
+
+PROCESS = "backend"
+
+gauge("api_stream_clients", "connected /sensor/stream clients", fn=lambda: broadcaster.stats()["clients"])
+gauge("api_stream_dropped", "stream frames dropped for slow clients", fn=lambda: broadcaster.stats()["dropped"])
+gauge("api_history_samples", "samples held in the /sensor/history rings",
+      fn=lambda: sum(d["samples"] for d in history_service.store.stats()["devices"].values()))
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request into ``http_request_seconds{method, route}`` and
+    counts it in ``http_requests_total{method, route, status}``. Plain ASGI; the
+    series for a (method, route, status) are looked up once and cached. The time
+    is taken when the response starts, so long-lived streams (``/sensor/stream``)
+    count their time to first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._series = {}
+
+    def _observe(self, scope, status, seconds):
+        route = getattr(scope.get("route"), "path", "unmatched")  # the template, e.g. /switch/mode/{mode}
+        key = (scope["method"], route, status)
+        series = self._series.get(key)
+        if series is None:
+            labels = {"method": scope["method"], "route": route}
+            series = self._series[key] = (
+                histogram("http_request_seconds", "request received -> response started", labels=labels),
+                counter("http_requests_total", "HTTP requests", labels={**labels, "status": str(status)}),
+            )
+        series[0].observe(seconds)
+        series[1].inc()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        started = False
+
+        async def send_timed(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                self._observe(scope, message["status"], time.perf_counter() - t0)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            if not started:
+                self._observe(scope, 500, time.perf_counter() - t0)  # failed before responding
+
+
+def render_all(directory=METRICS_DIR, max_age=METRICS_STALE):
+    """
+    This process's metrics plus the files published by the standalone scripts,
+    each series labelled with its ``process``, in Prometheus text format.
+    """
+    processes = [(PROCESS, collect(skip_unused=True))] + read_published(directory, max_age)
+    return render_prometheus([{**s, "labels": s["labels"] + [["process", process]]}
+                              for process, states in processes for s in states])
@@ -1,55 +1,154 @@
-import json
-from pathlib import Path
+import threading
+import time
+import uuid
+
+from config import RAW_JSON_FILE, RAW_LOG_DIR, SENSOR_REPLAY, SENSOR_REPLAY_IDLE, SNAPSHOT_TTL
+from database import connect_db
+from sensor_db import insert_actuator_event
+from sensor_log import START, SegmentLogReader, end_position, list_segments, read_all_records
+from services.actuator_service import send_command
+from services.inference_service import predict_now
 
 _current_mode = "auto"
 _manual_state = "off"
 
-# Path to your raw sensor JSON file
-DATA_FILE = Path("D:/Project36/smart_agriculture_project/data/raw/data.json")
-
-# Load sensor records
-try:
-    with open(DATA_FILE, "r") as f:
-        _sensor_records = json.load(f)
-except Exception as e:
-    print(f"Error loading JSON file: {e}")
-    _sensor_records = []
-
-_index = 0  # pointer to current record
-
-def _get_next_record():
-    """Return the next record from JSON in a loop."""
-    global _index
-    if not _sensor_records:
-        return {}
-    record = _sensor_records[_index]
-    _index = (_index + 1) % len(_sensor_records)
-    return record
-
-# Sensor functions
+REPLAY_BATCH = 1000  # stored records read at a time when replaying
+
+
+def water_needed(record):
+    soil = float(record.get("SOIL_PCT") or 0)
+    try:
+        row = tuple(float(record.get(f) or 0) for f in ("TEMP_C", "HUMIDITY", "SOIL_PCT", "LDR"))
+        needed, _ = predict_now(row)
+        return needed
+    except Exception as e:
+        print(f"Water model unavailable, using soil threshold: {e}")
+        return soil < 30  # True if watering needed
+
+
+class SnapshotCache:
+    """
+    The one current reading every sensor route and the live stream serve.
+
+    A snapshot is rebuilt at most once per ``ttl`` seconds: from the newest record
+    the collector appended to the segment log; without a new record it keeps the
+    last one. With ``replay`` on, stored records are replayed instead, but only
+    while no segments exist or once nothing new arrived for ``replay_idle``
+    seconds, so live and old data never alternate. Mode / pump changes invalidate
+    it at once. ``version`` only moves when the content changes; together with a
+    per-process id it forms the ETag, so clients can poll with If-None-Match.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL, replay=SENSOR_REPLAY, replay_idle=SENSOR_REPLAY_IDLE):
+        self.ttl = ttl
+        self.replay = replay
+        self.replay_idle = replay_idle
+        self._lock = threading.Lock()
+        self._reader = SegmentLogReader(RAW_LOG_DIR)
+        self._position = None
+        self._record = None
+        self._last_new = time.monotonic()
+        self._replay = []                # next stored records, reversed
+        self._replay_position = START
+        self._reading = None
+        self._data = None
+        self._expires = 0.0
+        self._stale = True
+        self._boot = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    @property
+    def etag(self):
+        return f'"{self._boot}-{self.version}"'
+
+    def invalidate(self):
+        self._stale = True
+
+    def get(self):
+        """``(snapshot, etag)``; refreshes if the TTL expired or the cache was invalidated."""
+        with self._lock:
+            now = time.monotonic()
+            if self._data is None or self._stale or now >= self._expires:
+                self._refresh()
+                self._expires = now + self.ttl
+            return self._data, self.etag
+
+    def _next_record(self):
+        if self._position is None:
+            self._position = end_position(RAW_LOG_DIR)
+        records, self._position = self._reader.read_from(self._position)
+        now = time.monotonic()
+        if records:
+            self._last_new = now
+            return records[-1]
+        if self._record is None or self.replay and (
+                now - self._last_new >= self.replay_idle or not list_segments(RAW_LOG_DIR)):
+            return self._replayed()
+        return self._record
+
+    def _replayed(self):
+        """The next stored record, in a loop; the log is read ``REPLAY_BATCH`` records at a time."""
+        if not self._replay:
+            if list_segments(RAW_LOG_DIR):
+                self._replay, self._replay_position = self._reader.read_from(self._replay_position, REPLAY_BATCH)
+                if not self._replay:  # end of the log: start over
+                    self._replay, self._replay_position = self._reader.read_from(START, REPLAY_BATCH)
+            else:
+                self._replay = read_all_records(RAW_LOG_DIR, RAW_JSON_FILE)  # legacy data.json array
+            self._replay.reverse()
+        return self._replay.pop() if self._replay else {}
+
+    def _refresh(self):
+        record = self._next_record()
+        if record is not self._record:
+            self._record = record
+            self._reading = {
+                "timestamp": record.get("system_timestamp"),
+                "moisture": float(record.get("SOIL_PCT") or 0),
+                "humidity": float(record.get("HUMIDITY") or 0),
+                "temperature": float(record.get("TEMP_C") or 0) * 10,
+                "ldr": float(record.get("LDR") or 0),
+                "water": water_needed(record),
+            }
+        data = dict(self._reading, mode=_current_mode, pump=_manual_state)
+        self._stale = False
+        if data != self._data:
+            self.version += 1
+            self._data = data
+
+
+_snapshot = SnapshotCache()
+
+
+def get_snapshot():
+    """Current reading + mode + pump state, and its ETag."""
+    return _snapshot.get()
+
+
+# Sensor functions: thin views over the cached snapshot
 def get_dummy_moisture():
-    record = _get_next_record()
-    return float(record.get("SOIL_PCT", 0))
+    return get_snapshot()[0]["moisture"]
 
 def get_dummy_humidity():
-    record = _get_next_record()
-    return float(record.get("HUMIDITY", 0))
+    return get_snapshot()[0]["humidity"]
 
 def get_dummy_ldr():
-    record = _get_next_record()
-    return float(record.get("LDR", 0))
+    return get_snapshot()[0]["ldr"]
 
 def get_dummy_temperature():
-    record = _get_next_record()
-    return float(record.get("TEMP_C", 0)) * 10
-
+    return get_snapshot()[0]["temperature"]
 
 def get_dummy_water_status():
-    record = _get_next_record()
-    soil = float(record.get("SOIL_PCT", 0))
-    return soil < 30  # True if watering needed
+    return get_snapshot()[0]["water"]
 
 # Switch functions
+def _log_event(command, source, status=None):
+    try:
+        with connect_db() as conn:
+            insert_actuator_event(conn, command, source, status)
+    except Exception as e:
+        print(f"Could not record actuator event: {e}")
+
 def get_mode():
     return _current_mode
 
@@ -58,11 +157,21 @@ def set_mode(mode: str):
     if mode not in ["manual", "auto"]:
         return {"error": "Invalid mode"}
     _current_mode = mode
+    _snapshot.invalidate()
+    _log_event(f"MODE_{mode.upper()}", "manual")
     return {"message": "Mode updated", "mode": _current_mode}
 
-def manual_switch(state: str):
+async def manual_switch(state: str):
+    """Switch the pump through its actuator connection; the state only changes once the board confirms."""
     global _manual_state
     if state not in ["on", "off"]:
         return {"error": "Invalid state"}
+    result = await send_command(state.upper())
+    if result is not None and not result.ok:
+        _log_event(state.upper(), "manual", result.status)
+        return {"error": f"Pump did not confirm: {result.status}", "state": _manual_state,
+                "reply": result.reply, "attempts": result.attempts}
     _manual_state = state
+    _snapshot.invalidate()
+    _log_event(state.upper(), "manual", result.status if result else None)
     return {"message": f"Pump turned {state}", "state": _manual_state}
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+from config import STREAM_CLIENT_QUEUE, STREAM_HEARTBEAT, STREAM_INTERVAL
+from services.sensor_service import get_snapshot
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class Client:
+    """One connected stream: a bounded frame queue that drops its oldest frame when full."""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+
+class Broadcaster:
+    """
+    Fans each frame out to every subscriber. ``publish`` never waits: frames are
+    encoded once and a slow client only loses its own oldest frames.
+    """
+
+    def __init__(self, queue_size=STREAM_CLIENT_QUEUE):
+        self.queue_size = queue_size
+        self.clients = set()
+        self.latest = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        client = Client(self.queue_size)
+        if self.latest is not None:
+            client.offer(self.latest)  # new dashboards show a value straight away
+        self.clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        self.clients.discard(client)
+        self.dropped += client.dropped
+
+    def publish(self, frame, keep=True):
+        if keep:
+            self.latest = frame
+            self.published += 1
+        for client in self.clients:
+            client.offer(frame)
+
+    async def frames(self):
+        """Async iterator of encoded frames for one client (used by the SSE route)."""
+        client = self.subscribe()
+        try:
+            while True:
+                yield await client.queue.get()
+        finally:
+            self.unsubscribe(client)
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "published": self.published,
+            "dropped": self.dropped + sum(c.dropped for c in self.clients),
+        }
+
+
+def encode_event(seq, data):
+    return f"id: {seq}\nevent: reading\ndata: {json.dumps(data)}\n\n".encode()
+
+
+async def produce(broadcaster, interval=STREAM_INTERVAL):
+    """
+    Single producer: refresh the shared sensor snapshot once per ``interval`` and
+    publish it whenever its version changed; otherwise keep the connections
+    alive with heartbeats.
+    """
+    last_etag = None
+    last_sent = time.monotonic()
+    seq = 0
+    while True:
+        data, etag = await asyncio.to_thread(get_snapshot)
+        if etag != last_etag:
+            seq += 1
+            broadcaster.publish(encode_event(seq, data))
+            last_etag = etag
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+            broadcaster.publish(HEARTBEAT_FRAME, keep=False)
+            last_sent = time.monotonic()
+        await asyncio.sleep(interval)
+
+
+# ---------------- module-level service ----------------
+broadcaster = Broadcaster()
+_producer = None
+
+
+async def start_stream():
+    global _producer
+    if _producer is None:
+        _producer = asyncio.create_task(produce(broadcaster))
+
+
+async def stop_stream():
+    global _producer
+    if _producer is not None:
+        _producer.cancel()
+        await asyncio.gather(_producer, return_exceptions=True)
+        _producer = None
@@ -1,29 +1,36 @@
+const API = "http://127.0.0.1:8000";
+
 async function fetchJSON(url) {
     const res = await fetch(url);
     return res.json();
 }
 
+function render(data) {
+    document.getElementById("moistureValue").innerText = data.moisture + " %";
+    document.getElementById("humidityValue").innerText = data.humidity + " %";
+    document.getElementById("temperatureValue").innerText = data.temperature + " °C";
+    document.getElementById("ldrValue").innerText = data.ldr + " ohm";
+    document.getElementById("waterStatus").innerText = data.water ? "Water Needed" : "OK";
+    document.getElementById("modeStatus").innerText = data.mode;
+}
+
+// Fallback for browsers without EventSource: poll the snapshot. The browser cache
+// revalidates with If-None-Match, so an unchanged reading costs a 304.
 async function updateDashboard() {
     try {
-        const moisture = await fetchJSON("http://127.0.0.1:8000/sensor/moisture");
-        const humidity = await fetchJSON("http://127.0.0.1:8000/sensor/humidity");
-        const temperature = await fetchJSON("http://127.0.0.1:8000/sensor/temperature");
-        const ldr = await fetchJSON("http://127.0.0.1:8000/sensor/ldr");
-        const water = await fetchJSON("http://127.0.0.1:8000/sensor/water");
-        const mode = await fetchJSON("http://127.0.0.1:8000/switch/mode");
-
-        document.getElementById("moistureValue").innerText = moisture.value + " %";
-        document.getElementById("humidityValue").innerText = humidity.value + " %";
-        document.getElementById("temperatureValue").innerText = temperature.value + " °C";
-        document.getElementById("ldrValue").innerText = ldr.value + " ohm";
-        document.getElementById("waterStatus").innerText = water.status ? "Water Needed" : "OK";
-        document.getElementById("modeStatus").innerText = mode.mode;
-
+        render(await fetchJSON(API + "/sensor/snapshot"));
     } catch (err) {
         console.error("Error fetching sensor data:", err);
     }
 }
 
-// Update every 5 seconds
-setInterval(updateDashboard, 5000);
-updateDashboard();
+if (window.EventSource) {
+    // Server pushes one consistent reading at a time; EventSource reconnects by itself
+    const source = new EventSource(API + "/sensor/stream");
+    source.addEventListener("reading", (event) => render(JSON.parse(event.data)));
+    source.onerror = () => console.error("Sensor stream interrupted, reconnecting...");
+} else {
+    // Update every 5 seconds
+    setInterval(updateDashboard, 5000);
+    updateDashboard();
+}